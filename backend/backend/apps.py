@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class BackendConfig(AppConfig):
+    # Paquete del proyecto: se registra como aplicación para sus comandos de
+    # diagnóstico y benchmarks (backend/management/commands), que abarcan
+    # todas las aplicaciones
+    name = 'backend'
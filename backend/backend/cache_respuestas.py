@@ -0,0 +1,144 @@
+"""
+Cache de respuestas para los listados completos que consultan los administradores.
+
+La clave combina la ruta, los parámetros, el alcance del usuario y la versión
+del recurso (``backend.versiones``), por lo que cualquier escritura deja las
+entradas anteriores inalcanzables sin tener que borrarlas. Las entradas se
+guardan ya renderizadas como JSON en el cache ``RESPUESTAS_CACHE`` (locmem,
+archivo o base de datos, cualquier backend de Django) y se desalojan por LRU
+al superar ``RESPUESTAS_CACHE_MAX_ENTRADAS`` entradas o
+``RESPUESTAS_CACHE_MAX_BYTES`` bytes. Si las versiones no están en un cache
+compartido no se cachea nada: las escrituras de otros procesos no cambiarían
+la clave.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from . import versiones
+
+PREFIJO = 'respuestas'
+
+
+class CacheLRU:
+    """
+    Índice LRU en memoria sobre un cache de Django: registra el tamaño y el
+    orden de uso de las claves que guarda este proceso y borra del backend las
+    menos usadas cuando se supera algún límite.
+    """
+
+    def __init__(self, alias, max_entradas, max_bytes, timeout):
+        self.alias = alias
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._indice = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _backend(self):
+        return caches[self.alias]
+
+    def obtener(self, clave):
+        contenido = self._backend.get(clave)
+        with self._lock:
+            if contenido is None:
+                self._bytes -= self._indice.pop(clave, 0)
+            elif clave in self._indice:
+                self._indice.move_to_end(clave)
+            else:
+                # Guardada por otro proceso con el mismo backend
+                self._registrar(clave, len(contenido))
+        return contenido
+
+    def guardar(self, clave, contenido):
+        if len(contenido) > self.max_bytes:
+            return
+        self._backend.set(clave, contenido, self.timeout)
+        with self._lock:
+            self._bytes -= self._indice.pop(clave, 0)
+            desalojadas = self._registrar(clave, len(contenido))
+        if desalojadas:
+            self._backend.delete_many(desalojadas)
+
+    def _registrar(self, clave, tamano):
+        self._indice[clave] = tamano
+        self._bytes += tamano
+        desalojadas = []
+        while len(self._indice) > self.max_entradas or self._bytes > self.max_bytes:
+            antigua, tamano_antigua = self._indice.popitem(last=False)
+            self._bytes -= tamano_antigua
+            desalojadas.append(antigua)
+        return desalojadas
+
+    def estadisticas(self):
+        with self._lock:
+            return {'entradas': len(self._indice), 'bytes': self._bytes}
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def obtener_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = CacheLRU(
+                getattr(settings, 'RESPUESTAS_CACHE', 'default'),
+                getattr(settings, 'RESPUESTAS_CACHE_MAX_ENTRADAS', 500),
+                getattr(settings, 'RESPUESTAS_CACHE_MAX_BYTES', 50 * 1024 * 1024),
+                getattr(settings, 'RESPUESTAS_CACHE_TIMEOUT', 600),
+            )
+        return _cache
+
+
+def _clave(request, recurso, alcance):
+    partes = [
+        request.path,
+        '&'.join(sorted(f'{clave}={valor}' for clave, valor in request.GET.items())),
+        str(alcance),
+        versiones.obtener(recurso, alcance),
+    ]
+    return f"{PREFIJO}:{recurso}:{hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()}"
+
+
+def cache_respuesta(recurso, solo_admin=True):
+    """
+    Decorador para métodos ``list`` de DRF. Con ``solo_admin`` solo se cachean
+    los listados completos de los administradores; los de cada residente son
+    pequeños y no justifican una entrada por usuario.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(self, request, *args, **kwargs):
+            alcance = versiones.alcance(request.user)
+            usar_cache = (
+                getattr(settings, 'RESPUESTAS_CACHE_ACTIVO', True)
+                and versiones.compartidas()
+                and (alcance == versiones.TODOS or not solo_admin)
+                and getattr(request.accepted_renderer, 'format', None) == 'json'
+            )
+            if not usar_cache:
+                return vista(self, request, *args, **kwargs)
+
+            cache = obtener_cache()
+            clave = _clave(request, recurso, alcance)
+            contenido = cache.obtener(clave)
+            if contenido is None:
+                respuesta = vista(self, request, *args, **kwargs)
+                if respuesta.status_code != status.HTTP_200_OK:
+                    return respuesta
+                contenido = JSONRenderer().render(respuesta.data)
+                cache.guardar(clave, contenido)
+            return HttpResponse(contenido, content_type='application/json')
+        return envoltura
+    return decorador
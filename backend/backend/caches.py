@@ -0,0 +1,19 @@
+"""
+Utilidades sobre los caches configurados en ``CACHES``.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def es_compartido(alias):
+    """
+    Indica si lo que se escribe en el cache ``alias`` lo ven los demás procesos.
+
+    LocMem vive en la memoria de cada proceso (y Dummy no guarda nada): lo que
+    escribe ahí el worker del outbox, un comando o otro worker del servidor no
+    lo ve el proceso que atiende la solicitud. El estado que se mantiene de
+    forma incremental necesita un cache compartido (Redis, Memcached, base de
+    datos o archivos en una sola máquina).
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
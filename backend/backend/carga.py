@@ -0,0 +1,373 @@
+"""
+Pruebas de carga reproducibles de la API REST.
+
+``poblar`` crea un condominio sintético (un administrador, ``residentes``
+residentes y ``meses`` de historia de gastos comunes, multas y notificaciones)
+a partir de una semilla fija, de modo que dos ejecuciones con los mismos
+parámetros generan exactamente los mismos datos. ``ejecutar`` recorre un
+escenario (un endpoint real) con varios clientes concurrentes y ``resumir``
+entrega latencias p50/p95/p99, solicitudes por segundo y consultas por
+solicitud.
+
+Por defecto las solicitudes pasan por el handler de Django en el mismo proceso
+(middleware, autenticación JWT, vista y serialización completos), lo que
+permite contar las consultas de cada solicitud. Con ``url`` se envían por HTTP
+a un servidor en ejecución que use la misma base de datos y ``SECRET_KEY``; en
+ese caso no se cuentan consultas.
+
+Los datos sintéticos se identifican por el prefijo ``carga-`` de los usuarios
+y ``objeto_tipo='carga'`` de las notificaciones; ``limpiar`` los elimina.
+Conviene usar una base de datos dedicada: los escenarios de pago modifican datos.
+"""
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend import versiones
+from estadocuenta import services as saldos
+from gastocomun.models import GastoComun
+from multas.models import Multa
+from notificaciones import contador
+from notificaciones.models import Notificacion
+from usuarios.models import Usuario
+
+PREFIJO = 'carga-'
+OBJETO_TIPO = 'carga'
+PASSWORD = 'Carga.Benchmark.2024'
+BATCH_SIZE = 1000
+ESCENARIOS = ('token', 'pendientes', 'pagar', 'estadisticas', 'contador', 'notificaciones')
+PERCENTILES = (50, 95, 99)
+
+
+def _mes(hoy, atras):
+    """Primer día del mes ``atras`` meses antes del de ``hoy``."""
+    indice = hoy.year * 12 + hoy.month - 1 - atras
+    return hoy.replace(year=indice // 12, month=indice % 12 + 1, day=1)
+
+
+def _fecha_hora(fecha, dias=0, horas=12):
+    return timezone.make_aware(datetime.combine(fecha, datetime.min.time()) + timedelta(days=dias, hours=horas))
+
+
+def limpiar():
+    """Elimina el condominio sintético (en cascada, con sus gastos, multas y saldos)."""
+    with transaction.atomic():
+        # Las notificaciones compartidas no tienen usuario: no caen en la cascada
+        Notificacion.objects.filter(objeto_tipo=OBJETO_TIPO).delete()
+        Usuario.objects.filter(username__startswith=PREFIJO).delete()
+        contador.invalidar_todos()
+
+
+def poblar(residentes=50, meses=12, multas_por_mes=0.3, notificaciones_por_mes=4, semilla=1):
+    """
+    Reemplaza el condominio sintético por uno nuevo. Los valores (montos,
+    estados, multas) salen de ``random.Random(semilla)``; las fechas son
+    relativas al mes actual. Retorna la cantidad de filas creadas por tabla.
+    """
+    limpiar()
+    rng = random.Random(semilla)
+    hoy = timezone.localdate()
+    tipos = [tipo for tipo, _ in Notificacion.TIPO_CHOICES]
+
+    with transaction.atomic():
+        # Un solo hash para todos: crear la contraseña de cada residente dominaría la carga
+        password = make_password(PASSWORD)
+        Usuario.objects.create_user(f'{PREFIJO}admin', password=PASSWORD, rol='admin')
+        Usuario.objects.bulk_create([
+            Usuario(username=f'{PREFIJO}residente-{numero}', password=password, rol='residente',
+                    numero_residencia=str(100 + numero))
+            for numero in range(residentes)
+        ], batch_size=BATCH_SIZE)
+        # bulk_create no retorna ids en MySQL
+        ids = list(
+            Usuario.objects.filter(username__startswith=f'{PREFIJO}residente-')
+            .order_by('id').values_list('id', flat=True)
+        )
+
+        gastos, multas, notificaciones = [], [], []
+        for atras in range(meses):
+            emision = _mes(hoy, atras)
+            for residente_id in ids:
+                if atras == 0:
+                    estado = 'pendiente'
+                else:
+                    estado = 'pagado' if rng.random() < (0.5 if atras == 1 else 0.9) else 'pendiente'
+                gastos.append(GastoComun(
+                    residente_id=residente_id, concepto=f'Gasto común {emision:%Y-%m}',
+                    descripcion='Carga sintética', monto=Decimal(rng.randrange(30000, 90000, 500)),
+                    estado=estado, fecha_emision=emision, fecha_vencimiento=emision + timedelta(days=10),
+                    fecha_pago=_fecha_hora(emision, dias=5) if estado == 'pagado' else None,
+                ))
+                if rng.random() < multas_por_mes:
+                    estado = rng.choices(['pendiente', 'pagada', 'anulada'], weights=[3, 6, 1])[0]
+                    creacion = _fecha_hora(emision, dias=rng.randrange(28))
+                    multas.append(Multa(
+                        residente_id=residente_id, motivo=rng.choice(['Ruidos molestos', 'Estacionamiento', 'Mascotas']),
+                        descripcion='Carga sintética', precio=Decimal(rng.randrange(5000, 50000, 1000)),
+                        estado=estado, fecha_creacion=creacion,
+                        fecha_pago=creacion + timedelta(days=3) if estado == 'pagada' else None,
+                    ))
+                for _ in range(notificaciones_por_mes):
+                    notificaciones.append(Notificacion(
+                        usuario_id=residente_id, tipo=rng.choice(tipos), titulo='Aviso', mensaje='Carga sintética',
+                        leida=atras > 0 or rng.random() < 0.5, objeto_id=atras, objeto_tipo=OBJETO_TIPO,
+                    ))
+            for _ in range(notificaciones_por_mes):
+                notificaciones.append(Notificacion(
+                    tipo=rng.choice(tipos), titulo='Aviso', mensaje='Carga sintética',
+                    objeto_id=atras, objeto_tipo=OBJETO_TIPO, audiencia=Notificacion.AUDIENCIA_ADMINS,
+                ))
+
+        GastoComun.objects.bulk_create(gastos, batch_size=BATCH_SIZE)
+        Multa.objects.bulk_create(multas, batch_size=BATCH_SIZE)
+        Notificacion.objects.bulk_create(notificaciones, batch_size=BATCH_SIZE)
+        # fecha_creacion es auto_now_add: se reparte por mes después de insertar (objeto_id = meses atrás)
+        for atras in range(meses):
+            Notificacion.objects.filter(objeto_tipo=OBJETO_TIPO, objeto_id=atras).update(
+                fecha_creacion=_fecha_hora(_mes(hoy, atras))
+            )
+
+        # Las escrituras masivas no disparan signals: saldos, versiones y contadores a mano
+        saldos.recalcular(ids)
+        for recurso in ('gastos', 'multas', 'notificaciones'):
+            versiones.incrementar(recurso, ids)
+        contador.invalidar_todos()
+
+    return {
+        'residentes': len(ids),
+        'meses': meses,
+        'gastos': len(gastos),
+        'multas': len(multas),
+        'notificaciones': len(notificaciones),
+        'semilla': semilla,
+    }
+
+
+def _token(usuario):
+    # Se emite directamente: el inicio de sesión se mide en su propio escenario
+    return str(AccessToken.for_user(usuario))
+
+
+def preparar(escenario, solicitudes):
+    """
+    Retorna ``peticion(indice)``, que entrega ``(método, ruta, cuerpo, token)``
+    para la solicitud número ``indice`` del escenario, o ``None`` si el
+    escenario se quedó sin datos (p. ej. sin gastos pendientes que pagar).
+    """
+    if escenario not in ESCENARIOS:
+        raise ValueError(f"Escenario inválido: {escenario}. Opciones: {', '.join(ESCENARIOS)}.")
+    residentes = list(Usuario.objects.filter(username__startswith=f'{PREFIJO}residente-').order_by('id'))
+    if not residentes:
+        raise ValueError("No hay un condominio sintético: ejecuta poblar() primero.")
+
+    if escenario == 'token':
+        return lambda indice: (
+            'POST', '/api/token/',
+            {'username': residentes[indice % len(residentes)].username, 'password': PASSWORD}, None,
+        )
+    if escenario == 'estadisticas':
+        token = _token(Usuario.objects.get(username=f'{PREFIJO}admin'))
+        return lambda indice: ('GET', '/api/gastocomun/estadisticas/', None, token)
+    if escenario == 'pagar':
+        tokens = {residente.id: _token(residente) for residente in residentes}
+        # deque.popleft es atómico: cada gasto se paga una sola vez entre los clientes
+        pendientes = deque(
+            GastoComun.objects.filter(residente__in=residentes, estado='pendiente')
+            .order_by('id').values_list('id', 'residente_id')[:solicitudes]
+        )
+
+        def peticion(indice):
+            try:
+                gasto_id, residente_id = pendientes.popleft()
+            except IndexError:
+                return None
+            return 'POST', f'/api/gastocomun/{gasto_id}/pagar/', None, tokens[residente_id]
+        return peticion
+
+    rutas = {
+        'pendientes': '/api/gastocomun/pendientes/',
+        'contador': '/api/notificaciones/contador/',
+        'notificaciones': '/api/notificaciones/',
+    }
+    tokens = [_token(residente) for residente in residentes]
+    return lambda indice: ('GET', rutas[escenario], None, tokens[indice % len(tokens)])
+
+
+class _ClienteLocal:
+    """Envía las solicitudes al handler de Django del proceso, contando consultas."""
+    cuenta_consultas = True
+
+    def __init__(self):
+        # Los errores 500 se registran como respuestas, no como excepciones
+        self.cliente = Client(raise_request_exception=False)
+        self.host = (settings.ALLOWED_HOSTS or ['localhost'])[0].replace('*', 'localhost')
+
+    def enviar(self, metodo, ruta, cuerpo, token):
+        extra = {'HTTP_HOST': self.host}
+        if token:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        # La conexión es por hilo: el contexto solo captura las consultas de esta solicitud
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.cliente.generic(
+                metodo, ruta, _json(cuerpo), content_type='application/json', **extra
+            )
+        return respuesta.status_code, len(consultas.captured_queries)
+
+
+class _ClienteHttp:
+    """Envía las solicitudes por HTTP (con keep-alive) a un servidor en ejecución."""
+    cuenta_consultas = False
+
+    def __init__(self, url):
+        try:
+            import requests
+        except ImportError:  # Solo el modo remoto lo necesita: `pip install requests`
+            raise ValueError("El modo remoto (url) requiere instalar requests.")
+        self.sesion = requests.Session()
+        self.url = url.rstrip('/')
+
+    def enviar(self, metodo, ruta, cuerpo, token):
+        cabeceras = {'Content-Type': 'application/json'}
+        if token:
+            cabeceras['Authorization'] = f'Bearer {token}'
+        respuesta = self.sesion.request(metodo, self.url + ruta, data=_json(cuerpo), headers=cabeceras)
+        return respuesta.status_code, None
+
+
+def _json(cuerpo):
+    return b'' if cuerpo is None else json.dumps(cuerpo).encode('utf-8')
+
+
+def ejecutar(escenario, clientes=8, solicitudes=200, calentamiento=5, url=None):
+    """
+    Envía hasta ``solicitudes`` solicitudes del escenario repartidas entre
+    ``clientes`` hilos concurrentes, cada uno con su cliente (y su conexión a
+    la base de datos). Antes envía ``calentamiento`` solicitudes sin medirlas
+    (salvo en ``pagar``, que consumiría gastos). Retorna ``resumir(...)``.
+    """
+    peticion = preparar(escenario, solicitudes)
+    nuevo_cliente = (lambda: _ClienteHttp(url)) if url else _ClienteLocal
+    if escenario != 'pagar':
+        cliente = nuevo_cliente()
+        for indice in range(calentamiento):
+            cliente.enviar(*peticion(indice))
+
+    muestras = []
+    errores = []
+    turnos = itertools.count()
+    lock = threading.Lock()
+
+    def trabajar():
+        cliente = nuevo_cliente()
+        propias = []
+        while True:
+            indice = next(turnos)
+            datos = peticion(indice) if indice < solicitudes else None
+            if datos is None:
+                break
+            inicio = time.perf_counter()
+            try:
+                codigo, consultas = cliente.enviar(*datos)
+            except Exception as error:  # Errores de red en el modo remoto
+                codigo, consultas = type(error).__name__, None
+            propias.append((time.perf_counter() - inicio, codigo, consultas))
+        with lock:
+            muestras.extend(propias)
+
+    def en_hilo():
+        try:
+            trabajar()
+        except Exception as error:
+            errores.append(error)
+        finally:
+            connections.close_all()
+
+    inicio = time.perf_counter()
+    if clientes == 1:
+        # En el hilo actual: comparte la conexión (y la transacción) de la base de datos
+        trabajar()
+    else:
+        hilos = [threading.Thread(target=en_hilo) for _ in range(clientes)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        if errores:
+            raise errores[0]
+    return resumir(muestras, time.perf_counter() - inicio, clientes)
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano (siempre es un valor observado)."""
+    if not valores_ordenados:
+        return None
+    return valores_ordenados[max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)]
+
+
+def resumir(muestras, duracion, clientes):
+    """Resume muestras ``(segundos, código, consultas)`` de un escenario."""
+    latencias = sorted(segundos * 1000 for segundos, _, _ in muestras)
+    codigos = Counter(str(codigo) for _, codigo, _ in muestras)
+    consultas = [cantidad for _, _, cantidad in muestras if cantidad is not None]
+    resultado = {
+        'clientes': clientes,
+        'solicitudes': len(muestras),
+        'errores': sum(cantidad for codigo, cantidad in codigos.items()
+                       if not (codigo.isdigit() and int(codigo) < 400)),
+        'codigos': dict(sorted(codigos.items())),
+        'duracion_s': round(duracion, 3),
+        'solicitudes_por_segundo': round(len(muestras) / duracion, 2) if duracion else None,
+        'latencia_ms': {
+            **{f'p{p}': _redondear(percentil(latencias, p)) for p in PERCENTILES},
+            'media': _redondear(sum(latencias) / len(latencias) if latencias else None),
+            'max': _redondear(latencias[-1] if latencias else None),
+        },
+        'consultas_por_solicitud': None,
+    }
+    if consultas:
+        resultado['consultas_por_solicitud'] = {
+            'media': round(sum(consultas) / len(consultas), 2),
+            'max': max(consultas),
+        }
+    return resultado
+
+
+def _redondear(valor):
+    return None if valor is None else round(valor, 2)
+
+
+def comparar(actual, base):
+    """
+    Compara dos reportes por escenario: razón de p95 y de solicitudes por
+    segundo (actual / base) y diferencia de consultas promedio por solicitud.
+    """
+    comparacion = {}
+    for escenario, resultado in actual['escenarios'].items():
+        anterior = base.get('escenarios', {}).get(escenario)
+        if not anterior:
+            continue
+        p95, p95_base = resultado['latencia_ms']['p95'], anterior['latencia_ms']['p95']
+        rps, rps_base = resultado['solicitudes_por_segundo'], anterior['solicitudes_por_segundo']
+        consultas, consultas_base = resultado['consultas_por_solicitud'], anterior['consultas_por_solicitud']
+        comparacion[escenario] = {
+            'p95_razon': round(p95 / p95_base, 3) if p95 and p95_base else None,
+            'solicitudes_por_segundo_razon': round(rps / rps_base, 3) if rps and rps_base else None,
+            'consultas_diferencia': (
+                round(consultas['media'] - consultas_base['media'], 2) if consultas and consultas_base else None
+            ),
+        }
+    return comparacion
@@ -0,0 +1,8 @@
+"""Motor MySQL de Django con el pool de conexiones de ``backend.db.pool``."""
+from django.db.backends.mysql import base
+
+from backend.db.pool import PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,253 @@
+"""
+Pool acotado de conexiones a la base de datos, compartido por todos los hilos
+del proceso.
+
+Django abre una conexión por hilo y, con ``CONN_MAX_AGE=0``, la cierra al
+terminar cada solicitud: cada solicitud paga la conexión TCP y la autenticación
+con MySQL. Las conexiones persistentes (``CONN_MAX_AGE > 0``) tampoco sirven
+bajo ASGI, donde cada solicitud corre en un hilo distinto y las conexiones
+quedan asociadas a hilos que no se reutilizan.
+
+Con los motores ``backend.db.mysql`` y ``backend.db.sqlite3`` el "cierre" que
+hace Django al final de la solicitud devuelve la conexión a este pool, y la
+próxima conexión de cualquier hilo (WSGI o ``sync_to_async`` de ASGI) la toma
+de ahí. Se configura con la clave ``POOL`` de ``DATABASES``::
+
+    'POOL': {
+        'TAMANO': 20,          # conexiones abiertas como máximo
+        'ESPERA': 5,           # segundos esperando una libre antes de fallar
+        'VERIFICAR_TRAS': 10,  # segundos inactiva tras los que se verifica con SELECT 1
+        'VIDA_MAXIMA': 1800,   # segundos antes de reemplazarla (menor que wait_timeout)
+    }
+
+Una conexión se descarta en lugar de devolverse si se cerró dentro de una
+transacción, si hubo errores de base de datos o si superó su vida máxima.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+CONFIGURACION = {
+    'TAMANO': 20,
+    'ESPERA': 5,
+    'VERIFICAR_TRAS': 10,
+    'VIDA_MAXIMA': 1800,
+}
+
+_pools = {}
+_lock = threading.Lock()
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera."""
+
+
+class Pool:
+    """
+    Conexiones inactivas (las más recientes primero, para que las sobrantes
+    envejezcan y se descarten) y un semáforo que acota las que están en uso.
+    Una conexión nueva solo se abre si no hay inactivas, por lo que nunca hay
+    más de ``tamano`` abiertas.
+    """
+
+    def __init__(self, tamano, espera, verificar_tras, vida_maxima):
+        self.tamano = tamano
+        self.espera = espera
+        self.verificar_tras = verificar_tras
+        self.vida_maxima = vida_maxima
+        self._cupos = threading.BoundedSemaphore(tamano)
+        self._lock = threading.Lock()
+        self._inactivas = deque()
+        # id(conexión) -> momento en que se abrió, para las que están en uso
+        self._en_uso = {}
+        self._contadores = dict.fromkeys(
+            ('creadas', 'reutilizadas', 'descartadas', 'verificaciones', 'esperas', 'agotado'), 0
+        )
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+
+    def _contar(self, nombre):
+        with self._lock:
+            self._contadores[nombre] += 1
+
+    def _cerrar(self, conexion):
+        self._contar('descartadas')
+        try:
+            conexion.close()
+        except Exception:
+            # Ya estaba cortada: no hay nada que liberar
+            pass
+
+    def obtener(self, crear, verificar):
+        """
+        Retorna una conexión inactiva (verificada con ``verificar(conexion)`` si
+        estuvo inactiva más de ``verificar_tras`` segundos) o una nueva creada
+        con ``crear()``. Espera hasta ``espera`` segundos si todas están en uso.
+        """
+        if not self._cupos.acquire(blocking=False):
+            inicio = time.perf_counter()
+            obtenido = self._cupos.acquire(timeout=self.espera)
+            esperado = time.perf_counter() - inicio
+            with self._lock:
+                self._contadores['esperas'] += 1
+                self._espera_total += esperado
+                self._espera_maxima = max(self._espera_maxima, esperado)
+                if not obtenido:
+                    self._contadores['agotado'] += 1
+            if not obtenido:
+                raise PoolAgotado(
+                    f"Las {self.tamano} conexiones del pool siguen en uso tras {self.espera} s de espera."
+                )
+        try:
+            while True:
+                with self._lock:
+                    conexion, creada, devuelta = self._inactivas.pop() if self._inactivas else (None, None, None)
+                if conexion is None:
+                    break
+                ahora = time.monotonic()
+                if ahora - creada >= self.vida_maxima:
+                    self._cerrar(conexion)
+                    continue
+                if ahora - devuelta >= self.verificar_tras:
+                    self._contar('verificaciones')
+                    if not self._verificar(verificar, conexion):
+                        self._cerrar(conexion)
+                        continue
+                with self._lock:
+                    self._en_uso[id(conexion)] = creada
+                    self._contadores['reutilizadas'] += 1
+                return conexion
+
+            conexion = crear()
+            with self._lock:
+                self._en_uso[id(conexion)] = time.monotonic()
+                self._contadores['creadas'] += 1
+            return conexion
+        except BaseException:
+            self._cupos.release()
+            raise
+
+    def _verificar(self, verificar, conexion):
+        try:
+            return verificar(conexion)
+        except Exception:
+            return False
+
+    def devolver(self, conexion, reutilizable=True):
+        """Devuelve una conexión obtenida con ``obtener``; si no es reutilizable, la cierra."""
+        with self._lock:
+            creada = self._en_uso.pop(id(conexion), None)
+        try:
+            if creada is None:
+                # No salió de este pool (p. ej. del pool anterior a un fork)
+                conexion.close()
+                return
+            if reutilizable and time.monotonic() - creada < self.vida_maxima:
+                with self._lock:
+                    self._inactivas.append((conexion, creada, time.monotonic()))
+            else:
+                self._cerrar(conexion)
+        finally:
+            if creada is not None:
+                self._cupos.release()
+
+    def cerrar(self):
+        """Cierra las conexiones inactivas (las que están en uso se cierran al devolverlas)."""
+        with self._lock:
+            inactivas, self._inactivas = list(self._inactivas), deque()
+        for conexion, _, _ in inactivas:
+            self._cerrar(conexion)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'tamano': self.tamano,
+                'en_uso': len(self._en_uso),
+                'inactivas': len(self._inactivas),
+                **self._contadores,
+                'espera_total_s': round(self._espera_total, 6),
+                'espera_maxima_s': round(self._espera_maxima, 6),
+            }
+
+
+def obtener_pool(alias, settings_dict):
+    """
+    Pool del proceso para la base de datos ``alias``. La clave incluye el pid
+    (tras un fork el proceso hijo abre sus propias conexiones) y los datos de
+    conexión (la base de datos de tests usa otro nombre).
+    """
+    clave = (os.getpid(), alias, settings_dict['NAME'], settings_dict['HOST'],
+             settings_dict['PORT'], settings_dict['USER'])
+    pool = _pools.get(clave)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(clave)
+            if pool is None:
+                configuracion = {**CONFIGURACION, **(settings_dict.get('POOL') or {})}
+                pool = _pools[clave] = Pool(
+                    tamano=configuracion['TAMANO'], espera=configuracion['ESPERA'],
+                    verificar_tras=configuracion['VERIFICAR_TRAS'], vida_maxima=configuracion['VIDA_MAXIMA'],
+                )
+    return pool
+
+
+def estadisticas():
+    """Estadísticas de los pools de este proceso: ``{alias: {...}}``."""
+    pid = os.getpid()
+    resultado = {}
+    for (pid_pool, alias, nombre, *_), pool in list(_pools.items()):
+        if pid_pool == pid:
+            resultado[alias if alias not in resultado else f'{alias}:{nombre}'] = pool.estadisticas()
+    return resultado
+
+
+def cerrar_todos():
+    for pool in list(_pools.values()):
+        pool.cerrar()
+
+
+class PoolMixin:
+    """
+    Agrega el pool a un ``DatabaseWrapper`` de Django: ``get_new_connection``
+    toma una conexión del pool y ``_close`` la devuelve. Sin la clave ``POOL``
+    en ``DATABASES`` se comporta como el motor original.
+    """
+
+    def usa_pool(self):
+        return bool(self.settings_dict.get('POOL'))
+
+    def pool(self):
+        return obtener_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        if not self.usa_pool():
+            return super().get_new_connection(conn_params)
+        crear = super().get_new_connection
+        try:
+            return self.pool().obtener(lambda: crear(conn_params), _verificar_conexion)
+        except PoolAgotado as error:
+            # Como error del driver, para que Django lo traduzca a OperationalError
+            raise self.Database.OperationalError(str(error))
+
+    def _close(self):
+        if not self.usa_pool():
+            return super()._close()
+        # Dentro de una transacción o tras un error el estado de la conexión es dudoso
+        reutilizable = not self.in_atomic_block and not self.errors_occurred
+        if reutilizable and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                reutilizable = False
+        self.pool().devolver(self.connection, reutilizable)
+
+
+def _verificar_conexion(conexion):
+    cursor = conexion.cursor()
+    try:
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    return True
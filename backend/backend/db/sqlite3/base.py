@@ -0,0 +1,13 @@
+"""
+Motor SQLite de Django con el pool de conexiones de ``backend.db.pool``, para
+desarrollo y para comparar con ``benchmark_conexiones`` sin un servidor MySQL.
+"""
+from django.db.backends.sqlite3 import base
+
+from backend.db.pool import PoolMixin
+
+
+class DatabaseWrapper(PoolMixin, base.DatabaseWrapper):
+    def usa_pool(self):
+        # Cerrar una base en memoria la destruye: Django nunca la cierra y no hay nada que reutilizar
+        return super().usa_pool() and not self.is_in_memory_db()
@@ -0,0 +1,76 @@
+"""
+Motor de estadísticas basado en agregación condicional.
+
+Todas las cantidades y montos por estado de un modelo se calculan en una sola
+consulta (``COUNT(*) FILTER (WHERE estado = ...)`` / ``SUM(CASE WHEN ...)``)
+en lugar de una consulta por cada conteo o suma.
+"""
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+DESGLOSE_QUERY_PARAM = 'desglose'
+
+
+def expresiones_por_estado(estados, campo_monto=None, campo_estado='estado'):
+    """
+    Construye las expresiones de agregación para el total y para cada estado:
+    ``total``, ``total_<estado>`` y, si hay campo de monto, ``monto_<estado>``.
+    """
+    expresiones = {'total': Count('pk')}
+    for estado in estados:
+        filtro = Q(**{campo_estado: estado})
+        expresiones[f'total_{estado}'] = Count('pk', filter=filtro)
+        if campo_monto:
+            expresiones[f'monto_{estado}'] = Sum(campo_monto, filter=filtro)
+    return expresiones
+
+
+def _normalizar(fila):
+    """Las sumas sin filas retornan ``None``; se reportan como 0."""
+    return {clave: (0 if valor is None else valor) for clave, valor in fila.items()}
+
+
+def resumen(queryset, estados, campo_monto=None, campo_estado='estado'):
+    """Retorna los conteos y montos por estado del queryset en una sola consulta."""
+    fila = queryset.aggregate(**expresiones_por_estado(estados, campo_monto, campo_estado))
+    return _normalizar(fila)
+
+
+def desglose(queryset, agrupar_por, estados, campo_monto=None, campo_estado='estado'):
+    """
+    Retorna los mismos agregados de ``resumen`` agrupados por ``agrupar_por``
+    (un diccionario ``alias -> expresión``) en una sola consulta.
+    """
+    expresiones = expresiones_por_estado(estados, campo_monto, campo_estado)
+    filas = (
+        queryset
+        .order_by()
+        .values(**agrupar_por)
+        .annotate(**expresiones)
+        .order_by(*agrupar_por.keys())
+    )
+    return [_normalizar(fila) for fila in filas]
+
+
+def desglose_mensual(queryset, campo_fecha, estados, campo_monto=None, campo_estado='estado'):
+    """Agregados por estado agrupados por mes de ``campo_fecha`` (formato ``AAAA-MM``)."""
+    filas = desglose(queryset, {'mes': TruncMonth(campo_fecha)}, estados, campo_monto, campo_estado)
+    for fila in filas:
+        fila['mes'] = fila['mes'].strftime('%Y-%m') if fila['mes'] else None
+    return filas
+
+
+def desglose_por_residente(queryset, estados, campo_monto=None, campo_estado='estado'):
+    """Agregados por estado agrupados por residente."""
+    agrupar_por = {'id_residente': F('residente'), 'username': F('residente__username')}
+    filas = desglose(queryset, agrupar_por, estados, campo_monto, campo_estado)
+    return [{'residente': fila.pop('id_residente'), **fila} for fila in filas]
+
+
+def desgloses_solicitados(request):
+    """
+    Retorna los desgloses pedidos con ``?desglose=mes,residente``.
+    Por defecto no se calcula ninguno, para que el endpoint siga siendo una consulta.
+    """
+    valor = request.query_params.get(DESGLOSE_QUERY_PARAM, '')
+    return {parte.strip() for parte in valor.split(',') if parte.strip()}
@@ -0,0 +1,208 @@
+"""
+Exportación de listados a CSV/XLSX sin cargar el resultado completo en memoria.
+
+Las filas se leen por lotes con un cursor keyset sobre el orden del queryset
+(``WHERE (fecha, id) > (...) LIMIT n``, sin OFFSET) y se envían con
+``StreamingHttpResponse`` a medida que se generan, por lo que la memoria usada
+no depende de la cantidad de filas exportadas. ``iterator(chunk_size=...)`` no
+sirve para esto en MySQL: mysqlclient trae el resultado completo al cliente.
+Bajo ASGI el contenido es un generador asíncrono que lee cada lote con
+``sync_to_async``; con uno síncrono Django 4.2 lo consumiría entero con
+``sync_to_async(list)`` antes de enviar el primer byte.
+"""
+import csv
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .filtros import limite_fecha
+from .pagination import keyset_filter
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX es opcional: requiere `pip install openpyxl`
+    Workbook = None
+
+CHUNK_SIZE = 2000
+PERIODO_RE = re.compile(r'^(\d{4})-(\d{2})$')
+
+
+class _Eco:
+    """Objeto tipo archivo que retorna lo escrito en lugar de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def _formatear(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S') if timezone.is_aware(valor) else valor.isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _orden(queryset):
+    """Orden del queryset (o del modelo) terminado en ``id``, para que el cursor sea único."""
+    orden = [
+        re.sub(r'^(-?)pk$', r'\1id', nombre)
+        for nombre in (queryset.query.order_by or queryset.model._meta.ordering) if isinstance(nombre, str)
+    ]
+    if not orden or orden[-1].lstrip('-') != 'id':
+        orden.append('id')
+    return orden
+
+
+def lotes(queryset, campos, chunk_size=CHUNK_SIZE):
+    """
+    Itera las filas del queryset como listas de tuplas de hasta ``chunk_size``
+    filas, con una consulta con LIMIT por lote.
+    """
+    orden = _orden(queryset)
+    columnas_orden = [nombre.lstrip('-') for nombre in orden]
+    leidos = list(campos) + [columna for columna in columnas_orden if columna not in campos]
+    posiciones = [leidos.index(columna) for columna in columnas_orden]
+    queryset = queryset.order_by(*orden).values_list(*leidos)
+
+    ultimo = None
+    while True:
+        lote = queryset if ultimo is None else queryset.filter(keyset_filter(orden, ultimo))
+        lote = list(lote[:chunk_size])
+        if not lote:
+            return
+        yield [tuple(_formatear(valor) for valor in fila[:len(campos)]) for fila in lote]
+        if len(lote) < chunk_size:
+            return
+        ultimo = [lote[-1][posicion] for posicion in posiciones]
+
+
+def filas(queryset, campos, chunk_size=CHUNK_SIZE):
+    """Itera las filas del queryset como tuplas, leyendo por lotes (ver ``lotes``)."""
+    for lote in lotes(queryset, campos, chunk_size):
+        yield from lote
+
+
+async def _en_asgi(partes):
+    """Recorre un generador síncrono desde el event loop, un lote por llamada a un hilo."""
+    siguiente = sync_to_async(next)
+    while True:
+        parte = await siguiente(partes, None)
+        if parte is None:
+            return
+        yield parte
+
+
+def respuesta_csv(queryset, columnas, nombre_archivo, asincrona=False, chunk_size=CHUNK_SIZE):
+    """
+    ``columnas`` es una lista de tuplas ``(encabezado, campo)``. Con
+    ``asincrona`` el contenido es un generador asíncrono (servidor ASGI).
+    """
+    escritor = csv.writer(_Eco())
+
+    def contenido():
+        # BOM para que Excel reconozca UTF-8 (tildes y ñ)
+        yield '\ufeff' + escritor.writerow([encabezado for encabezado, _ in columnas])
+        for lote in lotes(queryset, [campo for _, campo in columnas], chunk_size):
+            yield ''.join(escritor.writerow(fila) for fila in lote)
+
+    partes = _en_asgi(contenido()) if asincrona else contenido()
+    respuesta = StreamingHttpResponse(partes, content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.csv"'
+    return respuesta
+
+
+def respuesta_xlsx(queryset, columnas, nombre_archivo):
+    """
+    Genera el XLSX en modo ``write_only`` de openpyxl (las filas se escriben a
+    un archivo temporal, no se mantienen en memoria) y lo envía por partes.
+    """
+    if Workbook is None:
+        raise ValidationError({"formato": "La exportación a XLSX requiere instalar openpyxl."})
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=nombre_archivo[:31])
+    hoja.append([encabezado for encabezado, _ in columnas])
+    for fila in filas(queryset, [campo for _, campo in columnas]):
+        hoja.append(fila)
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f'{nombre_archivo}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+def exportar(request, queryset, columnas, nombre_archivo):
+    formato = request.query_params.get('formato', 'csv').lower()
+    if formato == 'csv':
+        asincrona = isinstance(getattr(request, '_request', request), ASGIRequest)
+        return respuesta_csv(queryset, columnas, nombre_archivo, asincrona=asincrona)
+    if formato == 'xlsx':
+        return respuesta_xlsx(queryset, columnas, nombre_archivo)
+    raise ValidationError({"formato": "Formato no soportado. Usa 'csv' o 'xlsx'."})
+
+
+def filtrar(request, queryset, campo_fecha, estados):
+    """
+    Aplica los filtros de exportación: ``periodo`` (AAAA-MM), ``desde``/``hasta``
+    (AAAA-MM-DD, inclusivos, sobre ``campo_fecha``), ``estado`` y ``residente`` (id).
+    """
+    parametros = request.query_params
+    inicio = fin = None
+
+    periodo = parametros.get('periodo')
+    if periodo:
+        coincidencia = PERIODO_RE.match(periodo)
+        if not coincidencia or not 1 <= int(coincidencia.group(2)) <= 12:
+            raise ValidationError({"periodo": "Formato inválido, usa AAAA-MM."})
+        anio, mes = int(coincidencia.group(1)), int(coincidencia.group(2))
+        inicio = date(anio, mes, 1)
+        fin = date(anio + mes // 12, mes % 12 + 1, 1)
+
+    for parametro in ('desde', 'hasta'):
+        valor = parametros.get(parametro)
+        if not valor:
+            continue
+        try:
+            fecha = date.fromisoformat(valor)
+        except ValueError:
+            raise ValidationError({parametro: "Formato inválido, usa AAAA-MM-DD."})
+        if parametro == 'desde':
+            inicio = max(inicio, fecha) if inicio else fecha
+        else:
+            fecha += timedelta(days=1)
+            fin = min(fin, fecha) if fin else fecha
+
+    if inicio:
+        queryset = queryset.filter(**{f'{campo_fecha}__gte': limite_fecha(queryset, campo_fecha, inicio)})
+    if fin:
+        queryset = queryset.filter(**{f'{campo_fecha}__lt': limite_fecha(queryset, campo_fecha, fin)})
+
+    estado = parametros.get('estado')
+    if estado:
+        if estado not in estados:
+            raise ValidationError({"estado": f"Estado inválido. Opciones: {', '.join(estados)}."})
+        queryset = queryset.filter(estado=estado)
+
+    residente = parametros.get('residente')
+    if residente:
+        if not residente.isdigit():
+            raise ValidationError({"residente": "Debe ser el id del residente."})
+        queryset = queryset.filter(residente_id=int(residente))
+
+    return queryset
@@ -0,0 +1,131 @@
+"""
+Filtros, búsqueda y orden por parámetros de consulta para los listados de cargos
+(gastos comunes y multas).
+
+Cada filtro se traduce a una condición que puede resolver un índice: igualdades
+sobre ``estado``/``residente``, rangos semiabiertos sobre las fechas y montos
+(nunca funciones sobre la columna) y búsqueda por prefijo, que en MySQL es un
+``LIKE 'texto%'`` sobre el índice de la columna. La vista declara qué campos
+acepta::
+
+    filter_backends = [FiltrosCargos]
+    filtro_estados = ['pendiente', 'pagado']
+    filtro_fechas = ['fecha_emision', 'fecha_vencimiento']
+    filtro_monto = 'monto'
+    filtro_busqueda = 'concepto'
+    filtro_orden = ['fecha_emision', 'fecha_vencimiento', 'monto']
+    filtro_acciones = ['list', 'pendientes']
+
+Los filtros solo se aplican en las acciones de ``filtro_acciones`` (por
+defecto ``list``): ``get_object()`` también pasa por ``filter_queryset``, y un
+``?estado=`` en la URL de una acción de detalle no debe convertirla en un 404.
+
+Parámetros: ``estado`` (uno o varios separados por coma), ``residente`` (id),
+``numero_residencia``, ``<fecha>_desde``/``<fecha>_hasta`` (AAAA-MM-DD,
+inclusivos), ``<monto>_min``/``<monto>_max``, ``busqueda`` y ``orden``
+(``campo`` o ``-campo``).
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import DateTimeField
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+# Largo máximo del texto de búsqueda (las columnas buscables son de 100 caracteres)
+MAX_BUSQUEDA = 100
+
+
+def limite_fecha(queryset, campo, fecha):
+    """Convierte una fecha al tipo del campo, para filtrar por rango y usar su índice."""
+    if isinstance(queryset.model._meta.get_field(campo), DateTimeField):
+        return timezone.make_aware(datetime.combine(fecha, time.min))
+    return fecha
+
+
+def _fecha(parametros, nombre):
+    valor = parametros.get(nombre)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValidationError({nombre: "Formato inválido, usa AAAA-MM-DD."})
+
+
+def _monto(parametros, nombre):
+    valor = parametros.get(nombre)
+    if not valor:
+        return None
+    try:
+        monto = Decimal(valor)
+    except InvalidOperation:
+        raise ValidationError({nombre: "Debe ser un número."})
+    if not monto.is_finite():
+        raise ValidationError({nombre: "Debe ser un número."})
+    return monto
+
+
+class FiltrosCargos(BaseFilterBackend):
+    """Aplica los filtros declarados por la vista (ver el docstring del módulo)."""
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) not in getattr(view, 'filtro_acciones', ('list',)):
+            return queryset
+        parametros = request.query_params
+
+        estados = getattr(view, 'filtro_estados', None)
+        estado = parametros.get('estado')
+        if estados and estado:
+            solicitados = [valor.strip() for valor in estado.split(',') if valor.strip()]
+            invalidos = [valor for valor in solicitados if valor not in estados]
+            if invalidos:
+                raise ValidationError({"estado": f"Estado inválido. Opciones: {', '.join(estados)}."})
+            queryset = queryset.filter(estado__in=solicitados)
+
+        residente = parametros.get('residente')
+        if residente:
+            if not residente.isdigit():
+                raise ValidationError({"residente": "Debe ser el id del residente."})
+            queryset = queryset.filter(residente_id=int(residente))
+
+        numero_residencia = parametros.get('numero_residencia')
+        if numero_residencia:
+            queryset = queryset.filter(residente__numero_residencia=numero_residencia.strip())
+
+        for campo in getattr(view, 'filtro_fechas', ()):
+            desde = _fecha(parametros, f'{campo}_desde')
+            hasta = _fecha(parametros, f'{campo}_hasta')
+            if desde:
+                queryset = queryset.filter(**{f'{campo}__gte': limite_fecha(queryset, campo, desde)})
+            if hasta:
+                # Hasta inclusivo: se compara con el inicio del día siguiente
+                fin = limite_fecha(queryset, campo, hasta + timedelta(days=1))
+                queryset = queryset.filter(**{f'{campo}__lt': fin})
+
+        campo_monto = getattr(view, 'filtro_monto', None)
+        if campo_monto:
+            minimo = _monto(parametros, f'{campo_monto}_min')
+            maximo = _monto(parametros, f'{campo_monto}_max')
+            if minimo is not None:
+                queryset = queryset.filter(**{f'{campo_monto}__gte': minimo})
+            if maximo is not None:
+                queryset = queryset.filter(**{f'{campo_monto}__lte': maximo})
+
+        campo_busqueda = getattr(view, 'filtro_busqueda', None)
+        busqueda = (parametros.get('busqueda') or '').strip()
+        if campo_busqueda and busqueda:
+            if len(busqueda) > MAX_BUSQUEDA:
+                raise ValidationError({"busqueda": f"Máximo {MAX_BUSQUEDA} caracteres."})
+            # Por prefijo: un "contiene" (LIKE '%texto%') recorrería la tabla completa
+            queryset = queryset.filter(**{f'{campo_busqueda}__istartswith': busqueda})
+
+        orden = parametros.get('orden')
+        if orden:
+            permitidos = getattr(view, 'filtro_orden', ())
+            if orden.lstrip('-') not in permitidos:
+                raise ValidationError({"orden": f"Orden inválido. Opciones: {', '.join(permitidos)}."})
+            queryset = queryset.order_by(orden)
+
+        return queryset
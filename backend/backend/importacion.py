@@ -0,0 +1,321 @@
+"""
+Importación masiva desde CSV de residentes, gastos comunes y multas históricas.
+
+El archivo se lee fila a fila y se procesa por lotes: cada lote se valida con
+una sola consulta de búsqueda y se inserta con ``bulk_create`` dentro de su
+propia transacción. Las filas inválidas se reportan con su número de línea y
+no detienen la importación; si el ``bulk_create`` de un lote viola una
+restricción (p. ej. un registro creado por otra solicitud tras la validación),
+el lote se reintenta fila a fila y solo se descartan las filas en conflicto. Los hashes de contraseña (la parte costosa de crear
+usuarios) se calculan en un pool de procesos.
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from backend import versiones
+from estadocuenta import services as saldos
+from gastocomun.models import GastoComun
+from multas.models import Multa
+from notificaciones import services as notificaciones
+from usuarios.models import Usuario
+
+BATCH_SIZE = 500
+# Errores por fila incluidos en el resumen; el resto solo se cuenta
+MAX_ERRORES_REPORTADOS = 1000
+ERROR_CONFLICTO = {'non_field_errors': 'Ya existe un registro que entra en conflicto con esta fila.'}
+
+
+def _columnas(modelo, campos):
+    return {campo: modelo._meta.get_field(campo) for campo in campos}
+
+
+# tipo -> (columnas obligatorias, columnas opcionales)
+FORMATOS = {
+    'residentes': (
+        ('username', 'email', 'first_name', 'last_name'),
+        ('password', 'telefono', 'numero_residencia', 'rol'),
+    ),
+    'gastos': (
+        ('residente', 'concepto', 'monto', 'fecha_emision', 'fecha_vencimiento'),
+        ('descripcion', 'estado', 'fecha_pago'),
+    ),
+    'multas': (
+        ('residente', 'motivo', 'precio'),
+        ('descripcion', 'estado', 'fecha_creacion', 'fecha_pago'),
+    ),
+}
+CAMPOS_USUARIO = _columnas(Usuario, ('username', 'email', 'first_name', 'last_name',
+                                     'telefono', 'numero_residencia', 'rol'))
+CAMPOS_GASTO = _columnas(GastoComun, ('concepto', 'descripcion', 'monto', 'estado',
+                                      'fecha_emision', 'fecha_vencimiento', 'fecha_pago'))
+CAMPOS_MULTA = _columnas(Multa, ('motivo', 'descripcion', 'precio', 'estado',
+                                 'fecha_creacion', 'fecha_pago'))
+
+
+def _inicializar_proceso():
+    # Con el método "spawn" el proceso hijo parte sin Django configurado
+    if not apps.ready:
+        django.setup()
+
+
+def _pool_hash(procesos):
+    if procesos is None:
+        procesos = getattr(settings, 'IMPORTACION_PROCESOS_HASH', None) or os.cpu_count() or 1
+    if procesos <= 1:
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso)
+
+
+def _hashear(passwords, pool):
+    """Hashea en el pool (si lo hay); ``None`` produce una contraseña inutilizable."""
+    if pool is None or not any(passwords):
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=16))
+
+
+def _limpiar(fila, campos, obligatorias, errores):
+    """
+    Convierte y valida los valores de la fila con los campos del modelo. Las
+    columnas opcionales vacías se omiten para que apliquen los valores por defecto.
+    """
+    valores = {}
+    for nombre, campo in campos.items():
+        valor = (fila.get(nombre) or '').strip()
+        if not valor:
+            if nombre in obligatorias:
+                errores[nombre] = 'Este campo es obligatorio.'
+            elif campo.null:
+                valores[nombre] = None
+            continue
+        try:
+            valor = campo.clean(valor, None)
+        except DjangoValidationError as error:
+            errores[nombre] = ' '.join(error.messages)
+            continue
+        if campo.get_internal_type() == 'DateTimeField' and timezone.is_naive(valor):
+            valor = timezone.make_aware(valor)
+        valores[nombre] = valor
+    return valores
+
+
+def _residentes_por_username(lote):
+    usernames = {(fila.get('residente') or '').strip() for _, fila in lote}
+    return dict(
+        Usuario.objects
+        .filter(rol='residente', username__in=usernames)
+        .values_list('username', 'id')
+    )
+
+
+def _validar_residentes(lote, estado):
+    existentes = set(
+        Usuario.objects
+        .filter(username__in={(fila.get('username') or '').strip() for _, fila in lote})
+        .values_list('username', flat=True)
+    )
+    validas, errores = [], []
+    for numero, fila in lote:
+        problemas = {}
+        valores = _limpiar(fila, CAMPOS_USUARIO, FORMATOS['residentes'][0], problemas)
+        username = valores.get('username')
+        if username in existentes or username in estado['usernames']:
+            problemas['username'] = 'Ya existe un usuario con este nombre.'
+        password = (fila.get('password') or '').strip() or None
+        if password and not problemas:
+            try:
+                validate_password(password, Usuario(**valores))
+            except DjangoValidationError as error:
+                problemas['password'] = ' '.join(error.messages)
+        if problemas:
+            errores.append((numero, problemas))
+            continue
+        # También detecta nombres repetidos dentro del archivo, aunque caigan en lotes distintos
+        estado['usernames'].add(username)
+        validas.append((numero, (valores, password)))
+    return validas, errores
+
+
+def _insertar(modelo, filas):
+    """
+    Inserta ``filas`` (``[(numero, objeto)]``) con un ``bulk_create``. Si viola
+    una restricción, reintenta fila a fila, cada una en su savepoint y también
+    sin señales. Retorna ``(objetos_creados, errores)`` con los números de línea
+    de las filas rechazadas.
+    """
+    objetos = [objeto for _, objeto in filas]
+    try:
+        with transaction.atomic():
+            modelo.objects.bulk_create(objetos, batch_size=BATCH_SIZE)
+        return objetos, []
+    except IntegrityError:
+        pass
+    creados, errores = [], []
+    for numero, objeto in filas:
+        # Con RETURNING el lote revertido pudo dejar asignadas las claves primarias
+        objeto.pk = None
+        try:
+            with transaction.atomic():
+                modelo.objects.bulk_create([objeto])
+        except IntegrityError:
+            errores.append((numero, ERROR_CONFLICTO))
+        else:
+            creados.append(objeto)
+    return creados, errores
+
+
+def _guardar_residentes(validas, pool):
+    hashes = _hashear([password for _, (_, password) in validas], pool)
+    usuarios, errores = _insertar(Usuario, [
+        (numero, Usuario(password=hash_, **valores))
+        for (numero, (valores, _)), hash_ in zip(validas, hashes)
+    ])
+    if any(usuario.rol == 'admin' for usuario in usuarios):
+        # bulk_create no dispara el post_save que invalida la lista de administradores
+        transaction.on_commit(notificaciones.invalidar_cache_admins)
+    if usuarios:
+        versiones.incrementar('usuarios')
+    return usuarios, errores
+
+
+def _validar_cargos(lote, tipo, campos):
+    residentes = _residentes_por_username(lote)
+    validas, errores = [], []
+    for numero, fila in lote:
+        problemas = {}
+        valores = _limpiar(fila, campos, FORMATOS[tipo][0], problemas)
+        residente_id = residentes.get((fila.get('residente') or '').strip())
+        if residente_id is None:
+            problemas['residente'] = 'No existe un residente con ese nombre de usuario.'
+        if problemas:
+            errores.append((numero, problemas))
+            continue
+        valores['residente_id'] = residente_id
+        validas.append((numero, valores))
+    return validas, errores
+
+
+def _validar_gastos(lote, estado):
+    validas, errores = _validar_cargos(lote, 'gastos', CAMPOS_GASTO)
+    for _, valores in validas:
+        valores['descripcion'] = valores.get('descripcion') or valores['concepto']
+    return validas, errores
+
+
+def _validar_multas(lote, estado):
+    validas, errores = _validar_cargos(lote, 'multas', CAMPOS_MULTA)
+    for _, valores in validas:
+        valores['descripcion'] = valores.get('descripcion') or valores['motivo']
+    return validas, errores
+
+
+def _guardar_cargos(modelo, prefijo):
+    def guardar(validas, pool):
+        objetos, errores = _insertar(modelo, [(numero, modelo(**valores)) for numero, valores in validas])
+        # bulk_create no dispara post_save: saldos y versiones se actualizan en lote.
+        # Los cargos históricos no generan notificaciones.
+        saldos.registrar_creados(prefijo, objetos)
+        if objetos:
+            versiones.incrementar(prefijo, {objeto.residente_id for objeto in objetos})
+        return objetos, errores
+    return guardar
+
+
+IMPORTADORES = {
+    'residentes': (_validar_residentes, _guardar_residentes),
+    'gastos': (_validar_gastos, _guardar_cargos(GastoComun, 'gastos')),
+    'multas': (_validar_multas, _guardar_cargos(Multa, 'multas')),
+}
+
+
+def _error_de_lectura(error):
+    if isinstance(error, UnicodeDecodeError):
+        return "El archivo debe estar codificado en UTF-8."
+    return f"CSV mal formado: {error}."
+
+
+def _lotes(lector, batch_size, resumen):
+    """
+    Agrupa las filas del lector en lotes. Si el archivo no se puede seguir
+    leyendo (CSV mal formado o bytes que no son UTF-8), entrega las filas
+    leídas hasta ahí y deja el error en ``resumen``: los lotes anteriores ya
+    quedaron guardados.
+    """
+    # La línea 1 es el encabezado
+    filas = enumerate(lector, start=2)
+    siguiente = 2
+    while True:
+        lote = []
+        try:
+            for numero, fila in islice(filas, batch_size):
+                lote.append((numero, fila))
+                siguiente = numero + 1
+        except (csv.Error, UnicodeDecodeError) as error:
+            resumen['error'] = {'fila': siguiente, 'detalle': _error_de_lectura(error)}
+            if lote:
+                yield lote
+            return
+        if not lote:
+            return
+        yield lote
+
+
+def importar(archivo, tipo, batch_size=BATCH_SIZE, procesos=None):
+    """
+    Importa el CSV ``archivo`` (objeto de texto abierto) del ``tipo`` indicado
+    (``residentes``, ``gastos`` o ``multas``). Retorna un resumen con la
+    cantidad de filas creadas y los errores por fila. Si la lectura se
+    interrumpe a mitad del archivo, el resumen incluye ``error`` con la fila
+    donde se detuvo; lo importado hasta ahí queda guardado.
+    """
+    if tipo not in IMPORTADORES:
+        raise ValidationError({"tipo": f"Tipo inválido. Opciones: {', '.join(IMPORTADORES)}."})
+    validar, guardar = IMPORTADORES[tipo]
+    obligatorias, opcionales = FORMATOS[tipo]
+
+    lector = csv.DictReader(archivo)
+    try:
+        encabezado = [columna.strip() for columna in lector.fieldnames or []]
+    except (csv.Error, UnicodeDecodeError) as error:
+        raise ValidationError({"archivo": _error_de_lectura(error)})
+    faltantes = [columna for columna in obligatorias if columna not in encabezado]
+    if faltantes:
+        raise ValidationError({"archivo": f"Faltan columnas obligatorias: {', '.join(faltantes)}."})
+    lector.fieldnames = encabezado
+
+    resumen = {
+        'tipo': tipo,
+        'procesadas': 0,
+        'creados': 0,
+        'total_errores': 0,
+        'errores': [],
+        'columnas_ignoradas': [c for c in encabezado if c not in obligatorias + opcionales],
+    }
+    estado = {'usernames': set()}
+    with (_pool_hash(procesos) if tipo == 'residentes' else nullcontext(None)) as pool:
+        for lote in _lotes(lector, batch_size, resumen):
+            validas, errores = validar(lote, estado)
+            if validas:
+                with transaction.atomic():
+                    creados, rechazadas = guardar(validas, pool)
+                resumen['creados'] += len(creados)
+                errores = sorted(errores + rechazadas, key=lambda error: error[0])
+            resumen['procesadas'] += len(lote)
+            resumen['total_errores'] += len(errores)
+            espacio = MAX_ERRORES_REPORTADOS - len(resumen['errores'])
+            resumen['errores'].extend(
+                {'fila': numero, 'errores': problemas} for numero, problemas in errores[:max(espacio, 0)]
+            )
+    return resumen
@@ -0,0 +1,153 @@
+"""
+Camino de lectura rápido para los listados de alto volumen.
+
+``ModelSerializer`` instancia un modelo por fila y recorre sus campos con toda
+la maquinaria de DRF. ``Lector`` produce exactamente el mismo JSON a partir de
+las tuplas de ``values_list()``: al crearse resuelve una vez, con los campos del
+propio serializador, qué columna lee cada campo y cómo se convierte su valor.
+Los campos que ya salen de la base de datos en su forma final (ids, textos,
+enteros, booleanos) se copian sin llamar a ningún conversor, y las fechas con
+hora se convierten por columna con una sola consulta de la zona horaria.
+"""
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Campos de DRF cuyo to_representation no cambia valores del tipo que entrega
+# la columna correspondiente
+_SIN_CONVERSION = (
+    (serializers.PrimaryKeyRelatedField, (models.ForeignKey,)),
+    (serializers.ChoiceField, (models.CharField,)),
+    (serializers.CharField, (models.CharField, models.TextField)),
+    (serializers.IntegerField, (models.AutoField, models.BigAutoField, models.IntegerField)),
+    (serializers.BooleanField, (models.BooleanField,)),
+)
+
+
+def _fechas_hora_iso(campo_serializador):
+    """
+    Versión por columna de ``DateTimeField.to_representation`` en formato ISO
+    8601: la zona horaria se obtiene una vez por listado y no por fila.
+    """
+    def convertir(valores):
+        zona = timezone.get_current_timezone()
+        resultado = []
+        for valor in valores:
+            if valor is None:
+                resultado.append(None)
+            elif valor.tzinfo is None:
+                resultado.append(campo_serializador.to_representation(valor))
+            else:
+                texto = valor.astimezone(zona).isoformat()
+                resultado.append(texto[:-6] + 'Z' if texto.endswith('+00:00') else texto)
+        return resultado
+    return convertir
+
+
+def _convertidor(campo_serializador, campo_modelo):
+    """
+    Retorna ``(conversor, por_columna)``: ``None`` si el valor se copia tal cual,
+    una función por valor o, con ``por_columna``, una función sobre la lista de
+    valores de la columna.
+    """
+    for tipo_serializador, tipos_modelo in _SIN_CONVERSION:
+        if isinstance(campo_serializador, tipo_serializador) and isinstance(campo_modelo, tipos_modelo):
+            if isinstance(campo_serializador, serializers.PrimaryKeyRelatedField) and campo_serializador.pk_field:
+                break
+            return None, False
+    if (
+        isinstance(campo_serializador, serializers.DateTimeField)
+        and settings.USE_TZ
+        and not hasattr(campo_serializador, 'timezone')
+        and (getattr(campo_serializador, 'format', api_settings.DATETIME_FORMAT) or '').lower() == ISO_8601
+    ):
+        return _fechas_hora_iso(campo_serializador), True
+    return campo_serializador.to_representation, False
+
+
+class Lector:
+    """
+    Serializa filas de ``values_list(*lector.columnas)`` igual que ``serializer_class``.
+
+    ``calculados`` reemplaza los ``SerializerMethodField`` por funciones que
+    reciben la lista de valores de una columna y retornan la lista de resultados,
+    de modo que se calculan en una sola pasada: ``{'campo': ('columna', funcion)}``.
+    """
+
+    def __init__(self, serializer_class, calculados=None):
+        self.serializer_class = serializer_class
+        self.calculados = calculados or {}
+        self._plan = None
+
+    def _compilar(self):
+        # Se compila en el primer uso: los campos de DRF requieren las apps cargadas
+        modelo = self.serializer_class.Meta.model
+        columnas = []
+        plan = []
+
+        def indice(nombre_columna):
+            attname = modelo._meta.get_field(nombre_columna).attname
+            if attname not in columnas:
+                columnas.append(attname)
+            return columnas.index(attname)
+
+        for nombre, campo in self.serializer_class().fields.items():
+            if campo.write_only:
+                continue
+            if nombre in self.calculados:
+                columna, funcion = self.calculados[nombre]
+                plan.append((nombre, indice(columna), funcion, True))
+                continue
+            if isinstance(campo, serializers.SerializerMethodField) or '.' in campo.source:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{nombre} necesita una función en 'calculados'."
+                )
+            campo_modelo = modelo._meta.get_field(campo.source)
+            plan.append((nombre, indice(campo.source), *_convertidor(campo, campo_modelo)))
+        self._plan = (columnas, plan)
+        return self._plan
+
+    @property
+    def columnas(self):
+        return (self._plan or self._compilar())[0]
+
+    def serializar(self, filas):
+        columnas, plan = self._plan or self._compilar()
+        filas = filas if isinstance(filas, list) else list(filas)
+        valores_por_campo = []
+        for nombre, indice, conversor, por_columna in plan:
+            valores = [fila[indice] for fila in filas]
+            if por_columna:
+                valores = conversor(valores)
+            elif conversor is not None:
+                valores = [None if valor is None else conversor(valor) for valor in valores]
+            valores_por_campo.append(valores)
+        nombres = [nombre for nombre, _, _, _ in plan]
+        return [dict(zip(nombres, fila)) for fila in zip(*valores_por_campo)] if filas else []
+
+    def listar(self, vista, queryset):
+        """
+        Respuesta de una acción de listado de ``vista`` (un ``GenericAPIView``),
+        con la paginación de la vista si el cliente la pidió.
+        """
+        # El paginador keyset arma el cursor con las columnas del ordenamiento
+        ordenamiento = getattr(vista, 'keyset_ordering', None) or queryset.query.order_by \
+            or queryset.model._meta.ordering
+        extra = [
+            queryset.model._meta.get_field(nombre.lstrip('-')).attname
+            for nombre in ordenamiento if isinstance(nombre, str) and nombre.lstrip('-') not in ('pk', '?')
+        ]
+        pagina = vista.paginate_queryset(
+            queryset.values(*self.columnas, *[c for c in extra if c not in self.columnas])
+        )
+        if pagina is not None:
+            tuplas = list(map(itemgetter(*self.columnas), pagina)) if len(self.columnas) > 1 \
+                else [(fila[self.columnas[0]],) for fila in pagina]
+            return vista.get_paginated_response(self.serializar(tuplas))
+        return Response(self.serializar(queryset.values_list(*self.columnas)))
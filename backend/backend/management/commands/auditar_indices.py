@@ -0,0 +1,157 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from usuarios.models import Usuario
+
+# (ruta, rol que la consulta, scan completo esperado)
+# Las estadísticas agregan toda la tabla, por lo que un scan es inevitable.
+ENDPOINTS = [
+    ('/api/gastocomun/', 'admin', False),
+    ('/api/gastocomun/', 'residente', False),
+    ('/api/gastocomun/pendientes/', 'admin', False),
+    ('/api/gastocomun/pendientes/', 'residente', False),
+    ('/api/gastocomun/pagados/', 'admin', False),
+    ('/api/gastocomun/pagados/', 'residente', False),
+    ('/api/gastocomun/estadisticas/', 'admin', True),
+    ('/api/multas/', 'admin', False),
+    ('/api/multas/', 'residente', False),
+    ('/api/multas/estadisticas/', 'admin', True),
+    ('/api/notificaciones/', 'admin', False),
+    ('/api/notificaciones/', 'residente', False),
+    ('/api/notificaciones/contador/', 'admin', False),
+    ('/api/notificaciones/contador/', 'residente', False),
+    ('/api/usuarios/lista/', 'admin', False),
+    ('/api/usuarios/residentes/', 'admin', False),
+    ('/api/usuarios/estadisticas/', 'admin', True),
+]
+
+
+def _analizar_sqlite(filas, acotada):
+    scans, avisos = [], []
+    detalles = [fila[-1] for fila in filas]
+    ordena_en_memoria = any('USE TEMP B-TREE FOR ORDER BY' in detalle for detalle in detalles)
+    for detalle in detalles:
+        if detalle.startswith('SCAN ') and 'USING' not in detalle and 'CONSTANT ROW' not in detalle:
+            if acotada and not ordena_en_memoria:
+                # Recorre la tabla en el orden de la clave primaria y se detiene en el LIMIT
+                avisos.append(f'{detalle} (acotado por LIMIT)')
+            else:
+                scans.append(detalle)
+        elif 'USE TEMP B-TREE FOR ORDER BY' in detalle:
+            avisos.append(detalle)
+    return scans, avisos
+
+
+def _analizar_mysql(filas, columnas):
+    scans, avisos = [], []
+    for fila in filas:
+        datos = dict(zip(columnas, fila))
+        if datos.get('type') == 'ALL':
+            scans.append(f"tabla {datos.get('table')} (type=ALL, rows={datos.get('rows')})")
+        if 'filesort' in (datos.get('Extra') or ''):
+            avisos.append(f"tabla {datos.get('table')}: {datos.get('Extra')}")
+    return scans, avisos
+
+
+def _analizar_postgresql(filas):
+    scans, avisos = [], []
+    for (linea,) in filas:
+        if 'Seq Scan' in linea:
+            scans.append(linea.strip())
+        elif linea.strip().startswith('Sort'):
+            avisos.append(linea.strip())
+    return scans, avisos
+
+
+def explicar(sql):
+    """Ejecuta EXPLAIN sobre una consulta y retorna ``(scans_completos, avisos)``."""
+    prefijo = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefijo} {sql}')
+        filas = cursor.fetchall()
+        columnas = [columna[0] for columna in cursor.description]
+    if connection.vendor == 'sqlite':
+        return _analizar_sqlite(filas, acotada=' LIMIT ' in sql.upper())
+    if connection.vendor == 'mysql':
+        return _analizar_mysql(filas, columnas)
+    if connection.vendor == 'postgresql':
+        return _analizar_postgresql(filas)
+    raise CommandError(f"Motor de base de datos no soportado: {connection.vendor}")
+
+
+def _host():
+    """
+    Host para las solicitudes simuladas: los listados paginados arman URLs
+    absolutas, que validan el host contra ``ALLOWED_HOSTS``. Con la lista vacía
+    (o ``*``) Django acepta ``localhost`` en DEBUG.
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta las acciones de lectura de los viewsets, captura las consultas "
+        "que generan y corre EXPLAIN sobre cada una, señalando los scans completos. "
+        "Conviene correrlo sobre una base con datos representativos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=50,
+                            help='Tamaño de página usado en los listados (0 para la lista completa).')
+        parser.add_argument('--fallar', action='store_true',
+                            help='Terminar con error si hay scans completos no esperados (útil antes de un deploy).')
+
+    def handle(self, *args, **options):
+        usuarios = {
+            'admin': Usuario.objects.filter(rol='admin', is_active=True).order_by('id').first(),
+            'residente': Usuario.objects.filter(rol='residente', is_active=True).order_by('id').first(),
+        }
+        factory = APIRequestFactory()
+        parametros = {'page_size': options['page_size']} if options['page_size'] else {}
+
+        problemas = 0
+        for ruta, rol, scan_esperado in ENDPOINTS:
+            usuario = usuarios[rol]
+            if usuario is None:
+                self.stdout.write(self.style.WARNING(f"{ruta} [{rol}]: sin usuarios con ese rol, se omite"))
+                continue
+
+            request = factory.get(ruta, parametros, HTTP_HOST=_host())
+            force_authenticate(request, user=usuario)
+            match = resolve(ruta)
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = match.func(request, *match.args, **match.kwargs)
+                # Las respuestas del cache de listados ya vienen renderizadas
+                if hasattr(respuesta, 'render'):
+                    respuesta.render()
+
+            self.stdout.write(f"{ruta} [{rol}] -> {respuesta.status_code}, {len(consultas)} consultas")
+            for consulta in consultas.captured_queries:
+                sql = consulta['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                scans, avisos = explicar(sql)
+                for aviso in avisos:
+                    self.stdout.write(f"    aviso: {aviso}")
+                for scan in scans:
+                    if scan_esperado:
+                        self.stdout.write(f"    scan completo (esperado): {scan}")
+                    else:
+                        problemas += 1
+                        self.stdout.write(self.style.ERROR(f"    SCAN COMPLETO: {scan}"))
+                        self.stdout.write(f"      {sql[:300]}")
+
+        if problemas:
+            mensaje = f"Se encontraron {problemas} scans completos no esperados."
+            if options['fallar']:
+                raise CommandError(mensaje)
+            self.stdout.write(self.style.WARNING(mensaje))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin scans completos no esperados."))
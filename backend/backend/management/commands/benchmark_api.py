@@ -0,0 +1,110 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from backend import carga
+
+
+def _git(*argumentos):
+    try:
+        return subprocess.run(
+            ['git', *argumentos], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de la API: crea un condominio sintético reproducible "
+        "(usuarios carga-*) y recorre los endpoints reales con clientes "
+        "concurrentes. Reporta en JSON latencias p50/p95/p99, solicitudes por "
+        "segundo y consultas por solicitud, junto con el commit y la base de "
+        "datos, para comparar entre commits (--comparar). Usa una base de "
+        "datos dedicada (SQLite o MySQL local): el escenario pagar modifica datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--residentes', type=int, default=50)
+        parser.add_argument('--meses', type=int, default=12,
+                            help='Meses de historia de gastos, multas y notificaciones.')
+        parser.add_argument('--multas-por-mes', type=float, default=0.3,
+                            help='Probabilidad de que un residente reciba una multa cada mes.')
+        parser.add_argument('--notificaciones-por-mes', type=int, default=4,
+                            help='Notificaciones por residente (y compartidas con los administradores) por mes.')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--escenarios', default=','.join(carga.ESCENARIOS),
+                            help=f"Separados por coma. Opciones: {', '.join(carga.ESCENARIOS)}.")
+        parser.add_argument('--clientes', type=int, default=8, help='Clientes concurrentes por escenario.')
+        parser.add_argument('--solicitudes', type=int, default=200, help='Solicitudes por escenario.')
+        parser.add_argument('--calentamiento', type=int, default=5,
+                            help='Solicitudes sin medir antes de cada escenario.')
+        parser.add_argument('--url', default=None,
+                            help='Enviar por HTTP a un servidor en ejecución (p. ej. http://localhost:8000) '
+                                 'con la misma base de datos y SECRET_KEY, en lugar de en el proceso.')
+        parser.add_argument('--sin-poblar', action='store_true',
+                            help='Reutilizar el condominio sintético existente.')
+        parser.add_argument('--conservar', action='store_true',
+                            help='No eliminar el condominio sintético al terminar.')
+        parser.add_argument('--salida', default=None, help='Guardar el reporte JSON en este archivo.')
+        parser.add_argument('--comparar', default=None, help='Reporte JSON anterior con el que comparar.')
+
+    def handle(self, *args, **options):
+        escenarios = [nombre.strip() for nombre in options['escenarios'].split(',') if nombre.strip()]
+        invalidos = [nombre for nombre in escenarios if nombre not in carga.ESCENARIOS]
+        if invalidos:
+            raise CommandError(f"Escenarios inválidos: {', '.join(invalidos)}. "
+                               f"Opciones: {', '.join(carga.ESCENARIOS)}.")
+        if options['clientes'] <= 0 or options['solicitudes'] <= 0:
+            raise CommandError("--clientes y --solicitudes deben ser mayores que 0.")
+        base = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    base = json.load(archivo)
+            except (OSError, ValueError) as error:
+                raise CommandError(f"No se pudo leer el reporte a comparar: {error}")
+
+        reporte = {
+            'commit': _git('rev-parse', '--short', 'HEAD'),
+            'cambios_sin_confirmar': bool(_git('status', '--porcelain', '--untracked-files=no')),
+            'fecha': timezone.now().isoformat(),
+            'base_de_datos': connection.vendor,
+            'modo': 'http' if options['url'] else 'proceso',
+            'parametros': {
+                clave: options[clave]
+                for clave in ('residentes', 'meses', 'multas_por_mes', 'notificaciones_por_mes',
+                              'semilla', 'clientes', 'solicitudes', 'calentamiento')
+            },
+        }
+        if not options['sin_poblar']:
+            reporte['datos'] = carga.poblar(
+                residentes=options['residentes'], meses=options['meses'],
+                multas_por_mes=options['multas_por_mes'],
+                notificaciones_por_mes=options['notificaciones_por_mes'], semilla=options['semilla'],
+            )
+        try:
+            reporte['escenarios'] = {}
+            for escenario in escenarios:
+                self.stderr.write(f"Escenario {escenario}...")
+                reporte['escenarios'][escenario] = carga.ejecutar(
+                    escenario, clientes=options['clientes'], solicitudes=options['solicitudes'],
+                    calentamiento=options['calentamiento'], url=options['url'],
+                )
+        except ValueError as error:
+            raise CommandError(str(error))
+        finally:
+            if not options['conservar']:
+                carga.limpiar()
+
+        if base is not None:
+            reporte['comparacion'] = {'commit_base': base.get('commit'), **carga.comparar(reporte, base)}
+        salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida + '\n')
+        self.stdout.write(salida)
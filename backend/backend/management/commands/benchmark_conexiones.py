@@ -0,0 +1,129 @@
+import copy
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+from backend.carga import percentil
+from backend.db import pool as pool_bd
+
+# Motor con pool -> motor original de Django
+MOTORES = {
+    'backend.db.mysql': 'django.db.backends.mysql',
+    'backend.db.sqlite3': 'django.db.backends.sqlite3',
+}
+MODOS = ('sin_pool', 'persistente', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de conectarse a la base de datos en cada solicitud: "
+        "conexión nueva por solicitud (CONN_MAX_AGE=0, el comportamiento "
+        "anterior), conexión persistente por hilo (CONN_MAX_AGE > 0, solo WSGI) "
+        "y pool de backend.db.pool. Cada solicitud simulada hace lo mismo que "
+        "Django (revisar la conexión al empezar y al terminar) más un SELECT 1. "
+        "Usa la base de datos 'default' (MySQL local o un archivo SQLite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=8, help='Hilos concurrentes.')
+        parser.add_argument('--solicitudes', type=int, default=200, help='Solicitudes por hilo y modo.')
+        parser.add_argument('--tamano', type=int, default=None,
+                            help='Conexiones del pool (por defecto POOL.TAMANO de la configuración).')
+
+    def handle(self, *args, **options):
+        base = copy.deepcopy(connections['default'].settings_dict)
+        motor = MOTORES.get(base['ENGINE'], base['ENGINE'])
+        if motor not in MOTORES.values():
+            raise CommandError(f"Motor no soportado: {base['ENGINE']}. Opciones: {', '.join(MOTORES.values())}.")
+        if motor.endswith('sqlite3') and (not base['NAME'] or str(base['NAME']) == ':memory:'):
+            raise CommandError("Con SQLite se necesita una base de datos en archivo.")
+        motor_pool = next(con_pool for con_pool, original in MOTORES.items() if original == motor)
+        configuracion_pool = {**pool_bd.CONFIGURACION, **(base.get('POOL') or {})}
+        if options['tamano']:
+            configuracion_pool['TAMANO'] = options['tamano']
+
+        configuraciones = {
+            'sin_pool': {'ENGINE': motor, 'CONN_MAX_AGE': 0, 'POOL': None},
+            'persistente': {'ENGINE': motor, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'POOL': None},
+            'pool': {'ENGINE': motor_pool, 'CONN_MAX_AGE': 0, 'POOL': configuracion_pool},
+        }
+        resultado = {
+            'base_de_datos': motor,
+            'clientes': options['clientes'],
+            'solicitudes_por_cliente': options['solicitudes'],
+            'tamano_pool': configuracion_pool['TAMANO'],
+            'modos': {},
+        }
+        for modo in MODOS:
+            settings_dict = {**base, **configuraciones[modo]}
+            resultado['modos'][modo] = self._medir(modo, settings_dict, options['clientes'], options['solicitudes'])
+        sin_pool = resultado['modos']['sin_pool']['solicitudes_por_segundo']
+        resultado['aceleracion_pool'] = round(resultado['modos']['pool']['solicitudes_por_segundo'] / sin_pool, 2)
+        self.stdout.write(json.dumps(resultado, indent=2))
+
+    def _medir(self, modo, settings_dict, clientes, solicitudes):
+        alias = f'benchmark-{modo}'
+        backend = load_backend(settings_dict['ENGINE'])
+        abiertas = [0]
+        latencias = []
+        errores = []
+        lock = threading.Lock()
+
+        def al_conectar(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    abiertas[0] += 1
+
+        def trabajar():
+            conexion = backend.DatabaseWrapper(copy.deepcopy(settings_dict), alias)
+            propias = []
+            try:
+                for _ in range(solicitudes):
+                    inicio = time.perf_counter()
+                    # Lo mismo que hace Django con request_started y request_finished
+                    conexion.close_if_unusable_or_obsolete()
+                    with conexion.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchall()
+                    conexion.close_if_unusable_or_obsolete()
+                    propias.append(time.perf_counter() - inicio)
+            except Exception as error:
+                errores.append(error)
+            finally:
+                conexion.close()
+            with lock:
+                latencias.extend(propias)
+
+        connection_created.connect(al_conectar)
+        try:
+            hilos = [threading.Thread(target=trabajar) for _ in range(clientes)]
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            duracion = time.perf_counter() - inicio
+        finally:
+            connection_created.disconnect(al_conectar)
+        if errores:
+            raise CommandError(f"{modo}: {errores[0]}")
+
+        latencias_ms = sorted(segundos * 1000 for segundos in latencias)
+        medicion = {
+            'solicitudes': len(latencias_ms),
+            'solicitudes_por_segundo': round(len(latencias_ms) / duracion, 2),
+            'latencia_ms': {f'p{p}': round(percentil(latencias_ms, p), 3) for p in (50, 95, 99)},
+            'conexiones_abiertas': abiertas[0],
+        }
+        if settings_dict['POOL']:
+            pool = pool_bd.obtener_pool(alias, settings_dict)
+            # Con el pool, connection_created se envía también al reutilizar una conexión
+            medicion['conexiones_abiertas'] = pool.estadisticas()['creadas']
+            medicion['pool'] = pool.estadisticas()
+            pool.cerrar()
+        return medicion
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+
+from usuarios import hashing
+from usuarios.models import Usuario
+
+PASSWORD = 'Benchmark.Login.2024'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide inicios de sesión por segundo (total y por núcleo) verificando "
+        "contraseñas en el hilo de la solicitud y en el pool de hashing, y sugiere "
+        "PASSWORD_HASH_ITERACIONES para un tiempo objetivo por hash."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duracion', type=float, default=3.0,
+                            help='Segundos que dura cada medición.')
+        parser.add_argument('--concurrencia', type=int, default=None,
+                            help='Solicitudes simultáneas contra el pool (por defecto, 4 por worker).')
+        parser.add_argument('--objetivo-ms', type=float, default=250.0,
+                            help='Tiempo objetivo por hash para sugerir las iteraciones.')
+        parser.add_argument('--vista', action='store_true',
+                            help='Medir también POST /api/token/ completo (usuario temporal, se revierte).')
+
+    def handle(self, *args, **options):
+        duracion = options['duracion']
+        nucleos = os.cpu_count() or 1
+        workers = hashing.workers()
+        concurrencia = options['concurrencia'] or workers * 4
+        encoded = make_password(PASSWORD)
+
+        inicio = time.perf_counter()
+        check_password(PASSWORD, encoded)
+        ms_por_hash = (time.perf_counter() - inicio) * 1000
+
+        secuencial = self._medir(lambda: check_password(PASSWORD, encoded), 1, duracion)
+        pool = self._medir(lambda: hashing.verificar(PASSWORD, encoded), concurrencia, duracion)
+
+        hasher = get_hasher()
+        resultado = {
+            'algoritmo': hasher.algorithm,
+            'iteraciones': getattr(hasher, 'iterations', None),
+            'ms_por_hash': round(ms_por_hash, 1),
+            'nucleos': nucleos,
+            'workers_pool': workers,
+            'concurrencia': concurrencia,
+            'secuencial_logins_por_segundo': round(secuencial, 2),
+            'pool_logins_por_segundo': round(pool, 2),
+            'pool_logins_por_segundo_por_nucleo': round(pool / min(workers, nucleos), 2),
+        }
+        if getattr(hasher, 'iterations', None):
+            sugeridas = hasher.iterations * options['objetivo_ms'] / ms_por_hash
+            resultado['iteraciones_sugeridas'] = max(10000, int(round(sugeridas, -4)))
+            resultado['objetivo_ms'] = options['objetivo_ms']
+        if options['vista']:
+            resultado['vista_logins_por_segundo'] = round(self._medir_vista(duracion), 2)
+
+        self.stdout.write(json.dumps(resultado, indent=2))
+
+    def _medir(self, funcion, hilos, duracion):
+        """Ejecuta ``funcion`` desde ``hilos`` hilos durante ``duracion`` segundos; retorna llamadas/s."""
+        contador = [0]
+        lock = threading.Lock()
+        limite = time.perf_counter() + duracion
+
+        def trabajar():
+            while time.perf_counter() < limite:
+                funcion()
+                with lock:
+                    contador[0] += 1
+
+        inicio = time.perf_counter()
+        if hilos == 1:
+            # En el hilo actual: comparte la conexión (y la transacción) de la base de datos
+            trabajar()
+            return contador[0] / (time.perf_counter() - inicio)
+        ejecutores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for ejecutor in ejecutores:
+            ejecutor.start()
+        for ejecutor in ejecutores:
+            ejecutor.join()
+        return contador[0] / (time.perf_counter() - inicio)
+
+    def _medir_vista(self, duracion):
+        # El usuario temporal vive en una transacción que se revierte al final
+        cliente = Client()
+        with transaction.atomic():
+            Usuario.objects.create_user('benchmark-login', password=PASSWORD)
+            llamar = lambda: cliente.post(
+                '/api/token/', {'username': 'benchmark-login', 'password': PASSWORD},
+                content_type='application/json', HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0]
+            )
+            por_segundo = self._medir(llamar, 1, duracion)
+            transaction.set_rollback(True)
+        return por_segundo
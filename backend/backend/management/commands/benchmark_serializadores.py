@@ -0,0 +1,100 @@
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from gastocomun.models import GastoComun
+from gastocomun.serializers import GastoComunSerializer, LECTOR_GASTOS
+from multas.models import Multa
+from multas.serializers import MultaSerializer, LECTOR_MULTAS
+from notificaciones.models import Notificacion
+from notificaciones.serializers import NotificacionSerializer, LECTOR_NOTIFICACIONES
+from usuarios.models import Usuario
+
+# Antigüedades de las notificaciones: cubren todos los tramos de tiempo_relativo
+ANTIGUEDADES = [timedelta(0), timedelta(minutes=10), timedelta(hours=5), timedelta(days=3), timedelta(days=60)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas por segundo de los serializadores de DRF y del camino de "
+        "lectura rápido (backend.lectura) en los listados de gastos, multas y "
+        "notificaciones, y verifica que ambos produzcan el mismo JSON. Los datos "
+        "de prueba se crean en una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=5000,
+                            help='Filas de prueba por listado.')
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help='Mediciones por serializador; se informa la mejor.')
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        repeticiones = options['repeticiones']
+        with transaction.atomic():
+            residente = self._poblar(filas)
+            casos = [
+                ('gastos', GastoComun.objects.filter(residente=residente), GastoComunSerializer, LECTOR_GASTOS),
+                ('multas', Multa.objects.filter(residente=residente), MultaSerializer, LECTOR_MULTAS),
+                ('notificaciones', Notificacion.objects.filter(usuario=residente),
+                 NotificacionSerializer, LECTOR_NOTIFICACIONES),
+            ]
+            resultado = {'filas': filas}
+            for nombre, queryset, serializer_class, lector in casos:
+                resultado[nombre] = self._comparar(queryset, serializer_class, lector, repeticiones)
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(resultado, indent=2))
+
+    def _poblar(self, filas):
+        residente = Usuario.objects.create_user('benchmark-serializadores', rol='residente')
+        hoy = timezone.localdate()
+        GastoComun.objects.bulk_create([
+            GastoComun(residente=residente, concepto=f'Gasto {i}', descripcion='Benchmark',
+                       monto=Decimal('45000.50'), fecha_emision=hoy, fecha_vencimiento=hoy)
+            for i in range(filas)
+        ], batch_size=1000)
+        Multa.objects.bulk_create([
+            Multa(residente=residente, motivo=f'Multa {i}', descripcion='Benchmark', precio=Decimal('15000'))
+            for i in range(filas)
+        ], batch_size=1000)
+        Notificacion.objects.bulk_create([
+            Notificacion(usuario=residente, tipo='sistema', titulo=f'Aviso {i}', mensaje='Benchmark', objeto_id=i)
+            for i in range(filas)
+        ], batch_size=1000)
+        # auto_now_add ignora la fecha indicada: se reparte después por tramos de objeto_id
+        ahora = timezone.now()
+        tramo = -(-filas // len(ANTIGUEDADES))
+        for indice, antiguedad in enumerate(ANTIGUEDADES):
+            Notificacion.objects.filter(
+                usuario=residente, objeto_id__gte=indice * tramo, objeto_id__lt=(indice + 1) * tramo
+            ).update(fecha_creacion=ahora - antiguedad)
+        return residente
+
+    def _comparar(self, queryset, serializer_class, lector, repeticiones):
+        drf = lambda: serializer_class(list(queryset), many=True).data
+        rapido = lambda: lector.serializar(queryset.values_list(*lector.columnas))
+        if JSONRenderer().render(drf()) != JSONRenderer().render(rapido()):
+            raise CommandError(f"{serializer_class.__name__}: el camino rápido no produce el mismo JSON.")
+        filas = queryset.count()
+        por_segundo_drf = filas / self._mejor_tiempo(drf, repeticiones)
+        por_segundo_rapido = filas / self._mejor_tiempo(rapido, repeticiones)
+        return {
+            'drf_filas_por_segundo': round(por_segundo_drf),
+            'lectura_filas_por_segundo': round(por_segundo_rapido),
+            'aceleracion': round(por_segundo_rapido / por_segundo_drf, 2),
+        }
+
+    def _mejor_tiempo(self, funcion, repeticiones):
+        """Incluye la consulta: es lo que paga cada solicitud de listado."""
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return min(tiempos)
@@ -0,0 +1,341 @@
+"""
+Instrumentación por solicitud: tiempo total, cantidad de consultas y tiempo en
+la base de datos por vista y acción.
+
+``MetricasMiddleware`` mide cada solicitud y:
+
+* agrega la cabecera ``Server-Timing`` (``app`` y ``db``), que el navegador
+  muestra en la pestaña de red;
+* acumula histogramas por endpoint (nombre de la ruta, p. ej.
+  ``gastocomun-estadisticas``, y método HTTP) que se exponen en formato de
+  texto de Prometheus en ``/api/metricas/``. Son acumulativos, como espera
+  Prometheus: las ventanas móviles se obtienen con ``rate()`` al consultarlos;
+* registra las consultas más lentas que ``METRICAS_CONSULTA_LENTA_MS`` en el
+  logger ``backend.metricas`` (una muestra de ``METRICAS_CONSULTA_LENTA_MUESTREO``)
+  y guarda las últimas en ``/api/metricas/consultas-lentas/``.
+
+Las consultas se cuentan con un ``execute_wrapper`` instalado en cada conexión,
+que suma a la medición de la solicitud en curso (una ``ContextVar``, así que
+también cuenta las consultas de vistas async hechas con ``sync_to_async``). Las
+respuestas por partes (exportaciones, SSE) solo se cuentan por código de
+estado: el middleware termina cuando la vista entrega la respuesta, antes de
+que se generen las partes y sus consultas, así que su duración y consultas no
+entran en los histogramas.
+
+También se exponen el tamaño, las conexiones en uso y las esperas del pool de
+conexiones (``backend.db.pool``). Los histogramas viven en la memoria de cada
+proceso: con varios workers cada uno expone los suyos.
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from backend.db import pool as pool_bd
+from usuarios.permissions import IsAdminUser
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = 'cuentas_claras'
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Largo máximo del SQL registrado de una consulta lenta y cuántas se guardan
+MAX_SQL = 2000
+MAX_CONSULTAS_LENTAS = 100
+
+# Estadísticas del pool de conexiones (backend.db.pool): (métrica, tipo, ayuda, clave)
+METRICAS_POOL = [
+    ('bd_pool_tamano', 'gauge', 'Conexiones máximas del pool.', 'tamano'),
+    ('bd_pool_en_uso', 'gauge', 'Conexiones del pool en uso.', 'en_uso'),
+    ('bd_pool_inactivas', 'gauge', 'Conexiones del pool abiertas y libres.', 'inactivas'),
+    ('bd_pool_creadas_total', 'counter', 'Conexiones abiertas por el pool.', 'creadas'),
+    ('bd_pool_reutilizadas_total', 'counter', 'Conexiones entregadas desde el pool sin abrir una nueva.', 'reutilizadas'),
+    ('bd_pool_descartadas_total', 'counter', 'Conexiones cerradas por el pool.', 'descartadas'),
+    ('bd_pool_esperas_total', 'counter', 'Veces que se esperó una conexión libre.', 'esperas'),
+    ('bd_pool_espera_segundos_total', 'counter', 'Segundos esperando conexiones libres.', 'espera_total_s'),
+    ('bd_pool_agotado_total', 'counter', 'Esperas que vencieron sin conexión libre.', 'agotado'),
+]
+
+_actual = ContextVar('metricas_solicitud', default=None)
+
+
+class _Medicion:
+    __slots__ = ('consultas', 'segundos_bd', 'lentas')
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos_bd = 0.0
+        self.lentas = []
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        segundos = time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.segundos_bd += segundos
+        if segundos * 1000 >= settings.METRICAS_CONSULTA_LENTA_MS:
+            # Sin parámetros: pueden contener datos personales
+            medicion.lentas.append((segundos, sql))
+
+
+def _instalar(connection, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+# Las conexiones nuevas (también las de los hilos de sync_to_async) se instrumentan al abrirse
+connection_created.connect(_instalar, dispatch_uid='metricas-consultas')
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(**etiquetas):
+    return '{%s}' % ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in etiquetas.items())
+
+
+class _Histograma:
+    __slots__ = ('limites', 'cuentas', 'suma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        indice = bisect_left(self.limites, valor)
+        if indice < len(self.limites):
+            self.cuentas[indice] += 1
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            yield f'{nombre}_bucket{_etiquetas(**etiquetas, le=limite)} {acumulado}'
+        yield f'{nombre}_bucket{_etiquetas(**etiquetas, le="+Inf")} {self.total}'
+        yield f'{nombre}_sum{_etiquetas(**etiquetas)} {round(self.suma, 6)}'
+        yield f'{nombre}_count{_etiquetas(**etiquetas)} {self.total}'
+
+
+class _Serie:
+    """Métricas de un endpoint (vista y método)."""
+    __slots__ = ('duracion', 'consultas', 'segundos_bd', 'codigos', 'lentas')
+
+    def __init__(self):
+        self.duracion = _Histograma(BUCKETS_SEGUNDOS)
+        self.consultas = _Histograma(BUCKETS_CONSULTAS)
+        self.segundos_bd = 0.0
+        self.codigos = {}
+        self.lentas = 0
+
+
+class Registro:
+    """Histogramas por endpoint del proceso, seguros entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._consultas_lentas = deque(maxlen=MAX_CONSULTAS_LENTAS)
+
+    def observar(self, vista, metodo, codigo, segundos, medicion):
+        """Con ``segundos`` en ``None`` (respuesta por partes) solo se cuenta el código."""
+        with self._lock:
+            serie = self._series.get((vista, metodo))
+            if serie is None:
+                serie = self._series[(vista, metodo)] = _Serie()
+            if segundos is not None:
+                serie.duracion.observar(segundos)
+                serie.consultas.observar(medicion.consultas)
+            serie.segundos_bd += medicion.segundos_bd
+            serie.codigos[codigo] = serie.codigos.get(codigo, 0) + 1
+            serie.lentas += len(medicion.lentas)
+
+    def registrar_lenta(self, vista, segundos, sql):
+        with self._lock:
+            self._consultas_lentas.append({
+                'fecha': timezone.now(),
+                'vista': vista,
+                'ms': round(segundos * 1000, 2),
+                'sql': sql,
+            })
+
+    def consultas_lentas(self):
+        with self._lock:
+            return list(reversed(self._consultas_lentas))
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+            self._consultas_lentas.clear()
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            series = sorted(self._series.items())
+            duracion, consultas, bd, respuestas, lentas = [], [], [], [], []
+            for (vista, metodo), serie in series:
+                etiquetas = {'vista': vista, 'metodo': metodo}
+                duracion.extend(serie.duracion.lineas(f'{PREFIJO}_solicitud_segundos', etiquetas))
+                consultas.extend(serie.consultas.lineas(f'{PREFIJO}_solicitud_consultas', etiquetas))
+                bd.append(f'{PREFIJO}_solicitud_bd_segundos_total{_etiquetas(**etiquetas)} '
+                          f'{round(serie.segundos_bd, 6)}')
+                respuestas.extend(
+                    f'{PREFIJO}_respuestas_total{_etiquetas(**etiquetas, codigo=codigo)} {cuenta}'
+                    for codigo, cuenta in sorted(serie.codigos.items())
+                )
+                lentas.append(f'{PREFIJO}_consultas_lentas_total{_etiquetas(**etiquetas)} {serie.lentas}')
+
+        bloques = [
+            ('solicitud_segundos', 'histogram', 'Duración de las solicitudes en segundos.', duracion),
+            ('solicitud_consultas', 'histogram', 'Consultas a la base de datos por solicitud.', consultas),
+            ('solicitud_bd_segundos_total', 'counter', 'Segundos en la base de datos.', bd),
+            ('respuestas_total', 'counter', 'Respuestas por código de estado.', respuestas),
+            ('consultas_lentas_total', 'counter',
+             f'Consultas de al menos {settings.METRICAS_CONSULTA_LENTA_MS} ms.', lentas),
+        ]
+        pools = sorted(pool_bd.estadisticas().items())
+        for nombre, tipo, ayuda, clave in METRICAS_POOL:
+            bloques.append((nombre, tipo, ayuda, [
+                f'{PREFIJO}_{nombre}{_etiquetas(bd=alias)} {datos[clave]}' for alias, datos in pools
+            ]))
+        lineas = []
+        for nombre, tipo, ayuda, valores in bloques:
+            lineas.append(f'# HELP {PREFIJO}_{nombre} {ayuda}')
+            lineas.append(f'# TYPE {PREFIJO}_{nombre} {tipo}')
+            lineas.extend(valores)
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = Registro()
+
+
+def _vista(request):
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        # Sin ruta (404): una sola serie, para no crear una por cada URL inexistente
+        return 'sin_ruta'
+    return coincidencia.view_name or coincidencia._func_path
+
+
+class MetricasMiddleware:
+    """
+    Mide cada solicitud (ver el docstring del módulo). Va primero en
+    ``MIDDLEWARE`` para incluir el tiempo del resto de los middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_ACTIVO', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Conexiones de este hilo abiertas antes de cargar el middleware
+        for alias in connections:
+            _instalar(connections[alias])
+        medicion, inicio = _Medicion(), time.perf_counter()
+        token = _actual.set(medicion)
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._terminar(request, respuesta, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicion, inicio = _Medicion(), time.perf_counter()
+        token = _actual.set(medicion)
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._terminar(request, respuesta, medicion, time.perf_counter() - inicio)
+
+    def _terminar(self, request, respuesta, medicion, segundos):
+        vista = _vista(request)
+        REGISTRO.observar(
+            vista, request.method, respuesta.status_code, None if respuesta.streaming else segundos, medicion
+        )
+        muestreo = settings.METRICAS_CONSULTA_LENTA_MUESTREO
+        for segundos_consulta, sql in medicion.lentas:
+            if random.random() < muestreo:
+                sql = sql[:MAX_SQL]
+                logger.warning('Consulta lenta (%.1f ms) en %s %s: %s',
+                               segundos_consulta * 1000, request.method, vista, sql)
+                REGISTRO.registrar_lenta(vista, segundos_consulta, sql)
+        if settings.METRICAS_SERVER_TIMING:
+            respuesta['Server-Timing'] = (
+                f'app;dur={segundos * 1000:.1f}, '
+                f'db;dur={medicion.segundos_bd * 1000:.1f};desc="{medicion.consultas} consultas"'
+            )
+        return respuesta
+
+
+class TokenMetricas(BaseAuthentication):
+    """
+    Permite que Prometheus lea las métricas con ``Authorization: Bearer
+    <METRICAS_TOKEN>`` sin un JWT de administrador (que expira). Sin
+    ``METRICAS_TOKEN`` configurado no autentica a nadie.
+    """
+
+    def authenticate(self, request):
+        esperado = getattr(settings, 'METRICAS_TOKEN', None)
+        tipo, _, valor = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if esperado and tipo == 'Bearer' and constant_time_compare(valor, esperado):
+            return AnonymousUser(), 'metricas'
+        return None
+
+
+class PuedeVerMetricas(BasePermission):
+    """Administradores o el token de métricas."""
+
+    def has_permission(self, request, view):
+        return request.auth == 'metricas' or IsAdminUser().has_permission(request, view)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenMetricas, *api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+@permission_classes([PuedeVerMetricas])
+def metricas(request):
+    """Histogramas por endpoint en el formato de texto de Prometheus."""
+    return HttpResponse(REGISTRO.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view(['GET'])
+@authentication_classes([TokenMetricas, *api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+@permission_classes([PuedeVerMetricas])
+def consultas_lentas(request):
+    """Últimas consultas lentas muestreadas (más recientes primero)."""
+    return Response(REGISTRO.consultas_lentas())
@@ -0,0 +1,207 @@
+"""
+Paginación por cursor (keyset) compartida por todos los endpoints de listado.
+
+A diferencia de la paginación por offset, cada página se obtiene filtrando por
+los valores de la última fila entregada (``WHERE (fecha, id) < (...)``), por lo
+que el costo de una página no depende de cuán profunda esté en el historial.
+"""
+import base64
+import json
+from collections import OrderedDict
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Construye ``(a, b, c) > (x, y, z)`` como OR de prefijos iguales, respetando
+    la dirección de cada columna del ordenamiento: las filas que siguen a la
+    que tiene ``values`` en ese orden (o la preceden, con ``reverse``).
+    """
+    condition = Q()
+    equal_prefix = Q()
+    for name, value in zip(ordering, values):
+        descending = name.startswith('-')
+        if reverse:
+            descending = not descending
+        column = name.lstrip('-')
+        lookup = 'lt' if descending else 'gt'
+        condition |= equal_prefix & Q(**{f'{column}__{lookup}': value})
+        equal_prefix &= Q(**{column: value})
+    return condition
+
+
+class _Fila:
+    """Expone una fila de ``values()`` como atributos, para ``Field.value_to_string``."""
+
+    def __init__(self, valores):
+        self.__dict__.update(valores)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginador keyset sobre el ``ordering`` del modelo con ``id`` como desempate.
+
+    La paginación es opcional: solo se activa cuando el cliente envía
+    ``?page_size=`` o ``?cursor=``. Sin esos parámetros la respuesta sigue
+    siendo la lista completa, para no romper a los clientes existentes.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_default_page_size(self):
+        return api_settings.PAGE_SIZE or 50
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.get_default_page_size()
+        if page_size <= 0:
+            return self.get_default_page_size()
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        """
+        Retorna el ordenamiento a usar, siempre terminado en la clave primaria
+        para que el cursor sea estable aunque haya fechas repetidas.
+        """
+        ordering = getattr(view, 'keyset_ordering', None)
+        if not ordering:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering or ['-pk']
+        ordering = [field for field in ordering if isinstance(field, str)]
+        if not ordering:
+            ordering = ['-pk']
+
+        pk_name = queryset.model._meta.pk.name
+        names = [field.lstrip('-') for field in ordering]
+        if 'pk' not in names and pk_name not in names:
+            prefix = '-' if ordering[0].startswith('-') else ''
+            ordering.append(f'{prefix}pk')
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.fields = [self._get_field(queryset.model, name) for name in self.ordering]
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['reverse']
+
+        if reverse:
+            queryset = queryset.order_by(*[self._invert(name) for name in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if cursor is not None:
+            queryset = queryset.filter(self._keyset_filter(cursor['values'], reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        # La página puede ser de instancias o de filas de values() (backend.lectura)
+        if isinstance(instance, dict):
+            instance = _Fila(instance)
+        values = [field.value_to_string(instance) for field in self.fields]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = replace_query_param(self.base_url, self.cursor_query_param, token)
+        return replace_query_param(url, self.page_size_query_param, self.page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(parse.unquote(encoded).encode('ascii')))
+            raw_values = payload['v']
+            if len(raw_values) != len(self.fields):
+                raise ValueError
+            values = [field.to_python(value) for field, value in zip(self.fields, raw_values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return {'values': values, 'reverse': bool(payload.get('r'))}
+
+    def _keyset_filter(self, values, reverse):
+        return keyset_filter(self.ordering, values, reverse)
+
+    @staticmethod
+    def _invert(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    @staticmethod
+    def _get_field(model, name):
+        name = name.lstrip('-')
+        if name == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+
+def paginar_lista(request, queryset, serializer_class, view=None):
+    """
+    Aplica ``KeysetPagination`` a vistas basadas en funciones.
+    Retorna la respuesta paginada o ``None`` si el cliente no pidió paginación.
+    """
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    if page is None:
+        return None
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
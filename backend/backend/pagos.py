@@ -0,0 +1,180 @@
+"""
+Pago en lote de gastos comunes o multas.
+
+Los cargos seleccionados se bloquean con ``select_for_update`` (en orden de id,
+para que dos pagos simultáneos no se bloqueen mutuamente), se validan todos y
+se marcan como pagados con un único UPDATE condicionado a ``estado='pendiente'``.
+Como el UPDATE masivo no dispara ``post_save``, los saldos, las versiones y las
+notificaciones se actualizan aquí: una notificación agregada por residente y
+una para los administradores, en lugar de una por cargo. Si algún cargo no
+puede pagarse no se paga ninguno.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from backend import versiones
+from estadocuenta import services as saldos
+from gastocomun.models import GastoComun
+from multas.models import Multa
+from notificaciones import services as notificaciones
+from usuarios.models import Usuario
+
+# Cargos por solicitud: acota el tiempo que se mantienen los bloqueos
+MAX_CARGOS = 100
+# Cargos que se nombran en el texto de la notificación; el resto se resume
+MAX_DETALLE_NOTIFICACION = 5
+
+TIPOS = {
+    'gastos': {
+        'modelo': GastoComun,
+        'campo_monto': 'monto',
+        'campo_detalle': 'concepto',
+        'estado_pagado': 'pagado',
+        'tipo_notificacion': 'gasto_pagado',
+        'objeto_tipo': 'gasto_comun',
+        'singular': 'gasto común',
+        'plural': 'gastos comunes',
+    },
+    'multas': {
+        'modelo': Multa,
+        'campo_monto': 'precio',
+        'campo_detalle': 'motivo',
+        'estado_pagado': 'pagada',
+        'tipo_notificacion': 'multa_pagada',
+        'objeto_tipo': 'multa',
+        'singular': 'multa',
+        'plural': 'multas',
+    },
+}
+
+
+class PagoRechazado(Exception):
+    """El lote no puede pagarse; ``datos`` es el cuerpo de la respuesta de error."""
+
+    def __init__(self, datos, status_code):
+        super().__init__(datos.get('error'))
+        self.datos = datos
+        self.status_code = status_code
+
+
+def leer_ids(datos):
+    """Valida ``{"ids": [...]}`` y retorna los ids sin repetir, en el orden recibido."""
+    ids = datos.get('ids') if hasattr(datos, 'get') else None
+    if not isinstance(ids, list) or not ids:
+        raise ValidationError({"ids": "Debes enviar una lista con los ids a pagar."})
+    if any(isinstance(valor, bool) or not isinstance(valor, int) for valor in ids):
+        raise ValidationError({"ids": "Los ids deben ser números enteros."})
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_CARGOS:
+        raise ValidationError({"ids": f"Máximo {MAX_CARGOS} cargos por pago."})
+    return ids
+
+
+def _cantidad(cantidad, config):
+    return f"{cantidad} {config['singular'] if cantidad == 1 else config['plural']}"
+
+
+def _detalle(cargos, config):
+    nombres = [cargo[config['campo_detalle']] for cargo in cargos[:MAX_DETALLE_NOTIFICACION]]
+    restantes = len(cargos) - len(nombres)
+    if restantes:
+        nombres.append(f"{restantes} más")
+    return ', '.join(nombres)
+
+
+def _notificar(tipo, cargos_por_residente, usernames):
+    config = TIPOS[tipo]
+    eventos = []
+    resumen_admins = []
+    for residente_id, cargos in cargos_por_residente.items():
+        total = sum((cargo[config['campo_monto']] for cargo in cargos), Decimal('0'))
+        objeto_id = cargos[0]['id'] if len(cargos) == 1 else None
+        eventos.append((config['tipo_notificacion'], objeto_id, config['objeto_tipo'], [
+            ([residente_id], 'Pago registrado correctamente',
+             f"Se registró el pago de {_cantidad(len(cargos), config)} por ${total}: {_detalle(cargos, config)}."),
+        ]))
+        resumen_admins.append(f"{usernames.get(residente_id, residente_id)} pagó "
+                              f"{_cantidad(len(cargos), config)} por ${total}")
+    eventos.append((config['tipo_notificacion'], None, config['objeto_tipo'], [
+        (notificaciones.AUDIENCIA_ADMINS, f"Pago de {config['plural']} registrado", '; '.join(resumen_admins) + '.'),
+    ]))
+    notificaciones.publicar_lote(eventos)
+
+
+def pagar_lote(tipo, ids, usuario):
+    """
+    Paga los cargos ``ids`` del ``tipo`` indicado (``gastos`` o ``multas``).
+    Los residentes solo pueden pagar sus propios cargos. Retorna el comprobante
+    del pago o lanza ``PagoRechazado`` sin modificar nada.
+    """
+    config = TIPOS[tipo]
+    modelo = config['modelo']
+    campo_monto, campo_detalle = config['campo_monto'], config['campo_detalle']
+    fecha_pago = timezone.now()
+
+    with transaction.atomic():
+        queryset = modelo.objects.filter(id__in=ids)
+        if usuario.rol != 'admin':
+            queryset = queryset.filter(residente_id=usuario.id)
+        cargos = list(
+            queryset.select_for_update().order_by('id')
+            .values('id', 'residente_id', 'estado', campo_detalle, campo_monto)
+        )
+
+        encontrados = {cargo['id'] for cargo in cargos}
+        faltantes = [cargo_id for cargo_id in ids if cargo_id not in encontrados]
+        if faltantes:
+            raise PagoRechazado({
+                "error": f"No se encontraron {config['plural']} con esos ids",
+                "ids": faltantes,
+            }, status.HTTP_404_NOT_FOUND)
+        no_pendientes = [cargo for cargo in cargos if cargo['estado'] != 'pendiente']
+        if no_pendientes:
+            raise PagoRechazado({
+                "error": f"Solo se pueden pagar {config['plural']} pendientes",
+                "no_pendientes": [{"id": cargo['id'], "estado": cargo['estado']} for cargo in no_pendientes],
+            }, status.HTTP_400_BAD_REQUEST)
+
+        actualizados = (
+            modelo.objects
+            .filter(id__in=ids, estado='pendiente')
+            .update(estado=config['estado_pagado'], fecha_pago=fecha_pago)
+        )
+        if actualizados != len(cargos):
+            # Sin bloqueo de filas (p. ej. SQLite) otro pago pudo adelantarse
+            raise PagoRechazado({
+                "error": "Algunos cargos cambiaron durante el pago, inténtalo nuevamente",
+            }, status.HTTP_409_CONFLICT)
+
+        saldos.registrar_cambios_estado(
+            tipo, [(cargo['residente_id'], cargo[campo_monto]) for cargo in cargos],
+            'pendiente', config['estado_pagado']
+        )
+        cargos_por_residente = defaultdict(list)
+        for cargo in cargos:
+            cargos_por_residente[cargo['residente_id']].append(cargo)
+        versiones.incrementar(tipo, cargos_por_residente)
+        usernames = dict(Usuario.objects.filter(id__in=cargos_por_residente).values_list('id', 'username'))
+        _notificar(tipo, cargos_por_residente, usernames)
+
+    return {
+        'tipo': tipo,
+        'fecha_pago': fecha_pago,
+        'cantidad': len(cargos),
+        'total': sum((cargo[campo_monto] for cargo in cargos), Decimal('0')),
+        'cargos': [
+            {
+                'id': cargo['id'],
+                'residente': cargo['residente_id'],
+                campo_detalle: cargo[campo_detalle],
+                campo_monto: cargo[campo_monto],
+                'estado': config['estado_pagado'],
+            }
+            for cargo in cargos
+        ],
+    }
@@ -30,13 +30,17 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     # Aplicaciones propias
+    'backend',
     'usuarios',
     'gastocomun',
     'multas',
     'notificaciones',
+    'estadocuenta',
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también al resto de los middleware
+    'backend.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -70,14 +74,32 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# El motor backend.db.mysql es el de Django más un pool acotado de conexiones
+# por proceso (backend.db.pool), compartido por los hilos WSGI y los de ASGI:
+# con CONN_MAX_AGE=0 Django "cierra" la conexión al final de cada solicitud y
+# el pool la conserva abierta para la siguiente. Sin la clave POOL se comporta
+# como django.db.backends.mysql; en ese caso conviene CONN_MAX_AGE > 0 (solo
+# con WSGI). CONN_HEALTH_CHECKS verifica las conexiones persistentes antes de
+# reutilizarlas; las del pool se verifican tras VERIFICAR_TRAS segundos inactivas.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'backend.db.mysql',
         'NAME': 'cuentas_claras_db',
         'USER': 'root',  # Cambia esto por tu usuario de MySQL
         'PASSWORD': 'big1727',  # Cambia esto por tu contraseña de MySQL
         'HOST': 'localhost',
         'PORT': '3306',
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        # Conexiones como máximo, segundos de espera por una libre antes de
+        # fallar, segundos de inactividad tras los que se verifica y vida
+        # máxima (menor que wait_timeout de MySQL)
+        'POOL': {
+            'TAMANO': 20,
+            'ESPERA': 5,
+            'VERIFICAR_TRAS': 10,
+            'VIDA_MAXIMA': 1800,
+        },
     }
 }
 
@@ -85,6 +107,48 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
+# Las contraseñas se verifican en un pool acotado de hilos (usuarios.hashing).
+# PASSWORD_HASH_ITERACIONES ajusta el costo de PBKDF2; al cambiarlo, cada
+# contraseña se rehashea en su próximo inicio de sesión.
+AUTHENTICATION_BACKENDS = ['usuarios.backends.HashPoolBackend']
+PASSWORD_HASHERS = [
+    'usuarios.hashers.PBKDF2AjustadoPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERACIONES = 600000
+# Hilos del pool (None: uno por CPU), hashes que pueden esperar en cola y
+# segundos de espera antes de responder 503
+HASHING_POOL_WORKERS = None
+HASHING_POOL_MAX_PENDIENTES = 64
+HASHING_POOL_ESPERA = 10
+# Snapshot del usuario autenticado (usuarios.autenticacion): alias de CACHES
+# y segundos de vida. Solo se guarda si el cache es compartido entre procesos;
+# con locmem se lee de la base de datos en cada solicitud
+USUARIOS_SNAPSHOT_CACHE = 'estado'
+USUARIOS_SNAPSHOT_TIMEOUT = 300
+# Versiones de gastos, multas y notificaciones para los ETag y el cache de
+# respuestas (backend.versiones); si el cache no es compartido no se usan
+VERSIONES_CACHE = 'estado'
+# Cache de respuestas de los listados de administradores: alias de CACHES,
+# límites del LRU y segundos de vida de cada entrada
+RESPUESTAS_CACHE_ACTIVO = True
+RESPUESTAS_CACHE = 'respuestas'
+RESPUESTAS_CACHE_MAX_ENTRADAS = 500
+RESPUESTAS_CACHE_MAX_BYTES = 50 * 1024 * 1024
+RESPUESTAS_CACHE_TIMEOUT = 600
+# Instrumentación por solicitud (backend.metricas): cabecera Server-Timing,
+# histogramas por endpoint en /api/metricas/ (formato Prometheus, solo
+# administradores o `Authorization: Bearer <METRICAS_TOKEN>`) y registro de
+# consultas lentas: umbral en milisegundos y fracción de ellas que se registra
+METRICAS_ACTIVO = True
+METRICAS_SERVER_TIMING = True
+METRICAS_CONSULTA_LENTA_MS = 100
+METRICAS_CONSULTA_LENTA_MUESTREO = 1.0
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -127,11 +191,14 @@ AUTH_USER_MODEL = 'usuarios.Usuario'
 # Configuración de REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'usuarios.autenticacion.JWTSnapshotAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Paginación keyset opcional: se activa con ?page_size= o ?cursor=
+    'DEFAULT_PAGINATION_CLASS': 'backend.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 # Configuración de JWT
@@ -151,5 +218,65 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Con varios procesos conviene un backend compartido, por ejemplo:
+# 'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_cuentas_claras'
+# (requiere `python manage.py createcachetable`).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cuentas-claras',
+    },
+    # Estado que se mantiene de forma incremental: versiones de los ETag,
+    # contadores de no leídas y snapshots de autenticación. Va aparte de
+    # 'default' para que el desalojo de otras claves (MAX_ENTRIES) no lo borre.
+    # Debe ser compartido entre procesos (Redis o Memcached): con locmem no se
+    # usan ETag, cache de respuestas, contadores ni snapshots, porque lo que
+    # escriben el worker del outbox y los comandos no llegaría a los demás
+    'estado': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'estado',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # Listados cacheados (backend.cache_respuestas); puede ser locmem, archivo o base de datos
+    'respuestas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'respuestas',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+# Notificaciones: los eventos se encolan en un outbox transaccional y los
+# procesa el comando `python manage.py procesar_notificaciones`.
+# Con False se crean de inmediato dentro de la solicitud.
+NOTIFICACIONES_OUTBOX = True
+# Alias de CACHES donde se guardan los contadores de no leídas. Debe ser un
+# cache compartido entre procesos (idealmente Redis o Memcached, con incr
+# atómico); con locmem el contador se calcula con COUNT en cada consulta.
+NOTIFICACIONES_CONTADOR_CACHE = 'estado'
+# Stream SSE (/api/notificaciones/stream/, solo por ASGI): segundos entre
+# heartbeats y duración máxima de cada conexión antes de que el cliente
+# reconecte. Las notificaciones del worker del outbox (otro proceso) se
+# detectan leyendo cada NOTIFICACIONES_SSE_SONDEO segundos su versión en
+# VERSIONES_CACHE, que debe ser compartido; si no, se consulta la base de
+# datos en cada heartbeat.
+NOTIFICACIONES_SSE_HEARTBEAT = 15
+NOTIFICACIONES_SSE_DURACION_MAXIMA = 1800
+NOTIFICACIONES_SSE_SONDEO = 2
+# Retención (`python manage.py archivar_notificaciones`): días que las
+# notificaciones leídas permanecen en la tabla activa; con un número, también
+# se archivan las no leídas más antiguas que ese límite (None: nunca). El
+# archivo es la tabla NotificacionArchivada ('tabla') o archivos JSONL
+# comprimidos ('jsonl') en NOTIFICACIONES_ARCHIVO_DIRECTORIO.
+NOTIFICACIONES_RETENCION_DIAS = 90
+NOTIFICACIONES_RETENCION_NO_LEIDAS_DIAS = 365
+NOTIFICACIONES_ARCHIVO = 'tabla'
+NOTIFICACIONES_ARCHIVO_DIRECTORIO = BASE_DIR / 'archivo' / 'notificaciones'
+
+# Importación CSV (`python manage.py importar_csv` y /api/usuarios/importar/):
+# procesos usados para hashear contraseñas; None usa uno por CPU
+IMPORTACION_PROCESOS_HASH = None
+
 # Configuración de CORS
 CORS_ALLOW_ALL_ORIGINS = True  # En producción, deberías especificar los orígenes permitidos
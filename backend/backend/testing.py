@@ -0,0 +1,69 @@
+"""
+Utilidades compartidas por las suites de tests de las aplicaciones.
+"""
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+def usar_cache_compartido(testcase, *ajustes):
+    """
+    Agrega durante el test un cache de archivos en un directorio temporal
+    (compartido entre procesos, como Redis o Memcached en producción) y apunta
+    a él los ajustes indicados, p. ej. ``NOTIFICACIONES_CONTADOR_CACHE``.
+    """
+    directorio = tempfile.TemporaryDirectory()
+    testcase.addCleanup(directorio.cleanup)
+    compartido = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio.name}
+    cambios = override_settings(
+        CACHES={**settings.CACHES, 'compartido_tests': compartido},
+        **{ajuste: 'compartido_tests' for ajuste in ajustes}
+    )
+    cambios.enable()
+    testcase.addCleanup(cambios.disable)
+
+
+class ConsultasConstantesMixin:
+    """
+    Verifica que una acción no haga más consultas a medida que crecen los datos
+    (detecta N+1 en serializadores, ``__str__`` o signals).
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Los caches (ids de admins, contadores) alteran la cantidad de consultas
+        for alias in caches:
+            caches[alias].clear()
+        # Y el cache de respuestas ocultaría las consultas de la vista
+        sin_cache = override_settings(RESPUESTAS_CACHE_ACTIVO=False)
+        sin_cache.enable()
+        self.addCleanup(sin_cache.disable)
+
+    def contar_consultas(self, peticion):
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = peticion()
+        return respuesta, contexto.captured_queries
+
+    def assertConsultasConstantes(self, peticion, agregar_filas, pocas=1, muchas=10):
+        """
+        Ejecuta ``peticion`` con ``pocas`` y luego con ``muchas`` filas agregadas
+        mediante ``agregar_filas(cantidad)`` y exige la misma cantidad de consultas.
+        Retorna la respuesta de la última ejecución.
+        """
+        agregar_filas(pocas)
+        peticion()  # Calentar caches que solo se llenan en la primera llamada
+        _, consultas_iniciales = self.contar_consultas(peticion)
+
+        agregar_filas(muchas)
+        respuesta, consultas_finales = self.contar_consultas(peticion)
+
+        if len(consultas_iniciales) != len(consultas_finales):
+            detalle = '\n'.join(consulta['sql'] for consulta in consultas_finales)
+            self.fail(
+                f"La cantidad de consultas creció con los datos: {len(consultas_iniciales)} "
+                f"con {pocas} filas y {len(consultas_finales)} con {pocas + muchas}.\n{detalle}"
+            )
+        return respuesta
@@ -0,0 +1,330 @@
+import os
+import tempfile
+import threading
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.db.utils import load_backend
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from gastocomun.models import GastoComun
+from usuarios.models import Usuario
+from . import carga, estadisticas, exportacion, metricas
+from .db import pool as pool_bd
+from .testing import ConsultasConstantesMixin
+
+ESTADOS_GASTO = [estado for estado, _ in GastoComun.ESTADOS]
+
+
+class PaginacionKeysetTest(TestCase):
+    def setUp(self):
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.client = APIClient()
+        self.client.force_authenticate(self.residente)
+        # Misma fecha de emisión en todas: el orden lo decide el desempate por id
+        GastoComun.objects.bulk_create([
+            GastoComun(residente=self.residente, concepto=f'Gasto {i}', descripcion='Mensual', monto=1000,
+                       fecha_emision=date(2024, 1, 1), fecha_vencimiento=date(2024, 1, 10))
+            for i in range(5)
+        ])
+        self.esperado = list(
+            GastoComun.objects.filter(residente=self.residente).order_by('-fecha_emision', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def ids(self, pagina):
+        return [fila['id'] for fila in pagina['results']]
+
+    def test_recorre_todas_las_filas_con_fechas_repetidas(self):
+        paginas = [self.client.get('/api/gastocomun/?page_size=2').json()]
+        while paginas[-1]['next']:
+            paginas.append(self.client.get(paginas[-1]['next']).json())
+
+        self.assertEqual([len(pagina['results']) for pagina in paginas], [2, 2, 1])
+        self.assertEqual([i for pagina in paginas for i in self.ids(pagina)], self.esperado)
+        self.assertIsNone(paginas[0]['previous'])
+
+        # Volver atrás desde la última página entrega exactamente la anterior
+        anterior = self.client.get(paginas[-1]['previous']).json()
+        self.assertEqual(self.ids(anterior), self.esperado[2:4])
+        self.assertEqual(self.ids(self.client.get(anterior['previous']).json()), self.esperado[:2])
+
+    def test_cursor_invalido(self):
+        for cursor in ('no-es-base64', 'eyJ2IjpbMV19', 'e30'):
+            with self.subTest(cursor=cursor):
+                respuesta = self.client.get(f'/api/gastocomun/?cursor={cursor}')
+                self.assertEqual(respuesta.status_code, 404)
+                self.assertEqual(respuesta.json()['detail'], 'Cursor inválido')
+
+    def test_sin_parametros_no_pagina(self):
+        respuesta = self.client.get('/api/gastocomun/')
+        self.assertEqual(sorted(fila['id'] for fila in respuesta.json()), sorted(self.esperado))
+
+
+class ExportacionTest(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        # Fechas repetidas: el cursor tiene que desempatar por id
+        GastoComun.objects.bulk_create([
+            GastoComun(residente=self.admin, concepto=f'Gasto {i}', descripcion='Mensual', monto=1000 + i,
+                       fecha_emision=date(2024, 1, 1 + i % 2), fecha_vencimiento=date(2024, 1, 10))
+            for i in range(7)
+        ])
+
+    def test_lotes_con_limit_en_el_orden_del_queryset(self):
+        for orden in (('fecha_emision', 'id'), ('-fecha_emision',), ()):
+            with self.subTest(orden=orden):
+                gastos = GastoComun.objects.order_by(*orden) if orden else GastoComun.objects.all()
+                # Sin orden explícito se usa el del modelo
+                esperado = list(
+                    gastos.order_by(*(orden or GastoComun._meta.ordering), 'id').values_list('id', 'concepto')
+                )
+                with CaptureQueriesContext(connection) as consultas:
+                    lotes = list(exportacion.lotes(gastos, ['id', 'concepto'], chunk_size=2))
+                self.assertEqual([len(lote) for lote in lotes], [2, 2, 2, 1])
+                self.assertEqual([fila for lote in lotes for fila in lote], esperado)
+                # Una consulta con LIMIT por lote, sin OFFSET
+                self.assertEqual(len(consultas), 4)
+                for consulta in consultas:
+                    self.assertIn('LIMIT 2', consulta['sql'])
+                    self.assertNotIn('OFFSET', consulta['sql'])
+
+    async def test_csv_con_generador_asincrono_bajo_asgi(self):
+        cabeceras = {'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'}
+        respuesta = await AsyncClient().get('/api/gastocomun/exportar/', headers=cabeceras)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.is_async)
+        contenido = b''.join([parte async for parte in respuesta.streaming_content])
+        lineas = contenido.decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 8)
+        self.assertEqual(lineas[0].split(',')[0], 'ID')
+
+
+class EstadisticasTest(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        self.residentes = [
+            Usuario.objects.create_user(f'residente-{i}', f'residente{i}@example.com', 'clave')
+            for i in range(2)
+        ]
+        # (residente, monto, estado, fecha de emisión)
+        filas = [
+            (0, 1000, 'pendiente', date(2024, 1, 5)),
+            (0, 2500, 'pagado', date(2024, 1, 20)),
+            (1, 1200, 'pagado', date(2024, 1, 7)),
+            (1, 3000, 'pendiente', date(2024, 2, 3)),
+            (0, 700, 'pendiente', date(2024, 3, 15)),
+        ]
+        GastoComun.objects.bulk_create([
+            GastoComun(residente=self.residentes[i], concepto='Gasto', descripcion='Mensual', monto=monto,
+                       estado=estado, fecha_emision=emision, fecha_vencimiento=emision)
+            for i, monto, estado, emision in filas
+        ])
+
+    def por_consulta(self, queryset):
+        """Los mismos agregados de ``resumen``, con una consulta por cada valor."""
+        fila = {'total': queryset.count()}
+        for estado in ESTADOS_GASTO:
+            del_estado = queryset.filter(estado=estado)
+            fila[f'total_{estado}'] = del_estado.count()
+            fila[f'monto_{estado}'] = del_estado.aggregate(suma=Sum('monto'))['suma'] or 0
+        return fila
+
+    def test_resumen_y_desgloses_iguales_a_consultas_separadas(self):
+        gastos = GastoComun.objects.all()
+        self.assertEqual(estadisticas.resumen(gastos, ESTADOS_GASTO, 'monto'), self.por_consulta(gastos))
+
+        mensual = estadisticas.desglose_mensual(gastos, 'fecha_emision', ESTADOS_GASTO, 'monto')
+        self.assertEqual([fila['mes'] for fila in mensual], ['2024-01', '2024-02', '2024-03'])
+        for fila in mensual:
+            anio, mes = map(int, fila.pop('mes').split('-'))
+            del_mes = gastos.filter(fecha_emision__year=anio, fecha_emision__month=mes)
+            self.assertEqual(fila, self.por_consulta(del_mes))
+
+        por_residente = estadisticas.desglose_por_residente(gastos, ESTADOS_GASTO, 'monto')
+        self.assertEqual([fila['residente'] for fila in por_residente], [r.id for r in self.residentes])
+        for fila, residente in zip(por_residente, self.residentes):
+            self.assertEqual(fila.pop('username'), residente.username)
+            fila.pop('residente')
+            self.assertEqual(fila, self.por_consulta(gastos.filter(residente=residente)))
+
+    def test_endpoint_con_desgloses(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        datos = client.get('/api/gastocomun/estadisticas/?desglose=mes,residente').json()
+        self.assertEqual(datos['total_gastos'], 5)
+        self.assertEqual(Decimal(str(datos['monto_pendiente'])), Decimal('4700'))
+        self.assertEqual(datos['por_mes'][0]['total_pagado'], 2)
+        self.assertEqual(len(datos['por_residente']), 2)
+        # Sin ?desglose= no se calcula ninguno
+        self.assertNotIn('por_mes', client.get('/api/gastocomun/estadisticas/').json())
+
+
+class MetricasTest(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        metricas.REGISTRO.reiniciar()
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.client = APIClient()
+
+    def test_server_timing_histogramas_y_consultas_lentas(self):
+        self.client.force_authenticate(self.admin)
+        respuesta, consultas = self.contar_consultas(lambda: self.client.get('/api/gastocomun/estadisticas/'))
+        self.assertRegex(respuesta['Server-Timing'], rf'^app;dur=[\d.]+, db;dur=[\d.]+;desc="{len(consultas)} consultas"$')
+
+        texto = self.client.get('/api/metricas/').content.decode()
+        etiquetas = 'vista="gastocomun-estadisticas",metodo="GET"'
+        self.assertIn(f'cuentas_claras_solicitud_segundos_count{{{etiquetas}}} 1', texto)
+        self.assertIn(f'cuentas_claras_solicitud_consultas_sum{{{etiquetas}}} {len(consultas)}', texto)
+        self.assertIn(f'cuentas_claras_respuestas_total{{{etiquetas},codigo="200"}} 1', texto)
+        self.assertIn('# TYPE cuentas_claras_solicitud_segundos histogram', texto)
+
+        with override_settings(METRICAS_CONSULTA_LENTA_MS=0), self.assertLogs('backend.metricas', 'WARNING'):
+            self.client.get('/api/gastocomun/pendientes/')
+        lentas = self.client.get('/api/metricas/consultas-lentas/').json()
+        self.assertTrue(lentas)
+        self.assertEqual(lentas[0]['vista'], 'gastocomun-pendientes')
+
+        # Solo administradores o el token de métricas
+        self.client.force_authenticate(self.residente)
+        self.assertEqual(self.client.get('/api/metricas/').status_code, 403)
+        self.client.force_authenticate(None)
+        with override_settings(METRICAS_TOKEN='secreto'):
+            self.assertEqual(self.client.get('/api/metricas/', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+
+    def test_respuestas_por_partes_fuera_de_los_histogramas(self):
+        # La exportación genera sus filas (y consultas) después de que la vista retorna
+        self.client.force_authenticate(self.admin)
+        respuesta = self.client.get('/api/gastocomun/exportar/')
+        b''.join(respuesta.streaming_content)
+        texto = self.client.get('/api/metricas/').content.decode()
+        etiquetas = 'vista="gastocomun-exportar",metodo="GET"'
+        self.assertIn(f'cuentas_claras_respuestas_total{{{etiquetas},codigo="200"}} 1', texto)
+        self.assertIn(f'cuentas_claras_solicitud_segundos_count{{{etiquetas}}} 0', texto)
+        self.assertIn(f'cuentas_claras_solicitud_consultas_count{{{etiquetas}}} 0', texto)
+
+
+class IndicesTest(TestCase):
+    def test_indices_declarados_existen_y_la_auditoria_no_encuentra_scans(self):
+        for etiqueta in ('usuarios', 'gastocomun', 'multas', 'notificaciones'):
+            for modelo in apps.get_app_config(etiqueta).get_models():
+                declarados = {indice.name for indice in modelo._meta.indexes}
+                with connection.cursor() as cursor:
+                    existentes = set(connection.introspection.get_constraints(cursor, modelo._meta.db_table))
+                with self.subTest(modelo=modelo.__name__):
+                    self.assertLessEqual(declarados, existentes)
+
+        Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        carga.poblar(residentes=5, meses=3, semilla=1)
+        salida = StringIO()
+        call_command('auditar_indices', '--fallar', stdout=salida)
+        self.assertIn('Sin scans completos no esperados.', salida.getvalue())
+        self.assertIn('/api/gastocomun/ [residente] -> 200', salida.getvalue())
+
+
+class PruebaCargaTest(ConsultasConstantesMixin, TestCase):
+    def test_condominio_reproducible_y_escenarios(self):
+        datos = carga.poblar(residentes=3, meses=4, semilla=7)
+        montos = list(GastoComun.objects.order_by('residente_id', 'fecha_emision').values_list('monto', 'estado'))
+        self.assertEqual(datos['gastos'], 12)
+        self.assertEqual(carga.poblar(residentes=3, meses=4, semilla=7), datos)
+        self.assertEqual(
+            list(GastoComun.objects.order_by('residente_id', 'fecha_emision').values_list('monto', 'estado')), montos
+        )
+
+        # Un cliente: corre en el hilo (y la transacción) del test
+        for escenario in ('pendientes', 'estadisticas', 'contador', 'notificaciones'):
+            with self.subTest(escenario=escenario):
+                resultado = carga.ejecutar(escenario, clientes=1, solicitudes=6, calentamiento=1)
+                self.assertEqual(resultado['codigos'], {'200': 6})
+                self.assertGreater(resultado['consultas_por_solicitud']['max'], 0)
+                self.assertLessEqual(resultado['latencia_ms']['p50'], resultado['latencia_ms']['p99'])
+
+        pendientes = GastoComun.objects.filter(estado='pendiente').count()
+        resultado = carga.ejecutar('pagar', clientes=1, solicitudes=pendientes + 5)
+        self.assertEqual(resultado['solicitudes'], pendientes)
+        self.assertEqual(resultado['errores'], 0)
+        self.assertFalse(GastoComun.objects.filter(estado='pendiente').exists())
+
+        carga.limpiar()
+        self.assertFalse(Usuario.objects.filter(username__startswith=carga.PREFIJO).exists())
+
+    def test_percentil_por_rango_mas_cercano(self):
+        valores = list(range(1, 101))
+        self.assertEqual([carga.percentil(valores, p) for p in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertIsNone(carga.percentil([], 50))
+
+
+class _ConexionFalsa:
+    def __init__(self):
+        self.cerrada = False
+
+    def close(self):
+        self.cerrada = True
+
+
+class PoolConexionesTest(SimpleTestCase):
+    def test_reutiliza_acota_y_descarta(self):
+        pool = pool_bd.Pool(tamano=2, espera=0.05, verificar_tras=0, vida_maxima=60)
+        sanas = {}
+        verificar = lambda conexion: sanas.get(id(conexion), True)
+        a = pool.obtener(_ConexionFalsa, verificar)
+        b = pool.obtener(_ConexionFalsa, verificar)
+        with self.assertRaises(pool_bd.PoolAgotado):
+            pool.obtener(_ConexionFalsa, verificar)
+
+        pool.devolver(a)
+        self.assertIs(pool.obtener(_ConexionFalsa, verificar), a)
+        # Cerrada dentro de una transacción o con errores: no vuelve al pool
+        pool.devolver(a, reutilizable=False)
+        self.assertTrue(a.cerrada)
+        # Una inactiva que no pasa la verificación se reemplaza
+        pool.devolver(b)
+        sanas[id(b)] = False
+        c = pool.obtener(_ConexionFalsa, verificar)
+        self.assertIsNot(c, b)
+        self.assertTrue(b.cerrada)
+        pool.devolver(c)
+
+        estadisticas = pool.estadisticas()
+        self.assertEqual((estadisticas['creadas'], estadisticas['reutilizadas'], estadisticas['descartadas']), (3, 1, 2))
+        self.assertEqual((estadisticas['en_uso'], estadisticas['inactivas']), (0, 1))
+        self.assertEqual((estadisticas['esperas'], estadisticas['agotado']), (1, 1))
+
+    def test_motor_sqlite_con_pool_compartido_entre_hilos(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, 'pool.sqlite3')
+        settings_dict = {
+            **connections['default'].settings_dict, 'ENGINE': 'backend.db.sqlite3', 'NAME': ruta,
+            'CONN_MAX_AGE': 0, 'POOL': {'TAMANO': 2},
+        }
+        backend = load_backend('backend.db.sqlite3')
+
+        def solicitud():
+            conexion = backend.DatabaseWrapper(dict(settings_dict), 'pool-test')
+            for _ in range(5):
+                with conexion.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                conexion.close_if_unusable_or_obsolete()
+
+        hilos = [threading.Thread(target=solicitud) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        pool = pool_bd.obtener_pool('pool-test', settings_dict)
+        estadisticas = pool.estadisticas()
+        self.assertLessEqual(estadisticas['creadas'], 2)
+        self.assertEqual(estadisticas['creadas'] + estadisticas['reutilizadas'], 20)
+        self.assertEqual(estadisticas['en_uso'], 0)
+        pool.cerrar()
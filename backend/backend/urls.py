@@ -4,17 +4,21 @@ URL configuration for cuentas-claras project.
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
     TokenRefreshView,
 )
+from usuarios.views import obtener_token
+from backend import metricas
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', obtener_token, name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/usuarios/', include('usuarios.urls')),
     path('api/gastocomun/', include('gastocomun.urls')),
     path('api/multas/', include('multas.urls')),
+    path('api/estado-cuenta/', include('estadocuenta.urls')),
+    path('api/metricas/', metricas.metricas, name='metricas'),
+    path('api/metricas/consultas-lentas/', metricas.consultas_lentas, name='metricas-consultas-lentas'),
     path('api/', include('notificaciones.urls')),
 ]
@@ -0,0 +1,163 @@
+"""
+Versiones por recurso y por usuario para validar respuestas sin consultar la base de datos.
+
+Cada escritura sobre un recurso (``gastos``, ``multas``, ``notificaciones``)
+incrementa, al confirmarse la transacción, la versión del residente afectado y
+la versión global que ven los administradores. Con esas versiones se arma el
+``ETag`` de los listados: si el cliente envía ``If-None-Match`` con el mismo
+valor se responde 304 sin consultar ni serializar nada.
+
+Las versiones viven en el cache ``VERSIONES_CACHE``, que debe ser compartido:
+el worker del outbox y los comandos (otros procesos) también las incrementan.
+Con un cache por proceso (locmem) un ETag podría validar datos que cambió otro
+proceso, así que ``con_etag`` y el cache de respuestas no hacen nada. El stream
+de notificaciones también las usa para enterarse, sin consultar la base de
+datos, de lo que crean otros procesos.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from backend.caches import es_compartido
+
+PREFIJO = 'versiones'
+TODOS = 'todos'
+
+
+def _alias():
+    return getattr(settings, 'VERSIONES_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def compartidas():
+    """Las versiones que incrementa un proceso las ven todos los demás."""
+    return es_compartido(_alias())
+
+
+def _clave(recurso, alcance):
+    return f'{PREFIJO}:{recurso}:{alcance}'
+
+
+def _clave_generacion(recurso):
+    return f'{PREFIJO}:{recurso}:generacion'
+
+
+def alcance(usuario):
+    # Los administradores ven el recurso completo; los residentes solo lo suyo
+    return TODOS if usuario.rol == 'admin' else usuario.id
+
+
+def obtener(recurso, alcance_):
+    """
+    Versión actual del recurso para el alcance, como texto. Las claves ausentes
+    se inicializan con la hora en nanosegundos: tras vaciarse el cache nunca
+    se repite una versión anterior.
+    """
+    claves = [_clave_generacion(recurso), _clave(recurso, alcance_)]
+    valores = _cache().get_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            _cache().add(clave, time.time_ns(), None)
+            valores[clave] = _cache().get(clave)
+    return '.'.join(str(valores[clave]) for clave in claves)
+
+
+def _incrementar(clave):
+    try:
+        _cache().incr(clave)
+    except ValueError:
+        # La clave no existe: se inicializará con un valor nuevo en la próxima lectura
+        pass
+
+
+def incrementar(recurso, usuario_ids=()):
+    """Marca como modificado el recurso de los usuarios indicados (y la vista global)."""
+    claves = {_clave(recurso, TODOS)}
+    claves.update(_clave(recurso, usuario_id) for usuario_id in usuario_ids if usuario_id is not None)
+
+    def aplicar():
+        for clave in claves:
+            _incrementar(clave)
+    # Solo después del commit: antes, otra solicitud podría asociar la versión
+    # nueva a datos antiguos
+    transaction.on_commit(aplicar)
+
+
+def incrementar_todos(recurso):
+    """Marca como modificado el recurso para todos los usuarios."""
+    transaction.on_commit(lambda: _incrementar(_clave_generacion(recurso)))
+
+
+def conectar(modelo, recurso, campo_usuario):
+    """
+    Incrementa las versiones de ``recurso`` cuando se guarda o elimina una
+    instancia de ``modelo``; ``campo_usuario`` es el id del usuario dueño
+    (p. ej. ``residente_id``). Las escrituras masivas (``bulk_create``,
+    ``update``) deben llamar a ``incrementar`` directamente.
+    """
+    def al_cambiar(sender, instance, **kwargs):
+        usuario_ids = [getattr(instance, campo_usuario)]
+        tracker = getattr(instance, 'tracker', None)
+        if tracker is not None and campo_usuario in tracker.fields and tracker.has_changed(campo_usuario):
+            usuario_ids.append(tracker.previous(campo_usuario))
+        incrementar(recurso, usuario_ids)
+
+    post_save.connect(al_cambiar, sender=modelo, weak=False, dispatch_uid=f'versiones-{recurso}-save')
+    post_delete.connect(al_cambiar, sender=modelo, weak=False, dispatch_uid=f'versiones-{recurso}-delete')
+
+
+def calcular_etag(request, recurso, por_minuto=False):
+    """
+    ETag débil a partir de la ruta, los parámetros, el alcance del usuario y la
+    versión del recurso. ``por_minuto`` lo renueva cada minuto, para respuestas
+    con textos que dependen de la hora (p. ej. "hace 5 minutos").
+    """
+    alcance_ = alcance(request.user)
+    partes = [
+        request.path,
+        '&'.join(sorted(f'{clave}={valor}' for clave, valor in request.GET.items())),
+        str(alcance_),
+        obtener(recurso, alcance_),
+    ]
+    if por_minuto:
+        partes.append(str(int(time.time() // 60)))
+    return 'W/"%s"' % hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()[:32]
+
+
+def con_etag(recurso, por_minuto=False):
+    """
+    Decorador para acciones GET de DRF: responde 304 si ``If-None-Match``
+    coincide con el ETag actual y, si no, agrega el ETag a la respuesta.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(self, request, *args, **kwargs):
+            if not compartidas():
+                return vista(self, request, *args, **kwargs)
+            etag = calcular_etag(request, recurso, por_minuto)
+            solicitados = parse_etags(request.headers.get('If-None-Match', ''))
+            if etag in solicitados:
+                respuesta = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                respuesta = vista(self, request, *args, **kwargs)
+                if respuesta.status_code != status.HTTP_200_OK:
+                    return respuesta
+            respuesta['ETag'] = etag
+            # El navegador guarda la respuesta pero la revalida en cada uso
+            respuesta['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(respuesta, ['Authorization'])
+            return respuesta
+        return envoltura
+    return decorador
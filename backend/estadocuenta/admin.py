@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import SaldoResidente
+
+# Register your models here.
+@admin.register(SaldoResidente)
+class SaldoResidenteAdmin(admin.ModelAdmin):
+    list_display = ('residente', 'gastos_pendiente_monto', 'multas_pendiente_monto',
+                    'gastos_pagado_monto', 'multas_pagada_monto', 'fecha_actualizacion')
+    list_select_related = ('residente',)
+    search_fields = ('residente__username', 'residente__numero_residencia')
+    readonly_fields = ('fecha_actualizacion',)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class EstadocuentaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'estadocuenta'
+
+    def ready(self):
+        # Registrar los receivers que mantienen los saldos al día
+        from . import signals  # noqa: F401
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from estadocuenta import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye los saldos materializados de los residentes desde los gastos "
+        "comunes y multas. Útil tras la migración inicial o para corregir desviaciones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('residentes', nargs='*', type=int,
+                            help='Ids de residentes a recalcular (por defecto, todos).')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = services.recalcular(options['residentes'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Saldos recalculados: {total}"))
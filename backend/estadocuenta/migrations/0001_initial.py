@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 10:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('usuarios', '0002_indice_rol'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoResidente',
+            fields=[
+                ('residente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('gastos_pendiente_cantidad', models.IntegerField(default=0)),
+                ('gastos_pendiente_monto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('gastos_pagado_cantidad', models.IntegerField(default=0)),
+                ('gastos_pagado_monto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('multas_pendiente_cantidad', models.IntegerField(default=0)),
+                ('multas_pendiente_monto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('multas_pagada_cantidad', models.IntegerField(default=0)),
+                ('multas_pagada_monto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('multas_anulada_cantidad', models.IntegerField(default=0)),
+                ('multas_anulada_monto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Saldo de Residente',
+                'verbose_name_plural': 'Saldos de Residentes',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import models
+from usuarios.models import Usuario
+
+# Create your models here.
+
+class SaldoResidente(models.Model):
+    """
+    Saldos materializados por residente.
+    Se actualizan de forma incremental al crear, pagar, anular o eliminar
+    gastos comunes y multas, para que el resumen del estado de cuenta sea la
+    lectura de una sola fila.
+    """
+    residente = models.OneToOneField(
+        Usuario,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='saldo'
+    )
+    gastos_pendiente_cantidad = models.IntegerField(default=0)
+    gastos_pendiente_monto = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    gastos_pagado_cantidad = models.IntegerField(default=0)
+    gastos_pagado_monto = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    multas_pendiente_cantidad = models.IntegerField(default=0)
+    multas_pendiente_monto = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    multas_pagada_cantidad = models.IntegerField(default=0)
+    multas_pagada_monto = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    multas_anulada_cantidad = models.IntegerField(default=0)
+    multas_anulada_monto = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Saldo de Residente'
+        verbose_name_plural = 'Saldos de Residentes'
+
+    def __str__(self):
+        return f"Saldo residente {self.residente_id}"
+
+    @property
+    def total_pendiente(self):
+        return self.gastos_pendiente_monto + self.multas_pendiente_monto
+
+    @property
+    def total_pagado(self):
+        return self.gastos_pagado_monto + self.multas_pagada_monto
@@ -0,0 +1,239 @@
+"""
+Mantenimiento de los saldos materializados y armado del estado de cuenta.
+"""
+import heapq
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from gastocomun.models import GastoComun
+from multas.models import Multa
+from .models import SaldoResidente
+
+ORIGENES = {
+    # prefijo de columnas -> (modelo, campo de monto, estados)
+    'gastos': (GastoComun, 'monto', [estado for estado, _ in GastoComun.ESTADOS]),
+    'multas': (Multa, 'precio', [estado for estado, _ in Multa.ESTADOS]),
+}
+
+
+def aporte(prefijo, estado, monto):
+    """Columnas y valores que un gasto o multa suma al saldo de su residente."""
+    return {f'{prefijo}_{estado}_cantidad': 1, f'{prefijo}_{estado}_monto': Decimal(monto)}
+
+
+def _actualizar(residente_id, cambios):
+    return SaldoResidente.objects.filter(residente_id=residente_id).update(
+        fecha_actualizacion=timezone.now(), **cambios
+    )
+
+
+def aplicar(deltas_por_residente):
+    """
+    Aplica deltas ``{residente_id: {columna: delta}}`` con un UPDATE atómico
+    (``columna = columna + delta``) por residente.
+
+    Debe llamarse dentro de la transacción que hizo el cambio. Si el residente
+    aún no tiene fila, se crea calculada desde cero en esa transacción (que ya
+    incluye el cambio). Si otra transacción la insertó al mismo tiempo, sin
+    ver este cambio aún no confirmado, el delta se aplica sobre esa fila.
+    """
+    cambios_por_residente = {}
+    for residente_id, deltas in deltas_por_residente.items():
+        cambios = {columna: F(columna) + delta for columna, delta in deltas.items() if delta}
+        if cambios:
+            cambios_por_residente[residente_id] = cambios
+    sin_fila = [
+        residente_id for residente_id, cambios in cambios_por_residente.items()
+        if not _actualizar(residente_id, cambios)
+    ]
+    if not sin_fila:
+        return
+    calculados = calcular_saldos(sin_fila)
+    for residente_id in sin_fila:
+        _, creada = SaldoResidente.objects.get_or_create(
+            residente_id=residente_id, defaults=calculados.get(residente_id, {})
+        )
+        if not creada:
+            _actualizar(residente_id, cambios_por_residente[residente_id])
+
+
+def _acumular(deltas, residente_id, prefijo, estado, monto, signo):
+    for columna, valor in aporte(prefijo, estado, monto).items():
+        deltas[residente_id][columna] = deltas[residente_id].get(columna, 0) + signo * valor
+
+
+def registrar_creados(prefijo, objetos):
+    """Suma al saldo un lote de gastos o multas recién creados (p. ej. con bulk_create)."""
+    _, campo_monto, _ = ORIGENES[prefijo]
+    deltas = defaultdict(dict)
+    for objeto in objetos:
+        _acumular(deltas, objeto.residente_id, prefijo, objeto.estado, getattr(objeto, campo_monto), 1)
+    aplicar(deltas)
+
+
+def registrar_cambio(prefijo, residente_anterior, estado_anterior, monto_anterior,
+                     residente_id, estado, monto):
+    """Mueve el aporte de un objeto de su estado anterior al nuevo."""
+    deltas = defaultdict(dict)
+    _acumular(deltas, residente_anterior, prefijo, estado_anterior, monto_anterior, -1)
+    _acumular(deltas, residente_id, prefijo, estado, monto, 1)
+    aplicar(deltas)
+
+
+def registrar_cambios_estado(prefijo, cargos, estado_anterior, estado):
+    """
+    Mueve de ``estado_anterior`` a ``estado`` el aporte de un lote de cargos
+    ``[(residente_id, monto)]`` actualizados con un UPDATE masivo (sin post_save).
+    """
+    deltas = defaultdict(dict)
+    for residente_id, monto in cargos:
+        _acumular(deltas, residente_id, prefijo, estado_anterior, monto, -1)
+        _acumular(deltas, residente_id, prefijo, estado, monto, 1)
+    aplicar(deltas)
+
+
+def registrar_eliminado(prefijo, residente_id, estado, monto):
+    deltas = defaultdict(dict)
+    _acumular(deltas, residente_id, prefijo, estado, monto, -1)
+    aplicar(deltas)
+
+
+def calcular_saldos(residente_ids=None):
+    """
+    Calcula los saldos desde cero con una consulta agrupada por modelo.
+    Retorna ``{residente_id: {columna: valor}}``.
+    """
+    saldos = defaultdict(dict)
+    for prefijo, (modelo, campo_monto, estados) in ORIGENES.items():
+        queryset = modelo.objects.order_by()
+        if residente_ids is not None:
+            queryset = queryset.filter(residente_id__in=residente_ids)
+        expresiones = {}
+        for estado in estados:
+            filtro = Q(estado=estado)
+            expresiones[f'{prefijo}_{estado}_cantidad'] = Count('pk', filter=filtro)
+            expresiones[f'{prefijo}_{estado}_monto'] = Sum(campo_monto, filter=filtro)
+        for fila in queryset.values('residente_id').annotate(**expresiones):
+            residente_id = fila.pop('residente_id')
+            saldos[residente_id].update({columna: valor or 0 for columna, valor in fila.items()})
+    return saldos
+
+
+def recalcular(residente_ids=None):
+    """Reconstruye las filas de saldo de los residentes indicados (o de todos)."""
+    from usuarios.models import Usuario
+
+    usuarios = Usuario.objects.filter(rol='residente')
+    if residente_ids is not None:
+        usuarios = usuarios.filter(id__in=residente_ids)
+    ids = list(usuarios.values_list('id', flat=True))
+    saldos = calcular_saldos(ids)
+
+    columnas = [
+        f'{prefijo}_{estado}_{medida}'
+        for prefijo, (_, _, estados) in ORIGENES.items()
+        for estado in estados
+        for medida in ('cantidad', 'monto')
+    ]
+    filas = [
+        SaldoResidente(residente_id=residente_id, **{
+            columna: saldos.get(residente_id, {}).get(columna, 0) for columna in columnas
+        })
+        for residente_id in ids
+    ]
+    SaldoResidente.objects.filter(residente_id__in=ids).delete()
+    SaldoResidente.objects.bulk_create(filas, batch_size=500)
+    return len(filas)
+
+
+def obtener_saldo(residente):
+    """
+    Lee la fila de saldo del residente, creándola si aún no existe.
+
+    Si una escritura concurrente encuentra la fila ausente, ella misma la crea
+    (ver ``aplicar``): el INSERT que pierda la carrera lee la fila del otro,
+    así que ningún delta queda fuera.
+    """
+    saldo = SaldoResidente.objects.filter(residente_id=residente.id).first()
+    if saldo is None:
+        valores = calcular_saldos([residente.id]).get(residente.id, {})
+        saldo, _ = SaldoResidente.objects.get_or_create(residente_id=residente.id, defaults=valores)
+    return saldo
+
+
+def resumen(residente):
+    saldo = obtener_saldo(residente)
+    hoy = timezone.localdate()
+    # Lo vencido depende de la fecha actual, así que no se materializa: se
+    # agrega sobre los gastos pendientes del residente usando su índice.
+    vencido = GastoComun.objects.filter(
+        residente_id=residente.id, estado='pendiente', fecha_vencimiento__lt=hoy
+    ).aggregate(cantidad=Count('pk'), monto=Sum('monto'))
+
+    return {
+        'gastos_comunes': {
+            'pendiente': {'cantidad': saldo.gastos_pendiente_cantidad, 'monto': saldo.gastos_pendiente_monto},
+            'pagado': {'cantidad': saldo.gastos_pagado_cantidad, 'monto': saldo.gastos_pagado_monto},
+            'vencido': {'cantidad': vencido['cantidad'], 'monto': vencido['monto'] or 0},
+        },
+        'multas': {
+            'pendiente': {'cantidad': saldo.multas_pendiente_cantidad, 'monto': saldo.multas_pendiente_monto},
+            'pagada': {'cantidad': saldo.multas_pagada_cantidad, 'monto': saldo.multas_pagada_monto},
+            'anulada': {'cantidad': saldo.multas_anulada_cantidad, 'monto': saldo.multas_anulada_monto},
+        },
+        'total_pendiente': saldo.total_pendiente,
+        'total_pagado': saldo.total_pagado,
+        'monto_vencido': vencido['monto'] or 0,
+        'fecha_actualizacion': saldo.fecha_actualizacion,
+    }
+
+
+def _como_fecha_hora(valor):
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor) if timezone.is_aware(valor) else valor
+    return timezone.make_aware(datetime.combine(valor, time.min))
+
+
+def movimientos(residente, limite=100):
+    """
+    Cartola cronológica (más recientes primero) que combina gastos comunes y multas.
+    Cada modelo se lee con su índice ``(residente, fecha)`` y se mezclan en memoria.
+    """
+    gastos = (
+        {
+            'tipo': 'gasto_comun',
+            'id': gasto['id'],
+            'fecha': gasto['fecha_emision'],
+            'concepto': gasto['concepto'],
+            'monto': gasto['monto'],
+            'estado': gasto['estado'],
+            'fecha_vencimiento': gasto['fecha_vencimiento'],
+            'fecha_pago': gasto['fecha_pago'],
+        }
+        for gasto in GastoComun.objects
+        .filter(residente_id=residente.id)
+        .order_by('-fecha_emision', '-id')
+        .values('id', 'fecha_emision', 'concepto', 'monto', 'estado', 'fecha_vencimiento', 'fecha_pago')[:limite]
+    )
+    multas = (
+        {
+            'tipo': 'multa',
+            'id': multa['id'],
+            'fecha': multa['fecha_creacion'],
+            'concepto': multa['motivo'],
+            'monto': multa['precio'],
+            'estado': multa['estado'],
+            'fecha_vencimiento': None,
+            'fecha_pago': multa['fecha_pago'],
+        }
+        for multa in Multa.objects
+        .filter(residente_id=residente.id)
+        .order_by('-fecha_creacion', '-id')
+        .values('id', 'fecha_creacion', 'motivo', 'precio', 'estado', 'fecha_pago')[:limite]
+    )
+    combinados = heapq.merge(gastos, multas, key=lambda movimiento: _como_fecha_hora(movimiento['fecha']), reverse=True)
+    return [movimiento for _, movimiento in zip(range(limite), combinados)]
@@ -0,0 +1,50 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from gastocomun.models import GastoComun
+from multas.models import Multa
+from usuarios.models import Usuario
+from . import services
+
+
+def _eliminado_con_el_residente(origin):
+    # Al eliminar al residente su fila de saldo también se elimina en cascada:
+    # recrearla haría fallar la eliminación del usuario
+    modelo = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(modelo, Usuario)
+
+
+def _actualizar_saldo(prefijo, campo_monto, instance, created):
+    if created:
+        services.registrar_creados(prefijo, [instance])
+        return
+    tracker = instance.tracker
+    if not any(tracker.has_changed(campo) for campo in ('estado', campo_monto, 'residente_id')):
+        return
+    services.registrar_cambio(
+        prefijo,
+        tracker.previous('residente_id'), tracker.previous('estado'), tracker.previous(campo_monto),
+        instance.residente_id, instance.estado, getattr(instance, campo_monto)
+    )
+
+
+@receiver(post_save, sender=GastoComun)
+def actualizar_saldo_gasto(sender, instance, created, **kwargs):
+    _actualizar_saldo('gastos', 'monto', instance, created)
+
+
+@receiver(post_save, sender=Multa)
+def actualizar_saldo_multa(sender, instance, created, **kwargs):
+    _actualizar_saldo('multas', 'precio', instance, created)
+
+
+@receiver(post_delete, sender=GastoComun)
+def descontar_gasto_eliminado(sender, instance, origin=None, **kwargs):
+    if not _eliminado_con_el_residente(origin):
+        services.registrar_eliminado('gastos', instance.residente_id, instance.estado, instance.monto)
+
+
+@receiver(post_delete, sender=Multa)
+def descontar_multa_eliminada(sender, instance, origin=None, **kwargs):
+    if not _eliminado_con_el_residente(origin):
+        services.registrar_eliminado('multas', instance.residente_id, instance.estado, instance.precio)
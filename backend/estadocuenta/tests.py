@@ -0,0 +1,116 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from gastocomun.models import GastoComun
+from multas.models import Multa
+from usuarios.models import Usuario
+from . import services
+from .models import SaldoResidente
+
+# Create your tests here.
+
+COLUMNAS = [
+    f'{prefijo}_{estado}_{medida}'
+    for prefijo, (_, _, estados) in services.ORIGENES.items()
+    for estado in estados
+    for medida in ('cantidad', 'monto')
+]
+
+
+class SaldoIncrementalTest(TestCase):
+    def setUp(self):
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.otro = Usuario.objects.create_user('otro', 'otro@example.com', 'clave')
+
+    def crear_gasto(self, residente, monto, **campos):
+        return GastoComun.objects.create(
+            residente=residente, concepto=f'Gasto común {monto}', descripcion='Mensual', monto=monto,
+            fecha_vencimiento=date(2024, 1, 10), **campos
+        )
+
+    def crear_multa(self, residente, precio):
+        return Multa.objects.create(residente=residente, motivo='Ruidos', descripcion='Noche', precio=precio)
+
+    def saldos(self):
+        return {
+            fila.pop('residente_id'): fila
+            for fila in SaldoResidente.objects.order_by('residente_id').values('residente_id', *COLUMNAS)
+        }
+
+    def assertIgualARecalcular(self):
+        incrementales = self.saldos()
+        services.recalcular(list(incrementales))
+        self.assertEqual(incrementales, self.saldos())
+
+    def test_deltas_de_crear_pagar_anular_y_eliminar_igual_a_recalcular(self):
+        # Las filas existen desde la primera lectura; desde ahí solo se aplican deltas
+        for residente in (self.residente, self.otro):
+            services.obtener_saldo(residente)
+
+        gastos = [self.crear_gasto(self.residente, monto) for monto in (1000, 2500, 4000)]
+        multas = [self.crear_multa(self.residente, precio) for precio in (300, 700)]
+        self.crear_gasto(self.otro, 1500)
+
+        gastos[0].estado = 'pagado'
+        gastos[0].save()
+        multas[0].estado = 'anulada'
+        multas[0].save()
+        multas[1].estado = 'pagada'
+        multas[1].save()
+        # Cambio de monto y de residente
+        gastos[1].monto = 2700
+        gastos[1].residente = self.otro
+        gastos[1].save()
+        gastos[2].delete()
+
+        client = APIClient()
+        client.force_authenticate(self.otro)
+        pendientes = list(GastoComun.objects.filter(residente=self.otro).values_list('id', flat=True))
+        self.assertEqual(client.post('/api/gastocomun/pagar_lote/', {'ids': pendientes}, format='json').status_code, 200)
+
+        saldo = services.obtener_saldo(self.residente)
+        self.assertEqual((saldo.gastos_pagado_cantidad, saldo.gastos_pagado_monto), (1, 1000))
+        self.assertEqual((saldo.gastos_pendiente_cantidad, saldo.multas_anulada_monto), (0, 300))
+        self.assertEqual(services.obtener_saldo(self.otro).gastos_pagado_monto, 4200)
+        self.assertIgualARecalcular()
+
+    def test_la_primera_escritura_crea_la_fila_completa(self):
+        # Sin fila, el delta no se descarta: la escritura calcula la fila con su propio cambio
+        self.crear_gasto(self.residente, 1000)
+        self.assertEqual(SaldoResidente.objects.get(residente=self.residente).gastos_pendiente_monto, 1000)
+        self.crear_multa(self.residente, 500)
+        saldo = SaldoResidente.objects.get(residente=self.residente)
+        self.assertEqual((saldo.gastos_pendiente_monto, saldo.multas_pendiente_monto), (1000, 500))
+        self.assertIgualARecalcular()
+
+    def test_escritura_concurrente_con_la_primera_lectura(self):
+        """
+        La lectura calcula el saldo sin el gasto nuevo; antes de que inserte la
+        fila, otra transacción crea el gasto y no encuentra fila que actualizar.
+        """
+        calcular = services.calcular_saldos
+        escrituras = []
+
+        def calcular_y_escribir(*args, **kwargs):
+            valores = calcular(*args, **kwargs)
+            if not escrituras:
+                escrituras.append('gasto')
+                self.crear_gasto(self.residente, 3000)
+            return valores
+
+        with mock.patch.object(services, 'calcular_saldos', side_effect=calcular_y_escribir):
+            saldo = services.obtener_saldo(self.residente)
+        self.assertEqual((saldo.gastos_pendiente_cantidad, saldo.gastos_pendiente_monto), (1, 3000))
+        self.assertIgualARecalcular()
+
+    def test_eliminar_residente_con_cargos_sin_fila_de_saldo(self):
+        self.crear_gasto(self.residente, 1000)
+        self.crear_gasto(self.otro, 1000)
+        SaldoResidente.objects.all().delete()
+        self.residente.delete()
+        Usuario.objects.filter(id=self.otro.id).delete()
+        self.assertFalse(SaldoResidente.objects.exists())
+        self.assertFalse(GastoComun.objects.exists())
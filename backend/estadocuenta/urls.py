@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import mi_estado_de_cuenta, estado_de_cuenta_residente
+
+urlpatterns = [
+    path('', mi_estado_de_cuenta, name='mi-estado-de-cuenta'),
+    path('<int:residente_id>/', estado_de_cuenta_residente, name='estado-de-cuenta-residente'),
+]
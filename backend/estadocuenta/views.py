@@ -0,0 +1,59 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from usuarios.models import Usuario
+from . import services
+
+MOVIMIENTOS_POR_DEFECTO = 100
+MOVIMIENTOS_MAXIMO = 1000
+
+# Create your views here.
+
+def _estado_de_cuenta(request, residente):
+    try:
+        limite = int(request.query_params.get('limite', MOVIMIENTOS_POR_DEFECTO))
+    except ValueError:
+        limite = MOVIMIENTOS_POR_DEFECTO
+    limite = max(0, min(limite, MOVIMIENTOS_MAXIMO))
+
+    return Response({
+        'residente': residente.id,
+        'username': residente.username,
+        'numero_residencia': residente.numero_residencia,
+        'resumen': services.resumen(residente),
+        'movimientos': services.movimientos(residente, limite) if limite else [],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def mi_estado_de_cuenta(request):
+    """
+    Estado de cuenta del residente autenticado: totales pendientes y pagados,
+    monto vencido y cartola cronológica de gastos comunes y multas.
+    """
+    if request.user.rol != 'residente':
+        return Response(
+            {"error": "Solo los residentes tienen estado de cuenta"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return _estado_de_cuenta(request, request.user)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_de_cuenta_residente(request, residente_id):
+    """
+    Estado de cuenta de un residente específico.
+    Los administradores pueden ver cualquiera; los residentes solo el propio.
+    """
+    if request.user.rol != 'admin' and request.user.id != residente_id:
+        return Response(
+            {"error": "No tienes permiso para ver este estado de cuenta"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    residente = Usuario.objects.filter(id=residente_id, rol='residente').first()
+    if residente is None:
+        return Response({"error": "Residente no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+    return _estado_de_cuenta(request, residente)
@@ -9,3 +9,4 @@ class GastoComunAdmin(admin.ModelAdmin):
     search_fields = ('residente__username', 'residente__first_name', 'residente__last_name', 'concepto')
     date_hierarchy = 'fecha_emision'
     list_per_page = 20
+    list_select_related = ('residente',)
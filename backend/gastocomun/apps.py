@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class GastocomunConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gastocomun'
+
+    def ready(self):
+        # Los ETag de pendientes, pagados y estadísticas dependen de esta versión
+        from backend import versiones
+        from .models import GastoComun
+        versiones.conectar(GastoComun, 'gastos', 'residente_id')
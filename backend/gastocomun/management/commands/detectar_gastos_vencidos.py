@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gastocomun import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Busca gastos comunes pendientes con la fecha de vencimiento cumplida y "
+        "genera notificaciones 'gasto_vencido' (una por gasto). Es incremental: "
+        "retoma desde la marca de la ejecución anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=services.BATCH_SIZE,
+                            help='Gastos leídos y notificados por lote.')
+        parser.add_argument('--completo', action='store_true',
+                            help='Ignorar la marca y revisar todos los vencimientos.')
+        parser.add_argument('--intervalo', type=float, default=None,
+                            help='Repetir cada N segundos en lugar de correr una sola vez.')
+
+    def handle(self, *args, **options):
+        completo = options['completo']
+        while True:
+            resumen = services.detectar_vencidos(chunk_size=options['chunk_size'], completo=completo)
+            self.stdout.write(
+                f"Gastos vencidos revisados: {resumen['revisados']}, notificados: {resumen['notificados']} "
+                f"(desde {resumen['desde'] or 'el inicio'}, marca {resumen['marca']})"
+            )
+            if options['intervalo'] is None:
+                return
+            completo = False
+            time.sleep(options['intervalo'])
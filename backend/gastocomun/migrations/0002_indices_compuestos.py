@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastocomun', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['residente', '-fecha_emision'], name='gasto_res_emision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['residente', 'estado', '-fecha_emision'], name='gasto_res_estado_emision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['estado', '-fecha_emision'], name='gasto_estado_emision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['-fecha_emision', '-id'], name='gasto_emision_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastocomun', '0002_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['estado', 'fecha_vencimiento'], name='gasto_estado_vencimiento_idx'),
+        ),
+    ]
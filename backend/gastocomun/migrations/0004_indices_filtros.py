@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastocomun', '0003_indice_vencimiento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['fecha_vencimiento', 'id'], name='gasto_vencimiento_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['monto', 'id'], name='gasto_monto_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['concepto'], name='gasto_concepto_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastocomun', '0004_indices_filtros'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gastocomun',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='gastocomun',
+            index=models.Index(fields=['estado', 'fecha_modificacion'], name='gasto_estado_modif_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastocomun', '0005_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='gastocomun',
+            constraint=models.UniqueConstraint(fields=('residente', 'concepto', 'fecha_emision'), name='gasto_emision_unica'),
+        ),
+    ]
@@ -24,15 +24,48 @@ class GastoComun(models.Model):
     fecha_emision = models.DateField(default=timezone.now)
     fecha_vencimiento = models.DateField()
     fecha_pago = models.DateTimeField(null=True, blank=True)
-    tracker = FieldTracker(fields=['estado'])
+    # Última inserción o save(); la detección de vencidos revisa los gastos
+    # tocados desde su ejecución anterior (los UPDATE masivos no la cambian)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+    tracker = FieldTracker(fields=['estado', 'monto', 'residente_id'])
 
 
 
 
     class Meta:
         ordering = ['-fecha_emision']
+        indexes = [
+            # Listado de un residente
+            models.Index(fields=['residente', '-fecha_emision'], name='gasto_res_emision_idx'),
+            # pendientes/pagados de un residente
+            models.Index(fields=['residente', 'estado', '-fecha_emision'], name='gasto_res_estado_emision_idx'),
+            # pendientes/pagados del administrador
+            models.Index(fields=['estado', '-fecha_emision'], name='gasto_estado_emision_idx'),
+            # Detección de gastos vencidos (pendientes por fecha de vencimiento)
+            models.Index(fields=['estado', 'fecha_vencimiento'], name='gasto_estado_vencimiento_idx'),
+            # ... y pendientes creados o editados desde la ejecución anterior
+            models.Index(fields=['estado', 'fecha_modificacion'], name='gasto_estado_modif_idx'),
+            # Orden del listado y desempate de la paginación keyset
+            models.Index(fields=['-fecha_emision', '-id'], name='gasto_emision_id_idx'),
+            # Filtros y orden del listado (backend.filtros): rango de vencimiento,
+            # rango/orden por monto y búsqueda por prefijo del concepto
+            models.Index(fields=['fecha_vencimiento', 'id'], name='gasto_vencimiento_id_idx'),
+            models.Index(fields=['monto', 'id'], name='gasto_monto_id_idx'),
+            models.Index(fields=['concepto'], name='gasto_concepto_idx'),
+        ]
+        constraints = [
+            # Un cargo por residente, concepto y fecha de emisión (ver emitir_gastos_mensuales)
+            models.UniqueConstraint(fields=['residente', 'concepto', 'fecha_emision'], name='gasto_emision_unica'),
+        ]
         verbose_name = 'Gasto Común'
         verbose_name_plural = 'Gastos Comunes'
     
     def __str__(self):
-        return f"Gasto Común {self.id} - {self.residente.username} - {self.concepto} - {self.estado}"
+        return f"Gasto Común {self.id} - {self.residente_display} - {self.concepto} - {self.estado}"
+
+    @property
+    def residente_display(self):
+        """Username del residente si ya está cargado; si no, su id (evita una consulta por fila)."""
+        if self._meta.get_field('residente').is_cached(self):
+            return self.residente.username
+        return self.residente_id
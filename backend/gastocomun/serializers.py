@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from backend.lectura import Lector
 from .models import GastoComun
 from usuarios.serializers import UsuarioSerializer
 
@@ -18,6 +19,9 @@ class GastoComunSerializer(serializers.ModelSerializer):
         return value
 
 
+# Listados: mismas columnas y formato que GastoComunSerializer, desde values_list()
+LECTOR_GASTOS = Lector(GastoComunSerializer)
+
 
 class GastoComunDetalleSerializer(serializers.ModelSerializer):
     residente = UsuarioSerializer(read_only=True)
@@ -27,3 +31,32 @@ class GastoComunDetalleSerializer(serializers.ModelSerializer):
         fields = ['id', 'residente', 'concepto', 'descripcion', 'monto', 'estado', 
                  'fecha_emision', 'fecha_vencimiento', 'fecha_pago']
         read_only_fields = ['fecha_pago']
+
+
+class EmisionMensualSerializer(serializers.Serializer):
+    """
+    Datos para emitir en un solo paso los gastos comunes del mes a todos los residentes.
+    El monto puede ser fijo (``monto``) o por unidad (``montos_por_residencia``,
+    un diccionario ``numero_residencia -> monto``); si se envían ambos, el monto
+    fijo se usa para las unidades que no estén en la tabla.
+    """
+    concepto = serializers.CharField(max_length=100)
+    descripcion = serializers.CharField(required=False, allow_blank=True, default='')
+    monto = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    montos_por_residencia = serializers.DictField(
+        child=serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0),
+        required=False
+    )
+    fecha_emision = serializers.DateField()
+    fecha_vencimiento = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs.get('monto') is None and not attrs.get('montos_por_residencia'):
+            raise serializers.ValidationError(
+                "Debes indicar un monto fijo o una tabla de montos por residencia."
+            )
+        if attrs['fecha_vencimiento'] < attrs['fecha_emision']:
+            raise serializers.ValidationError(
+                {"fecha_vencimiento": "La fecha de vencimiento no puede ser anterior a la fecha de emisión."}
+            )
+        return attrs
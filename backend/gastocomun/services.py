@@ -0,0 +1,252 @@
+"""
+Operaciones masivas sobre gastos comunes.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from backend import versiones
+
+from estadocuenta import services as saldos
+from notificaciones import outbox, services as notificaciones
+from notificaciones.models import EventoNotificacion, MarcaProceso, Notificacion
+from usuarios.models import Usuario
+from .models import GastoComun
+
+BATCH_SIZE = 500
+# Prefijo de la marca bloqueada por cada emisión mensual, una por fecha de emisión
+MARCA_EMISION = 'emision_gastos'
+
+
+def emitir_gastos_mensuales(concepto, fecha_emision, fecha_vencimiento, descripcion='',
+                            monto=None, montos_por_residencia=None):
+    """
+    Emite el gasto común del período para todos los residentes activos en una
+    sola transacción, con inserciones por lotes.
+
+    Los residentes que ya tienen un gasto con el mismo concepto y fecha de
+    emisión se omiten, por lo que reenviar la misma emisión no duplica cargos.
+    Las emisiones de una misma fecha se serializan con un bloqueo sobre su
+    ``MarcaProceso``: dos solicitudes simultáneas no leen ambas la emisión como
+    pendiente. La restricción única ``gasto_emision_unica`` respalda el caso
+    de otros escritores (p. ej. la importación).
+    Retorna un resumen de la operación.
+    """
+    montos_por_residencia = montos_por_residencia or {}
+    residentes = list(
+        Usuario.objects
+        .filter(rol='residente', is_active=True)
+        .only('id', 'username', 'numero_residencia')
+        .order_by('numero_residencia', 'id')
+    )
+
+    marca = f'{MARCA_EMISION}:{fecha_emision.isoformat()}'
+    MarcaProceso.objects.get_or_create(nombre=marca, defaults={'valor': concepto})
+
+    with transaction.atomic():
+        # Primera lectura de la transacción: en MySQL la instantánea de las
+        # lecturas siguientes se toma después de obtener el bloqueo
+        MarcaProceso.objects.select_for_update().filter(nombre=marca).exists()
+        ya_emitidos = set(
+            GastoComun.objects
+            .filter(concepto=concepto, fecha_emision=fecha_emision)
+            .values_list('residente_id', flat=True)
+        )
+
+        gastos = []
+        sin_monto = []
+        omitidos = 0
+        for residente in residentes:
+            if residente.id in ya_emitidos:
+                omitidos += 1
+                continue
+            monto_residente = montos_por_residencia.get(residente.numero_residencia, monto)
+            if monto_residente is None:
+                sin_monto.append(residente.username)
+                continue
+            gastos.append(GastoComun(
+                residente=residente,
+                concepto=concepto,
+                descripcion=descripcion or concepto,
+                monto=monto_residente,
+                fecha_emision=fecha_emision,
+                fecha_vencimiento=fecha_vencimiento
+            ))
+
+        GastoComun.objects.bulk_create(gastos, batch_size=BATCH_SIZE)
+
+        # bulk_create no dispara post_save: saldos, versiones y notificaciones se actualizan aquí en lote
+        saldos.registrar_creados('gastos', gastos)
+        versiones.incrementar('gastos', {gasto.residente_id for gasto in gastos})
+        _notificar_emision(gastos, concepto, fecha_emision)
+
+    return {
+        'creados': len(gastos),
+        'omitidos_ya_emitidos': omitidos,
+        'sin_monto': sin_monto,
+        'monto_total': sum((gasto.monto for gasto in gastos), Decimal('0')),
+        'concepto': concepto,
+        'fecha_emision': fecha_emision,
+        'fecha_vencimiento': fecha_vencimiento,
+    }
+
+
+def _notificar_emision(gastos, concepto, fecha_emision):
+    if not gastos:
+        return
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # Backends como MySQL no asignan ids en bulk_create; se recuperan por
+        # (concepto, fecha_emision, residente), que es único dentro de la emisión.
+        ids = dict(
+            GastoComun.objects
+            .filter(concepto=concepto, fecha_emision=fecha_emision,
+                    residente_id__in=[gasto.residente_id for gasto in gastos])
+            .values_list('residente_id', 'id')
+        )
+        for gasto in gastos:
+            gasto.id = ids.get(gasto.residente_id)
+
+    eventos = []
+    for gasto in gastos:
+        destinatarios = [
+            ([gasto.residente_id], 'Nuevo gasto común registrado',
+             f'Se ha registrado un gasto común por ${gasto.monto} correspondiente a {gasto.concepto}.'),
+            (notificaciones.AUDIENCIA_ADMINS, 'Nuevo gasto común generado',
+             f'Se ha generado un gasto común para {gasto.residente.username} por ${gasto.monto}.'),
+        ]
+        eventos.append(('gasto_creado', gasto.id, 'gasto_comun', destinatarios))
+    notificaciones.publicar_lote(eventos, batch_size=BATCH_SIZE)
+
+
+MARCA_VENCIMIENTOS = 'gastos_vencidos'
+# Los gastos guardados por transacciones que aún no se confirmaban al empezar
+# una ejecución tienen fecha_modificacion anterior a ella: la siguiente
+# ejecución vuelve a revisar este margen (los ya notificados se descartan)
+MARGEN_MODIFICACION = timedelta(minutes=10)
+CAMPOS_VENCIDO = ('id', 'concepto', 'monto', 'fecha_vencimiento', 'fecha_modificacion',
+                  'residente__id', 'residente__username')
+
+
+def _por_lotes(queryset, campo, chunk_size):
+    """
+    Recorre ``queryset`` por lotes con un cursor keyset sobre ``(campo, id)``,
+    sin OFFSET.
+    """
+    queryset = queryset.select_related('residente').only(*CAMPOS_VENCIDO).order_by(campo, 'id')
+    cursor = None
+    while True:
+        lote = queryset
+        if cursor is not None:
+            valor, ultimo_id = cursor
+            lote = lote.filter(Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'id__gt': ultimo_id}))
+        lote = list(lote[:chunk_size])
+        if not lote:
+            return
+        yield lote
+        cursor = (getattr(lote[-1], campo), lote[-1].id)
+
+
+def _pendientes_vencidos(desde, hasta, chunk_size):
+    """
+    Gastos pendientes con ``desde < fecha_vencimiento < hasta``, por el índice
+    ``(estado, fecha_vencimiento)``.
+    """
+    queryset = GastoComun.objects.filter(estado='pendiente', fecha_vencimiento__lt=hasta)
+    if desde is not None:
+        queryset = queryset.filter(fecha_vencimiento__gt=desde)
+    return _por_lotes(queryset, 'fecha_vencimiento', chunk_size)
+
+
+def _pendientes_modificados(modificados_desde, vencidos_hasta, chunk_size):
+    """
+    Gastos pendientes creados o guardados desde ``modificados_desde`` (si no
+    es ``None``) con vencimiento hasta ``vencidos_hasta`` inclusive, que
+    quedaron bajo la marca de fecha: importaciones CSV, gastos creados con
+    fecha pasada o a los que se les adelantó el vencimiento. Usa el índice
+    ``(estado, fecha_modificacion)``.
+    """
+    queryset = GastoComun.objects.filter(estado='pendiente', fecha_vencimiento__lte=vencidos_hasta)
+    if modificados_desde is not None:
+        queryset = queryset.filter(fecha_modificacion__gte=modificados_desde)
+    return _por_lotes(queryset, 'fecha_modificacion', chunk_size)
+
+
+def _leer_marca():
+    """Retorna ``(fecha de vencimiento, fecha de modificación)`` de la ejecución anterior."""
+    marca = MarcaProceso.leer(MARCA_VENCIMIENTOS)
+    if not marca:
+        return None, None
+    fecha, _, modificacion = marca.partition('|')
+    # Las marcas anteriores solo guardaban la fecha: se revisan todos los pendientes
+    return date.fromisoformat(fecha), datetime.fromisoformat(modificacion) if modificacion else None
+
+
+def _clave_vencimiento(gasto):
+    """Un aviso por gasto: repetir la detección no lo duplica."""
+    return outbox.clave_evento('gasto_vencido', gasto.id, 'gasto_comun', 'vencido')
+
+
+def _ya_notificados_vencidos(gastos):
+    """Ids de los gastos que ya tienen su aviso de vencimiento creado o encolado."""
+    notificados = set(
+        Notificacion.objects
+        .filter(tipo='gasto_vencido', objeto_tipo='gasto_comun', objeto_id__in=[gasto.id for gasto in gastos])
+        .values_list('objeto_id', flat=True)
+    )
+    claves = {_clave_vencimiento(gasto): gasto.id for gasto in gastos}
+    encolados = EventoNotificacion.objects.filter(clave__in=claves).values_list('clave', flat=True)
+    return notificados | {claves[clave] for clave in encolados}
+
+
+def detectar_vencidos(hoy=None, chunk_size=BATCH_SIZE, completo=False):
+    """
+    Genera notificaciones ``gasto_vencido`` para los gastos pendientes cuya
+    fecha de vencimiento ya pasó.
+
+    Salvo con ``completo=True``, retoma desde la marca de la ejecución
+    anterior: revisa los vencimientos posteriores a la fecha de la marca y,
+    de los anteriores, solo los gastos creados o guardados desde entonces.
+    Cada gasto se notifica una sola vez: se descartan los que ya tienen su
+    aviso creado o encolado (y la clave de idempotencia del outbox cubre
+    ejecuciones simultáneas). Retorna un resumen.
+    """
+    hoy = hoy or timezone.localdate()
+    inicio = timezone.now()
+    desde, modificados_desde = (None, None) if completo else _leer_marca()
+
+    lotes = [_pendientes_vencidos(desde, hoy, chunk_size)]
+    if desde is not None:
+        lotes.append(_pendientes_modificados(modificados_desde, desde, chunk_size))
+
+    revisados = notificados = 0
+    for lote in (lote for recorrido in lotes for lote in recorrido):
+        revisados += len(lote)
+        ya_notificados = _ya_notificados_vencidos(lote)
+        lote = [gasto for gasto in lote if gasto.id not in ya_notificados]
+
+        eventos = [
+            ('gasto_vencido', gasto.id, 'gasto_comun', [
+                ([gasto.residente_id], 'Gasto común vencido',
+                 f'Su gasto común por {gasto.concepto} (${gasto.monto}) venció el '
+                 f'{gasto.fecha_vencimiento.strftime("%d/%m/%Y")} y sigue pendiente.'),
+            ])
+            for gasto in lote
+        ]
+        notificaciones.publicar_lote(eventos, batch_size=chunk_size,
+                                     claves=[_clave_vencimiento(gasto) for gasto in lote])
+        notificados += len(eventos)
+
+    if notificados:
+        notificaciones.publicar('gasto_vencido', None, None, [
+            (notificaciones.AUDIENCIA_ADMINS, 'Gastos comunes vencidos',
+             f'Se detectaron {notificados} gastos comunes vencidos sin pagar.'),
+        ])
+
+    # Todo vencimiento anterior a hoy ya fue revisado, y todo gasto guardado
+    # antes del inicio (menos el margen) también
+    nueva_marca = hoy - timedelta(days=1)
+    MarcaProceso.guardar(MARCA_VENCIMIENTOS, f'{nueva_marca.isoformat()}|{(inicio - MARGEN_MODIFICACION).isoformat()}')
+    return {'revisados': revisados, 'notificados': notificados, 'desde': desde, 'marca': nueva_marca}
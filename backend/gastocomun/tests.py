@@ -1,3 +1,305 @@
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.testing import ConsultasConstantesMixin, usar_cache_compartido
+from estadocuenta import services as saldos
+from notificaciones.models import EventoNotificacion, MarcaProceso
+from usuarios.models import Usuario
+from . import services
+from .models import GastoComun
 
 # Create your tests here.
+
+class GastoComunConsultasTest(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.client = APIClient()
+
+    def agregar_gastos(self, cantidad, estado='pendiente'):
+        otros = [
+            Usuario(username=f'residente-{Usuario.objects.count() + i}', rol='residente')
+            for i in range(cantidad)
+        ]
+        Usuario.objects.bulk_create(otros)
+        residentes = list(Usuario.objects.filter(rol='residente').order_by('-id')[:cantidad])
+        # Conceptos distintos: un residente tiene un solo cargo por concepto y fecha de emisión
+        inicio = GastoComun.objects.count()
+        GastoComun.objects.bulk_create([
+            GastoComun(residente=residente, concepto=f'Gasto común {inicio + i}', descripcion='Mensual',
+                       monto=1000, estado=estado, fecha_vencimiento=date(2030, 1, 10))
+            for i, residente in enumerate(residentes + [self.residente] * cantidad)
+        ])
+
+    def test_listado_admin_sin_n_mas_1(self):
+        self.client.force_authenticate(self.admin)
+        respuesta = self.assertConsultasConstantes(
+            lambda: self.client.get('/api/gastocomun/'), self.agregar_gastos
+        )
+        self.assertEqual(len(respuesta.json()), 22)
+
+    def test_listado_residente_sin_n_mas_1(self):
+        self.client.force_authenticate(self.residente)
+        respuesta = self.assertConsultasConstantes(
+            lambda: self.client.get('/api/gastocomun/'), self.agregar_gastos
+        )
+        self.assertEqual(len(respuesta.json()), 11)
+
+    def test_pendientes_y_pagados_sin_n_mas_1(self):
+        self.client.force_authenticate(self.admin)
+        self.assertConsultasConstantes(
+            lambda: self.client.get('/api/gastocomun/pendientes/'), self.agregar_gastos
+        )
+        self.assertConsultasConstantes(
+            lambda: self.client.get('/api/gastocomun/pagados/'),
+            lambda cantidad: self.agregar_gastos(cantidad, estado='pagado')
+        )
+
+    def test_detalle_y_pago_en_consultas_acotadas(self):
+        self.agregar_gastos(1)
+        gasto = GastoComun.objects.filter(residente=self.residente).first()
+        self.client.force_authenticate(self.residente)
+
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get(f'/api/gastocomun/{gasto.id}/')
+        )
+        self.assertEqual(respuesta.json()['residente']['username'], 'residente')
+        self.assertEqual(len(consultas), 1)
+
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.post(f'/api/gastocomun/{gasto.id}/pagar/')
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        # El residente llega en el JOIN del gasto: ni la vista ni los signals lo vuelven a leer
+        lecturas_de_usuarios = [
+            consulta['sql'] for consulta in consultas
+            if 'usuarios_usuario' in consulta['sql'] and 'gastocomun_gastocomun' not in consulta['sql']
+        ]
+        self.assertEqual(lecturas_de_usuarios, [])
+
+    def test_estadisticas_en_una_consulta(self):
+        self.client.force_authenticate(self.admin)
+        self.agregar_gastos(3)
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get('/api/gastocomun/estadisticas/')
+        )
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(respuesta.json()['total_pendientes'], 6)
+
+    def test_exportar_csv_filtrado_por_periodo_y_estado(self):
+        self.agregar_gastos(2)
+        GastoComun.objects.filter(residente=self.residente).update(fecha_emision=date(2025, 3, 5))
+        GastoComun.objects.filter(residente=self.residente).filter(
+            id=GastoComun.objects.filter(residente=self.residente).first().id
+        ).update(estado='pagado')
+        self.client.force_authenticate(self.admin)
+
+        respuesta = self.client.get('/api/gastocomun/exportar/?periodo=2025-03&estado=pendiente')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        lineas = b''.join(respuesta.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lineas[0].split(',')[:3], ['ID', 'Residente', 'Residencia'])
+        self.assertEqual(len(lineas), 2)
+        self.assertIn('residente,', lineas[1])
+
+        respuesta = self.client.get('/api/gastocomun/exportar/?periodo=2025-13')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_etag_responde_304_sin_consultas_hasta_que_cambian_los_gastos(self):
+        usar_cache_compartido(self, 'VERSIONES_CACHE')
+        self.agregar_gastos(1)
+        gasto = GastoComun.objects.filter(residente=self.residente).first()
+        self.client.force_authenticate(self.residente)
+
+        respuesta = self.client.get('/api/gastocomun/pendientes/')
+        etag = respuesta['ETag']
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get('/api/gastocomun/pendientes/', HTTP_IF_NONE_MATCH=etag)
+        )
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(len(consultas), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/gastocomun/{gasto.id}/pagar/')
+        respuesta = self.client.get('/api/gastocomun/pendientes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_sin_etag_si_las_versiones_no_son_compartidas(self):
+        # Con locmem, lo que cambian el worker del outbox o los comandos no movería el ETag
+        self.agregar_gastos(1)
+        self.client.force_authenticate(self.residente)
+        respuesta = self.client.get('/api/gastocomun/pendientes/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('ETag', respuesta)
+
+    def test_filtros_busqueda_y_orden_en_el_servidor(self):
+        otro = Usuario.objects.create_user('otro', 'otro@example.com', 'clave', numero_residencia='B-12')
+        GastoComun.objects.bulk_create([
+            GastoComun(residente=self.residente, concepto='Cuota marzo', descripcion='-', monto=30000,
+                       fecha_emision=date(2025, 3, 1), fecha_vencimiento=date(2025, 3, 10)),
+            GastoComun(residente=self.residente, concepto='Cuota abril', descripcion='-', monto=45000,
+                       estado='pagado', fecha_emision=date(2025, 4, 1), fecha_vencimiento=date(2025, 4, 10)),
+            GastoComun(residente=otro, concepto='Reparación ascensor', descripcion='-', monto=80000,
+                       fecha_emision=date(2025, 4, 2), fecha_vencimiento=date(2025, 4, 30)),
+        ])
+        self.client.force_authenticate(self.admin)
+
+        def conceptos(parametros):
+            respuesta = self.client.get(f'/api/gastocomun/?{parametros}')
+            self.assertEqual(respuesta.status_code, 200, respuesta.content)
+            return [gasto['concepto'] for gasto in respuesta.json()]
+
+        self.assertEqual(conceptos('estado=pagado'), ['Cuota abril'])
+        self.assertEqual(conceptos('numero_residencia=B-12'), ['Reparación ascensor'])
+        self.assertEqual(conceptos(f'residente={self.residente.id}&orden=monto'), ['Cuota marzo', 'Cuota abril'])
+        self.assertEqual(conceptos('fecha_emision_desde=2025-04-01&fecha_emision_hasta=2025-04-01'), ['Cuota abril'])
+        self.assertEqual(conceptos('fecha_vencimiento_hasta=2025-04-10&monto_min=40000'), ['Cuota abril'])
+        self.assertEqual(conceptos('busqueda=cuota&orden=-monto'), ['Cuota abril', 'Cuota marzo'])
+
+        for parametros in ('estado=anulado', 'monto_min=mucho', 'fecha_emision_desde=01-04-2025', 'orden=descripcion'):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(f'/api/gastocomun/?{parametros}').status_code, 400)
+
+        # Los residentes filtran solo dentro de sus propios gastos
+        self.client.force_authenticate(self.residente)
+        self.assertEqual(conceptos('numero_residencia=B-12'), [])
+        self.assertEqual(conceptos('busqueda=cuota&orden=fecha_emision'), ['Cuota marzo', 'Cuota abril'])
+        pendientes = self.client.get('/api/gastocomun/pendientes/?busqueda=cuota').json()
+        self.assertEqual([gasto['concepto'] for gasto in pendientes], ['Cuota marzo'])
+
+        # Las acciones de detalle no se filtran: get_object() también pasa por filter_queryset
+        marzo = GastoComun.objects.get(concepto='Cuota marzo')
+        self.assertEqual(self.client.get(f'/api/gastocomun/{marzo.id}/?estado=pagado').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/gastocomun/{marzo.id}/pagar/?estado=pagado').status_code, 200)
+
+    def test_pagar_lote_atomico_con_comprobante_y_notificacion_agregada(self):
+        self.agregar_gastos(3)
+        otro = Usuario.objects.filter(rol='residente').exclude(id=self.residente.id).first()
+        propios = list(GastoComun.objects.filter(residente=self.residente).order_by('id').values_list('id', flat=True))
+        ajeno = GastoComun.objects.filter(residente=otro).values_list('id', flat=True).first()
+        saldos.obtener_saldo(self.residente)
+        EventoNotificacion.objects.all().delete()
+        self.client.force_authenticate(self.residente)
+
+        # Un gasto ajeno hace fallar el lote completo
+        respuesta = self.client.post('/api/gastocomun/pagar_lote/', {'ids': propios + [ajeno]}, format='json')
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertEqual(respuesta.json()['ids'], [ajeno])
+        self.assertFalse(GastoComun.objects.filter(estado='pagado').exists())
+
+        self.assertEqual(self.client.post('/api/gastocomun/pagar_lote/', {'ids': []}, format='json').status_code, 400)
+
+        respuesta = self.client.post('/api/gastocomun/pagar_lote/', {'ids': propios + propios[:1]}, format='json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        comprobante = respuesta.json()
+        self.assertEqual(comprobante['cantidad'], 3)
+        self.assertEqual([cargo['id'] for cargo in comprobante['cargos']], propios)
+        self.assertEqual(set(GastoComun.objects.filter(id__in=propios).values_list('estado', flat=True)), {'pagado'})
+        # Una notificación para el residente y una para los administradores
+        self.assertEqual(EventoNotificacion.objects.count(), 2)
+        saldo = saldos.obtener_saldo(self.residente)
+        self.assertEqual((saldo.gastos_pendiente_cantidad, saldo.gastos_pagado_cantidad), (0, 3))
+        self.assertEqual(saldo.gastos_pagado_monto, 3000)
+
+        # Pagar de nuevo un gasto ya pagado se rechaza
+        respuesta = self.client.post('/api/gastocomun/pagar_lote/', {'ids': propios[:1]}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['no_pendientes'], [{'id': propios[0], 'estado': 'pagado'}])
+
+
+    def test_emision_mensual_idempotente(self):
+        Usuario.objects.filter(pk=self.residente.pk).update(numero_residencia='A-1')
+        Usuario.objects.create_user('residente-b', 'b@example.com', 'clave', numero_residencia='B-2')
+        Usuario.objects.create_user('inactivo', 'c@example.com', 'clave', is_active=False)
+        self.client.force_authenticate(self.admin)
+        datos = {
+            'concepto': 'Gasto común marzo', 'monto': '45000', 'montos_por_residencia': {'B-2': '60000'},
+            'fecha_emision': '2024-03-01', 'fecha_vencimiento': '2024-03-10',
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primera = self.client.post('/api/gastocomun/emitir_mensual/', datos, format='json')
+        self.assertEqual(primera.status_code, 201, primera.content)
+        self.assertEqual((primera.json()['creados'], primera.json()['omitidos_ya_emitidos']), (2, 0))
+        self.assertEqual(
+            sorted(GastoComun.objects.values_list('residente__username', 'monto')),
+            [('residente', 45000), ('residente-b', 60000)],
+        )
+        self.assertEqual(EventoNotificacion.objects.filter(tipo='gasto_creado').count(), 2)
+
+        # Reenviar la misma emisión no duplica cargos ni notificaciones
+        with self.captureOnCommitCallbacks(execute=True):
+            segunda = self.client.post('/api/gastocomun/emitir_mensual/', datos, format='json')
+        self.assertEqual((segunda.json()['creados'], segunda.json()['omitidos_ya_emitidos']), (0, 2))
+        self.assertEqual(GastoComun.objects.count(), 2)
+        self.assertEqual(EventoNotificacion.objects.filter(tipo='gasto_creado').count(), 2)
+        self.assertEqual(saldos.obtener_saldo(self.residente).gastos_pendiente_monto, 45000)
+
+        # Un residente nuevo recibe solo su cargo al reenviar
+        Usuario.objects.create_user('residente-c', 'd@example.com', 'clave')
+        tercera = self.client.post('/api/gastocomun/emitir_mensual/', datos, format='json')
+        self.assertEqual((tercera.json()['creados'], tercera.json()['omitidos_ya_emitidos']), (1, 2))
+        self.assertEqual(GastoComun.objects.filter(residente__username='residente-c').count(), 1)
+        self.assertTrue(MarcaProceso.objects.filter(nombre=f'{services.MARCA_EMISION}:2024-03-01').exists())
+
+        # La restricción única respalda la emisión frente a otros escritores
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GastoComun.objects.bulk_create([GastoComun(
+                residente=self.residente, concepto='Gasto común marzo', descripcion='Duplicado',
+                monto=1, fecha_emision=date(2024, 3, 1), fecha_vencimiento=date(2024, 3, 10),
+            )])
+
+
+class GastosVencidosTest(TestCase):
+    def setUp(self):
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+
+    def crear(self, vencimiento, **campos):
+        return GastoComun.objects.create(residente=self.residente, concepto=f'Gasto común {GastoComun.objects.count()}',
+                                         descripcion='Mensual', monto=1000, fecha_vencimiento=vencimiento, **campos)
+
+    def notificados(self):
+        return sorted(
+            EventoNotificacion.objects.filter(tipo='gasto_vencido', objeto_id__isnull=False)
+            .values_list('objeto_id', flat=True)
+        )
+
+    def test_incremental_sin_perder_gastos_tardios(self):
+        vencido = self.crear(date(2024, 3, 10))
+        self.crear(date(2024, 3, 1), estado='pagado')
+        self.crear(date(2024, 3, 20))
+        resumen = services.detectar_vencidos(hoy=date(2024, 3, 15))
+        self.assertEqual((resumen['notificados'], resumen['marca']), (1, date(2024, 3, 14)))
+        self.assertEqual(self.notificados(), [vencido.id])
+        self.assertEqual(services.detectar_vencidos(hoy=date(2024, 3, 15))['notificados'], 0)
+
+        # Bajo la marca de fecha: creado con fecha pasada, importado con
+        # bulk_create y con el vencimiento adelantado al editarlo
+        atrasado = self.crear(date(2024, 3, 1))
+        GastoComun.objects.bulk_create([GastoComun(
+            residente=self.residente, concepto='Histórico', descripcion='CSV', monto=500,
+            fecha_vencimiento=date(2024, 2, 1),
+        )])
+        importado = GastoComun.objects.get(concepto='Histórico')
+        editado = self.crear(date(2024, 4, 1))
+        editado.fecha_vencimiento = date(2024, 3, 5)
+        editado.save()
+
+        resumen = services.detectar_vencidos(hoy=date(2024, 3, 16))
+        self.assertEqual(resumen['notificados'], 3)
+        self.assertEqual(self.notificados(), sorted([vencido.id, atrasado.id, importado.id, editado.id]))
+        self.assertEqual(services.detectar_vencidos(hoy=date(2024, 3, 16))['notificados'], 0)
+
+    def test_los_no_tocados_bajo_la_marca_no_se_revisan(self):
+        self.crear(date(2024, 3, 10))
+        services.detectar_vencidos(hoy=date(2024, 3, 15))
+        # Fuera del margen de modificación: la siguiente ejecución no los vuelve a leer
+        GastoComun.objects.update(fecha_modificacion=timezone.now() - timedelta(days=1))
+        self.assertEqual(services.detectar_vencidos(hoy=date(2024, 3, 16))['revisados'], 0)
+        self.assertEqual(services.detectar_vencidos(hoy=date(2024, 3, 16), completo=True)['revisados'], 1)
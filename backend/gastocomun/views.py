@@ -5,13 +5,42 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from .models import GastoComun
-from .serializers import GastoComunSerializer, GastoComunDetalleSerializer
+from .serializers import GastoComunSerializer, GastoComunDetalleSerializer, EmisionMensualSerializer, LECTOR_GASTOS
+from .services import emitir_gastos_mensuales
+from backend import estadisticas, exportacion, pagos
+from backend.filtros import FiltrosCargos
+from backend.cache_respuestas import cache_respuesta
+from backend.versiones import con_etag
+
+ESTADOS_GASTO = [estado for estado, _ in GastoComun.ESTADOS]
+# Acciones que serializan al residente completo (GastoComunDetalleSerializer)
+ACCIONES_CON_RESIDENTE = {'retrieve', 'pagar'}
+COLUMNAS_EXPORTACION = [
+    ('ID', 'id'),
+    ('Residente', 'residente__username'),
+    ('Residencia', 'residente__numero_residencia'),
+    ('Concepto', 'concepto'),
+    ('Descripción', 'descripcion'),
+    ('Monto', 'monto'),
+    ('Estado', 'estado'),
+    ('Fecha emisión', 'fecha_emision'),
+    ('Fecha vencimiento', 'fecha_vencimiento'),
+    ('Fecha pago', 'fecha_pago'),
+]
 
 # Create your views here.
 
 class GastoComunViewSet(viewsets.ModelViewSet):
     queryset = GastoComun.objects.all()
     serializer_class = GastoComunSerializer
+    # Filtros por parámetros de consulta (backend.filtros)
+    filter_backends = [FiltrosCargos]
+    filtro_estados = ESTADOS_GASTO
+    filtro_fechas = ['fecha_emision', 'fecha_vencimiento']
+    filtro_monto = 'monto'
+    filtro_busqueda = 'concepto'
+    filtro_orden = ['fecha_emision', 'fecha_vencimiento', 'monto']
+    filtro_acciones = ['list', 'pendientes', 'pagados']
     
     def get_permissions(self):
         """
@@ -35,9 +64,19 @@ class GastoComunViewSet(viewsets.ModelViewSet):
         - Los residentes solo pueden ver sus propios gastos comunes
         """
         user = self.request.user
+        queryset = GastoComun.objects.all()
+        if self.action in ACCIONES_CON_RESIDENTE:
+            # El serializador de detalle anida al residente: se trae en el mismo JOIN
+            queryset = queryset.select_related('residente')
         if user.rol == 'admin':
-            return GastoComun.objects.all()
-        return GastoComun.objects.filter(residente=user)
+            return queryset
+        return queryset.filter(residente=user)
+    
+    @cache_respuesta('gastos')
+    def list(self, request, *args, **kwargs):
+        # El listado completo del administrador se sirve desde el cache de respuestas;
+        # el resto se serializa desde values_list() sin instanciar modelos
+        return LECTOR_GASTOS.listar(self, self.filter_queryset(self.get_queryset()))
     
     def perform_create(self, serializer):
         """Solo los administradores pueden crear gastos comunes"""
@@ -66,7 +105,7 @@ class GastoComunViewSet(viewsets.ModelViewSet):
         gasto = self.get_object()
         
         # Verificar que el gasto pertenezca al usuario que hace la solicitud
-        if request.user.rol != 'admin' and gasto.residente != request.user:
+        if request.user.rol != 'admin' and gasto.residente_id != request.user.id:
             return Response(
                 {"error": "No tienes permiso para pagar este gasto común"}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -86,8 +125,37 @@ class GastoComunViewSet(viewsets.ModelViewSet):
         
         serializer = GastoComunDetalleSerializer(gasto)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def pagar_lote(self, request):
+        """
+        Paga varios gastos comunes en una sola operación: {"ids": [1, 2, 3]}.
+        Si algún cargo no existe, no pertenece al residente o no está pendiente, no se paga ninguno.
+        Retorna el comprobante del pago.
+        """
+        ids = pagos.leer_ids(request.data)
+        try:
+            comprobante = pagos.pagar_lote('gastos', ids, request.user)
+        except pagos.PagoRechazado as rechazo:
+            return Response(rechazo.datos, status=rechazo.status_code)
+        return Response(comprobante)
+    
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def emitir_mensual(self, request):
+        """
+        Emite el gasto común del mes para todos los residentes en una sola solicitud.
+        Retorna un resumen en lugar de los gastos creados (solo para administradores).
+        """
+        if request.user.rol != 'admin':
+            raise PermissionDenied("Solo los administradores pueden emitir gastos comunes")
+        
+        serializer = EmisionMensualSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        resumen = emitir_gastos_mensuales(**serializer.validated_data)
+        return Response(resumen, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @con_etag('gastos')
     def pendientes(self, request):
         """
         Retorna los gastos comunes pendientes del usuario actual o de todos los usuarios si es admin
@@ -98,10 +166,10 @@ class GastoComunViewSet(viewsets.ModelViewSet):
         else:
             queryset = GastoComun.objects.filter(residente=user, estado='pendiente')
             
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return LECTOR_GASTOS.listar(self, self.filter_queryset(queryset))
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @con_etag('gastos')
     def pagados(self, request):
         """
         Retorna los gastos comunes pagados del usuario actual o de todos los usuarios si es admin
@@ -112,10 +180,21 @@ class GastoComunViewSet(viewsets.ModelViewSet):
         else:
             queryset = GastoComun.objects.filter(residente=user, estado='pagado')
             
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return LECTOR_GASTOS.listar(self, self.filter_queryset(queryset))
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def exportar(self, request):
+        """
+        Descarga los gastos comunes visibles para el usuario en CSV (o XLSX con ?formato=xlsx).
+        Filtros: ?periodo=AAAA-MM, ?desde=, ?hasta=, ?estado=, ?residente=
+        """
+        queryset = exportacion.filtrar(request, self.get_queryset(), 'fecha_emision', ESTADOS_GASTO)
+        queryset = queryset.order_by('fecha_emision', 'id')
+        nombre = f"gastos_comunes_{request.query_params.get('periodo') or timezone.localdate().isoformat()}"
+        return exportacion.exportar(request, queryset, COLUMNAS_EXPORTACION, nombre)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @con_etag('gastos')
     def estadisticas(self, request):
         """
         Retorna estadísticas de gastos comunes (solo para administradores)
@@ -123,19 +202,25 @@ class GastoComunViewSet(viewsets.ModelViewSet):
         if request.user.rol != 'admin':
             raise PermissionDenied("Solo los administradores pueden ver estadísticas")
         
-        total_gastos = GastoComun.objects.count()
-        total_pendientes = GastoComun.objects.filter(estado='pendiente').count()
-        total_pagados = GastoComun.objects.filter(estado='pagado').count()
+        queryset = GastoComun.objects.all()
+        datos = estadisticas.resumen(queryset, ESTADOS_GASTO, campo_monto='monto')
+        respuesta = {
+            'total_gastos': datos['total'],
+            'total_pendientes': datos['total_pendiente'],
+            'total_pagados': datos['total_pagado'],
+            'monto_pendiente': datos['monto_pendiente'],
+            'monto_pagado': datos['monto_pagado']
+        }
         
-        # Obtener el monto total de gastos pendientes y pagados
-        from django.db.models import Sum
-        monto_pendiente = GastoComun.objects.filter(estado='pendiente').aggregate(Sum('monto'))
-        monto_pagado = GastoComun.objects.filter(estado='pagado').aggregate(Sum('monto'))
+        # Desgloses opcionales (?desglose=mes,residente), una consulta agrupada cada uno
+        desgloses = estadisticas.desgloses_solicitados(request)
+        if 'mes' in desgloses:
+            respuesta['por_mes'] = estadisticas.desglose_mensual(
+                queryset, 'fecha_emision', ESTADOS_GASTO, campo_monto='monto'
+            )
+        if 'residente' in desgloses:
+            respuesta['por_residente'] = estadisticas.desglose_por_residente(
+                queryset, ESTADOS_GASTO, campo_monto='monto'
+            )
         
-        return Response({
-            'total_gastos': total_gastos,
-            'total_pendientes': total_pendientes,
-            'total_pagados': total_pagados,
-            'monto_pendiente': monto_pendiente['monto__sum'] or 0,
-            'monto_pagado': monto_pagado['monto__sum'] or 0
-        })
+        return Response(respuesta)
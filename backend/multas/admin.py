@@ -8,6 +8,7 @@ class MultaAdmin(admin.ModelAdmin):
     list_display = ('id', 'residente', 'motivo', 'precio', 'estado', 'fecha_creacion')
     list_filter = ('estado', 'fecha_creacion')
     search_fields = ('motivo', 'descripcion', 'residente__username', 'residente__first_name', 'residente__last_name')
+    list_select_related = ('residente',)
     readonly_fields = ('fecha_creacion',)
     fieldsets = (
         ('Información de la Multa', {
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MultasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'multas'
+
+    def ready(self):
+        # Los ETag de las estadísticas de multas dependen de esta versión
+        from backend import versiones
+        from .models import Multa
+        versiones.conectar(Multa, 'multas', 'residente_id')
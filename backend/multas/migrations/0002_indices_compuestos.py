@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('multas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='multa',
+            index=models.Index(fields=['residente', '-fecha_creacion'], name='multa_res_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multa',
+            index=models.Index(fields=['residente', 'estado', '-fecha_creacion'], name='multa_res_estado_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multa',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='multa_estado_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multa',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='multa_creacion_id_idx'),
+        ),
+    ]
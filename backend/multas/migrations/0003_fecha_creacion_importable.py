@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-18 10:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('multas', '0002_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='multa',
+            name='fecha_creacion',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('multas', '0003_fecha_creacion_importable'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='multa',
+            index=models.Index(fields=['precio', 'id'], name='multa_precio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multa',
+            index=models.Index(fields=['motivo'], name='multa_motivo_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from usuarios.models import Usuario
 from model_utils import FieldTracker
 
@@ -22,14 +23,36 @@ class Multa(models.Model):
     descripcion = models.TextField()
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     estado = models.CharField(max_length=10, choices=ESTADOS, default='pendiente')
-    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # default en lugar de auto_now_add para poder importar multas históricas con su fecha
+    fecha_creacion = models.DateTimeField(default=timezone.now, editable=False)
     fecha_pago = models.DateTimeField(null=True, blank=True)
-    tracker = FieldTracker(fields=['estado'])
+    tracker = FieldTracker(fields=['estado', 'precio', 'residente_id'])
 
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Listado de un residente
+            models.Index(fields=['residente', '-fecha_creacion'], name='multa_res_creacion_idx'),
+            # Filtros por estado de un residente
+            models.Index(fields=['residente', 'estado', '-fecha_creacion'], name='multa_res_estado_creacion_idx'),
+            # Filtros por estado del administrador
+            models.Index(fields=['estado', '-fecha_creacion'], name='multa_estado_creacion_idx'),
+            # Orden del listado y desempate de la paginación keyset
+            models.Index(fields=['-fecha_creacion', '-id'], name='multa_creacion_id_idx'),
+            # Filtros y orden del listado (backend.filtros): rango/orden por precio
+            # y búsqueda por prefijo del motivo
+            models.Index(fields=['precio', 'id'], name='multa_precio_id_idx'),
+            models.Index(fields=['motivo'], name='multa_motivo_idx'),
+        ]
         verbose_name = 'Multa'
         verbose_name_plural = 'Multas'
     
     def __str__(self):
-        return f"Multa {self.id} - {self.residente.username} - {self.motivo} - {self.estado}"
+        return f"Multa {self.id} - {self.residente_display} - {self.motivo} - {self.estado}"
+
+    @property
+    def residente_display(self):
+        """Username del residente si ya está cargado; si no, su id (evita una consulta por fila)."""
+        if self._meta.get_field('residente').is_cached(self):
+            return self.residente.username
+        return self.residente_id
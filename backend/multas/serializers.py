@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from backend.lectura import Lector
 from .models import Multa
 from usuarios.serializers import UsuarioSerializer
 
@@ -8,6 +9,9 @@ class MultaSerializer(serializers.ModelSerializer):
         fields = ['id', 'residente', 'motivo', 'descripcion', 'precio', 'estado', 'fecha_creacion', 'fecha_pago']
         read_only_fields = ['fecha_creacion']
 
+# Listados: mismas columnas y formato que MultaSerializer, desde values_list()
+LECTOR_MULTAS = Lector(MultaSerializer)
+
 class MultaDetalleSerializer(serializers.ModelSerializer):
     residente = UsuarioSerializer(read_only=True)
     
@@ -1,3 +1,73 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from backend.testing import ConsultasConstantesMixin, usar_cache_compartido
+from usuarios.models import Usuario
+from .models import Multa
 
 # Create your tests here.
+
+class MultaConsultasTest(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.client = APIClient()
+
+    def agregar_multas(self, cantidad):
+        Multa.objects.bulk_create([
+            Multa(residente=self.residente, motivo='Ruidos molestos', descripcion='Fiesta', precio=5000)
+            for _ in range(cantidad)
+        ])
+
+    def test_listado_sin_n_mas_1(self):
+        for usuario in (self.admin, self.residente):
+            with self.subTest(rol=usuario.rol):
+                self.client.force_authenticate(usuario)
+                self.assertConsultasConstantes(
+                    lambda: self.client.get('/api/multas/'), self.agregar_multas
+                )
+
+    def test_detalle_anula_sin_consultar_residente_aparte(self):
+        self.agregar_multas(1)
+        multa = Multa.objects.get()
+        self.client.force_authenticate(self.admin)
+
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get(f'/api/multas/{multa.id}/')
+        )
+        self.assertEqual(respuesta.json()['residente']['username'], 'residente')
+        self.assertEqual(len(consultas), 1)
+
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.post(f'/api/multas/{multa.id}/anular/')
+        )
+        self.assertEqual(respuesta.json()['estado'], 'anulada')
+        lecturas_de_usuarios = [
+            consulta['sql'] for consulta in consultas
+            if 'usuarios_usuario' in consulta['sql'] and 'multas_multa' not in consulta['sql']
+        ]
+        self.assertEqual(lecturas_de_usuarios, [])
+
+    def test_str_no_consulta_al_residente(self):
+        self.agregar_multas(3)
+        multas = list(Multa.objects.all())
+        _, consultas = self.contar_consultas(lambda: [str(multa) for multa in multas])
+        self.assertEqual(len(consultas), 0)
+
+    @override_settings(RESPUESTAS_CACHE_ACTIVO=True)
+    def test_listado_admin_desde_cache_hasta_que_cambian_las_multas(self):
+        usar_cache_compartido(self, 'VERSIONES_CACHE')
+        self.agregar_multas(2)
+        self.client.force_authenticate(self.admin)
+        self.client.get('/api/multas/')
+
+        respuesta, consultas = self.contar_consultas(lambda: self.client.get('/api/multas/'))
+        self.assertEqual(len(respuesta.json()), 2)
+        self.assertEqual(len(consultas), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Multa.objects.create(residente=self.residente, motivo='Mascota', descripcion='Sin correa', precio=3000)
+        respuesta, consultas = self.contar_consultas(lambda: self.client.get('/api/multas/'))
+        self.assertEqual(len(respuesta.json()), 3)
+        self.assertEqual(len(consultas), 1)
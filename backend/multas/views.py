@@ -5,14 +5,39 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from .models import Multa
-from .serializers import MultaSerializer, MultaDetalleSerializer
-from django.db.models import Sum
+from .serializers import MultaSerializer, MultaDetalleSerializer, LECTOR_MULTAS
+from backend import estadisticas, exportacion, pagos
+from backend.filtros import FiltrosCargos
+from backend.cache_respuestas import cache_respuesta
+from backend.versiones import con_etag
+
+ESTADOS_MULTA = [estado for estado, _ in Multa.ESTADOS]
+# Acciones que serializan al residente completo (MultaDetalleSerializer)
+ACCIONES_CON_RESIDENTE = {'retrieve', 'pagar', 'anular'}
+COLUMNAS_EXPORTACION = [
+    ('ID', 'id'),
+    ('Residente', 'residente__username'),
+    ('Residencia', 'residente__numero_residencia'),
+    ('Motivo', 'motivo'),
+    ('Descripción', 'descripcion'),
+    ('Precio', 'precio'),
+    ('Estado', 'estado'),
+    ('Fecha creación', 'fecha_creacion'),
+    ('Fecha pago', 'fecha_pago'),
+]
 
 # Create your views here.
 
 class MultaViewSet(viewsets.ModelViewSet):
     queryset = Multa.objects.all()
     serializer_class = MultaSerializer
+    # Filtros por parámetros de consulta (backend.filtros)
+    filter_backends = [FiltrosCargos]
+    filtro_estados = ESTADOS_MULTA
+    filtro_fechas = ['fecha_creacion']
+    filtro_monto = 'precio'
+    filtro_busqueda = 'motivo'
+    filtro_orden = ['fecha_creacion', 'precio']
    
     def get_permissions(self):
         """
@@ -36,10 +61,20 @@ class MultaViewSet(viewsets.ModelViewSet):
         - Los residentes solo pueden ver sus propias multas
         """
         user = self.request.user
+        queryset = Multa.objects.all()
+        if self.action in ACCIONES_CON_RESIDENTE:
+            # El serializador de detalle anida al residente: se trae en el mismo JOIN
+            queryset = queryset.select_related('residente')
         if user.rol == 'admin':
-            return Multa.objects.all()
-        return Multa.objects.filter(residente=user)
+            return queryset
+        return queryset.filter(residente=user)
    
+    @cache_respuesta('multas')
+    def list(self, request, *args, **kwargs):
+        # El listado completo del administrador se sirve desde el cache de respuestas;
+        # el resto se serializa desde values_list() sin instanciar modelos
+        return LECTOR_MULTAS.listar(self, self.filter_queryset(self.get_queryset()))
+
     def perform_create(self, serializer):
         """Solo los administradores pueden crear multas"""
         if self.request.user.rol != 'admin':
@@ -59,6 +94,18 @@ class MultaViewSet(viewsets.ModelViewSet):
         instance.delete()
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def exportar(self, request):
+        """
+        Descarga las multas visibles para el usuario en CSV (o XLSX con ?formato=xlsx).
+        Filtros: ?periodo=AAAA-MM, ?desde=, ?hasta=, ?estado=, ?residente=
+        """
+        queryset = exportacion.filtrar(request, self.get_queryset(), 'fecha_creacion', ESTADOS_MULTA)
+        queryset = queryset.order_by('fecha_creacion', 'id')
+        nombre = f"multas_{request.query_params.get('periodo') or timezone.localdate().isoformat()}"
+        return exportacion.exportar(request, queryset, COLUMNAS_EXPORTACION, nombre)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @con_etag('multas')
     def estadisticas(self, request):
         """
         Retorna estadísticas de multas (solo para administradores)
@@ -66,23 +113,29 @@ class MultaViewSet(viewsets.ModelViewSet):
         if request.user.rol != 'admin':
             raise PermissionDenied("Solo los administradores pueden ver estadísticas")
         
-        total_multas = Multa.objects.count()
-        total_pendientes = Multa.objects.filter(estado='pendiente').count()
-        total_pagadas = Multa.objects.filter(estado='pagada').count()
-        total_anuladas = Multa.objects.filter(estado='anulada').count()
+        queryset = Multa.objects.all()
+        datos = estadisticas.resumen(queryset, ESTADOS_MULTA, campo_monto='precio')
+        respuesta = {
+            'total_multas': datos['total'],
+            'total_pendientes': datos['total_pendiente'],
+            'total_pagadas': datos['total_pagada'],
+            'total_anuladas': datos['total_anulada'],
+            'monto_pendiente': datos['monto_pendiente'],
+            'monto_pagado': datos['monto_pagada']
+        }
         
-        # Obtener el monto total de multas pendientes y pagadas
-        monto_pendiente = Multa.objects.filter(estado='pendiente').aggregate(Sum('precio'))
-        monto_pagado = Multa.objects.filter(estado='pagada').aggregate(Sum('precio'))
+        # Desgloses opcionales (?desglose=mes,residente), una consulta agrupada cada uno
+        desgloses = estadisticas.desgloses_solicitados(request)
+        if 'mes' in desgloses:
+            respuesta['por_mes'] = estadisticas.desglose_mensual(
+                queryset, 'fecha_creacion', ESTADOS_MULTA, campo_monto='precio'
+            )
+        if 'residente' in desgloses:
+            respuesta['por_residente'] = estadisticas.desglose_por_residente(
+                queryset, ESTADOS_MULTA, campo_monto='precio'
+            )
         
-        return Response({
-            'total_multas': total_multas,
-            'total_pendientes': total_pendientes,
-            'total_pagadas': total_pagadas,
-            'total_anuladas': total_anuladas,
-            'monto_pendiente': monto_pendiente['precio__sum'] or 0,
-            'monto_pagado': monto_pagado['precio__sum'] or 0
-        })
+        return Response(respuesta)
    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def pagar(self, request, pk=None):
@@ -93,7 +146,7 @@ class MultaViewSet(viewsets.ModelViewSet):
         multa = self.get_object()
        
         # Verificar que la multa pertenezca al usuario que hace la solicitud
-        if request.user.rol != 'admin' and multa.residente != request.user:
+        if request.user.rol != 'admin' and multa.residente_id != request.user.id:
             return Response(
                 {"error": "No tienes permiso para pagar esta multa"},
                 status=status.HTTP_403_FORBIDDEN
@@ -113,6 +166,20 @@ class MultaViewSet(viewsets.ModelViewSet):
        
         serializer = MultaDetalleSerializer(multa)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def pagar_lote(self, request):
+        """
+        Paga varias multas en una sola operación: {"ids": [1, 2, 3]}.
+        Si algún cargo no existe, no pertenece al residente o no está pendiente, no se paga ninguno.
+        Retorna el comprobante del pago.
+        """
+        ids = pagos.leer_ids(request.data)
+        try:
+            comprobante = pagos.pagar_lote('multas', ids, request.user)
+        except pagos.PagoRechazado as rechazo:
+            return Response(rechazo.datos, status=rechazo.status_code)
+        return Response(comprobante)
    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def anular(self, request, pk=None):
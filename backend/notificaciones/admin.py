@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notificacion
+from .models import Notificacion, EventoNotificacion, NotificacionArchivada
 
 @admin.register(Notificacion)
 class NotificacionAdmin(admin.ModelAdmin):
@@ -7,3 +7,24 @@ class NotificacionAdmin(admin.ModelAdmin):
     list_filter = ('tipo', 'leida', 'fecha_creacion')
     search_fields = ('titulo', 'mensaje', 'usuario__username')
     date_hierarchy = 'fecha_creacion'
+    list_select_related = ('usuario',)
+
+@admin.register(EventoNotificacion)
+class EventoNotificacionAdmin(admin.ModelAdmin):
+    list_display = ('clave', 'tipo', 'estado', 'intentos', 'fecha_creacion', 'fecha_procesado')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('clave',)
+    readonly_fields = ('fecha_creacion', 'fecha_procesado', 'ultimo_error')
+
+@admin.register(NotificacionArchivada)
+class NotificacionArchivadaAdmin(admin.ModelAdmin):
+    list_display = ('titulo', 'usuario_id', 'tipo', 'fecha_creacion', 'leida', 'fecha_archivado')
+    list_filter = ('tipo', 'leida')
+    search_fields = ('titulo',)
+    date_hierarchy = 'fecha_creacion'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
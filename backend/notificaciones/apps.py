@@ -4,4 +4,12 @@ from django.apps import AppConfig
 
 class NotificacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'notificaciones'
\ No newline at end of file
+    name = 'notificaciones'
+
+    def ready(self):
+        # Registrar los receivers de post_save que generan notificaciones
+        from . import signals  # noqa: F401
+        # Los ETag del listado de notificaciones dependen de esta versión
+        from backend import versiones
+        from .models import Notificacion
+        versiones.conectar(Notificacion, 'notificaciones', 'usuario_id')
@@ -0,0 +1,205 @@
+"""
+Contador de notificaciones no leídas mantenido en cache.
+
+El valor se incrementa cuando se crean notificaciones y se decrementa o se
+reinicia al marcarlas como leídas o eliminarlas, de modo que el endpoint
+``contador`` responde sin contar filas. El cache se elige con
+``NOTIFICACIONES_CONTADOR_CACHE`` y debe ser compartido entre procesos: con el
+outbox, los incrementos los hace el worker ``procesar_notificaciones``. Con un
+cache por proceso (locmem) no se mantiene nada y ``obtener`` cuenta las filas
+con los índices ``(usuario, leida)`` y ``(audiencia, fecha_creacion)``.
+Las desviaciones se corrigen con ``python manage.py reconciliar_contadores``.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+
+from backend.caches import es_compartido
+from .models import LecturaNotificacion, Notificacion
+
+PREFIJO = 'notificaciones:no_leidas'
+CLAVE_GENERACION = f'{PREFIJO}:generacion'
+# Acota la vida de un valor desviado aunque no corra la reconciliación
+TIMEOUT = 3600
+
+
+def _alias():
+    return getattr(settings, 'NOTIFICACIONES_CONTADOR_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def en_cache():
+    """Los contadores solo se mantienen en un cache que vean todos los procesos."""
+    return es_compartido(_alias())
+
+
+def _generacion():
+    """
+    Las claves por usuario incluyen una generación; cuando cambian las
+    notificaciones de muchos usuarios a la vez basta con avanzarla para
+    invalidarlas todas. Se inicializa con la hora en nanosegundos: si el cache
+    la pierde, no vuelve a un valor anterior con contadores antiguos aún guardados.
+    """
+    generacion = _cache().get(CLAVE_GENERACION)
+    if generacion is None:
+        inicial = time.time_ns()
+        _cache().add(CLAVE_GENERACION, inicial, None)
+        generacion = _cache().get(CLAVE_GENERACION, inicial)
+    return generacion
+
+
+def _clave(usuario_id, generacion=None):
+    return f'{PREFIJO}:{generacion or _generacion()}:{usuario_id}'
+
+
+def _compartidas_no_leidas(usuario_id):
+    # Compartidas con los administradores sin acuse de lectura del usuario
+    return (
+        Notificacion.objects
+        .filter(audiencia=Notificacion.AUDIENCIA_ADMINS)
+        .exclude(Exists(LecturaNotificacion.objects.filter(notificacion=OuterRef('pk'), usuario_id=usuario_id)))
+    )
+
+
+def _contar(usuario):
+    total = Notificacion.objects.filter(usuario_id=usuario.id, leida=False).count()
+    if usuario.rol == 'admin':
+        total += _compartidas_no_leidas(usuario.id).count()
+    return total
+
+
+def obtener(usuario):
+    """Retorna las notificaciones no leídas visibles para el usuario."""
+    if not en_cache():
+        return _contar(usuario)
+    clave = _clave(usuario.id)
+    valor = _cache().get(clave)
+    if valor is None or valor < 0:
+        valor = _contar(usuario)
+        _cache().set(clave, valor, TIMEOUT)
+    return valor
+
+
+def _ajustar(clave, delta):
+    try:
+        if delta >= 0:
+            _cache().incr(clave, delta)
+        else:
+            _cache().decr(clave, -delta)
+    except ValueError:
+        # La clave no está en cache: se calculará en la próxima lectura
+        pass
+
+
+def _aplicar(deltas):
+    if not en_cache():
+        return
+    generacion = _generacion()
+    for usuario_id, delta in deltas.items():
+        if usuario_id is not None and delta:
+            _ajustar(_clave(usuario_id, generacion), delta)
+
+
+def registrar_creadas(notificaciones):
+    """Incrementa los contadores una vez confirmada la creación de notificaciones."""
+    from .services import obtener_ids_admins
+
+    if not en_cache():
+        return
+    deltas = Counter(
+        notificacion.usuario_id for notificacion in notificaciones
+        if not notificacion.leida and notificacion.audiencia is None
+    )
+    compartidas = sum(1 for notificacion in notificaciones if notificacion.audiencia is not None)
+    if compartidas:
+        # Un incremento en cache por administrador; en la base de datos es una sola fila
+        for admin_id in obtener_ids_admins():
+            deltas[admin_id] += compartidas
+    if deltas:
+        transaction.on_commit(lambda: _aplicar(deltas))
+
+
+def registrar_leidas(usuario_id, cantidad=1):
+    """Descuenta notificaciones no leídas de un usuario que dejaron de estarlo."""
+    if cantidad:
+        transaction.on_commit(lambda: _aplicar({usuario_id: -cantidad}))
+
+
+def registrar_retiradas(no_leidas_por_usuario):
+    """Descuenta las no leídas eliminadas en lote (p. ej. archivadas): ``{usuario_id: cantidad}``."""
+    deltas = {usuario_id: -cantidad for usuario_id, cantidad in no_leidas_por_usuario.items() if cantidad}
+    if deltas:
+        transaction.on_commit(lambda: _aplicar(deltas))
+
+
+def reiniciar_usuario(usuario_id):
+    """El usuario marcó todas sus notificaciones como leídas."""
+    if en_cache():
+        transaction.on_commit(lambda: _cache().set(_clave(usuario_id), 0, TIMEOUT))
+
+
+def invalidar_todos():
+    """
+    Invalida los contadores de todos los usuarios (p. ej. al eliminar
+    notificaciones compartidas, que cuentan para cada administrador que no las leyó).
+    """
+    if not en_cache():
+        return
+
+    def aplicar():
+        try:
+            _cache().incr(CLAVE_GENERACION)
+        except ValueError:
+            _cache().add(CLAVE_GENERACION, 1, None)
+    transaction.on_commit(aplicar)
+
+
+def reconciliar():
+    """
+    Recalcula todos los contadores desde la base de datos con consultas
+    agrupadas y los escribe en cache. Retorna la cantidad de usuarios con
+    notificaciones pendientes, o ``None`` si el cache no es compartido (no hay
+    contadores que corregir).
+    """
+    from usuarios.models import Usuario
+
+    if not en_cache():
+        return None
+
+    no_leidas = Counter(dict(
+        Notificacion.objects
+        .filter(leida=False, usuario__isnull=False)
+        .order_by()
+        .values('usuario')
+        .annotate(total=Count('id'))
+        .values_list('usuario', 'total')
+    ))
+    # Los acuses solo existen para compartidas aún en la tabla (se eliminan con
+    # ellas), así que las no leídas de cada administrador son el total menos sus acuses
+    compartidas = Notificacion.objects.filter(audiencia=Notificacion.AUDIENCIA_ADMINS).count()
+    if compartidas:
+        acuses = dict(
+            LecturaNotificacion.objects
+            .order_by()
+            .values('usuario')
+            .annotate(total=Count('id'))
+            .values_list('usuario', 'total')
+        )
+        for admin_id in Usuario.objects.filter(rol='admin').values_list('id', flat=True):
+            no_leidas[admin_id] += compartidas - acuses.get(admin_id, 0)
+    no_leidas = +no_leidas
+
+    generacion = _generacion()
+    valores = {
+        _clave(usuario_id, generacion): no_leidas.get(usuario_id, 0)
+        for usuario_id in Usuario.objects.values_list('id', flat=True).iterator()
+    }
+    _cache().set_many(valores, TIMEOUT)
+    return len(no_leidas)
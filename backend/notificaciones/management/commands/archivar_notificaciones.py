@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notificaciones import retencion
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva las notificaciones antiguas (tabla NotificacionArchivada o JSONL "
+        "comprimido) y las elimina de la tabla activa por lotes. Pensado para "
+        "correr periódicamente (cron) o en bucle con --intervalo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Antigüedad mínima de las leídas (por defecto NOTIFICACIONES_RETENCION_DIAS).')
+        parser.add_argument('--dias-no-leidas', type=int, default=None,
+                            help='Antigüedad mínima de las no leídas '
+                                 '(por defecto NOTIFICACIONES_RETENCION_NO_LEIDAS_DIAS).')
+        parser.add_argument('--destino', choices=retencion.DESTINOS, default=None,
+                            help='Dónde archivar (por defecto NOTIFICACIONES_ARCHIVO).')
+        parser.add_argument('--directorio', default=None,
+                            help='Directorio de los JSONL (por defecto NOTIFICACIONES_ARCHIVO_DIRECTORIO).')
+        parser.add_argument('--batch-size', type=int, default=retencion.BATCH_SIZE,
+                            help='Notificaciones archivadas por transacción.')
+        parser.add_argument('--pausa', type=float, default=0,
+                            help='Segundos de espera entre lotes.')
+        parser.add_argument('--intervalo', type=float, default=None,
+                            help='Repetir cada N segundos en lugar de correr una sola vez.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size debe ser mayor que 0.")
+        while True:
+            resumen = retencion.archivar(
+                dias=options['dias'],
+                dias_no_leidas=options['dias_no_leidas'],
+                destino=options['destino'],
+                directorio=options['directorio'],
+                batch_size=options['batch_size'],
+                pausa=options['pausa'],
+            )
+            mensaje = (f"Notificaciones archivadas en {resumen['destino']}: {resumen['leidas']} leídas, "
+                       f"{resumen['compartidas']} compartidas, {resumen['no_leidas']} no leídas "
+                       f"({resumen['lotes']} lotes)")
+            if resumen.get('archivo'):
+                mensaje += f" -> {resumen['archivo']}"
+            self.stdout.write(self.style.SUCCESS(mensaje))
+            if options['intervalo'] is None:
+                return
+            time.sleep(options['intervalo'])
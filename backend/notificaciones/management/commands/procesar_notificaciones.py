@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificaciones import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa el outbox de notificaciones: convierte los eventos pendientes en "
+        "notificaciones por lotes, con reintentos. Por defecto queda escuchando; "
+        "usa --una-vez para drenar la cola y terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Eventos procesados por transacción.')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--max-intentos', type=int, default=outbox.MAX_INTENTOS,
+                            help='Intentos antes de marcar un evento como fallido.')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Drenar la cola disponible y terminar.')
+        parser.add_argument('--purgar-dias', type=int, default=None,
+                            help='Eliminar eventos procesados hace más de N días.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_intentos = options['max_intentos']
+
+        if options['purgar_dias'] is not None:
+            eliminados = outbox.purgar_procesados(options['purgar_dias'])
+            self.stdout.write(f"Eventos procesados eliminados: {eliminados}")
+
+        if options['una_vez']:
+            procesados, fallidos = outbox.drenar(batch_size, max_intentos)
+            self.stdout.write(self.style.SUCCESS(
+                f"Eventos procesados: {procesados}, con error: {fallidos}"
+            ))
+            return
+
+        self.stdout.write("Procesando notificaciones (Ctrl+C para detener)...")
+        try:
+            while True:
+                procesados, fallidos = outbox.drenar(batch_size, max_intentos)
+                if procesados or fallidos:
+                    self.stdout.write(f"Eventos procesados: {procesados}, con error: {fallidos}")
+                else:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido.")
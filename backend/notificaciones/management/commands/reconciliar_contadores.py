@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificaciones import contador
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los contadores de notificaciones no leídas desde la base de datos "
+        "para corregir desviaciones del cache. Pensado para correr periódicamente "
+        "(cron) o en bucle con --intervalo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=None,
+                            help='Repetir cada N segundos en lugar de correr una sola vez.')
+
+    def handle(self, *args, **options):
+        if not contador.en_cache():
+            self.stdout.write(
+                "NOTIFICACIONES_CONTADOR_CACHE no es un cache compartido: los contadores "
+                "se calculan con COUNT en cada consulta y no hay nada que reconciliar."
+            )
+            return
+        while True:
+            usuarios = contador.reconciliar()
+            self.stdout.write(f"Contadores reconciliados ({usuarios} usuarios con notificaciones sin leer)")
+            if options['intervalo'] is None:
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 10:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoNotificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('tipo', models.CharField(choices=[('multa_creada', 'Multa Creada'), ('multa_pagada', 'Multa Pagada'), ('multa_anulada', 'Multa Anulada'), ('gasto_creado', 'Gasto Común Creado'), ('gasto_pagado', 'Gasto Común Pagado'), ('gasto_vencido', 'Gasto Común Vencido'), ('usuario_creado', 'Usuario Creado'), ('sistema', 'Sistema')], max_length=20)),
+                ('objeto_id', models.IntegerField(blank=True, null=True)),
+                ('objeto_tipo', models.CharField(blank=True, max_length=50, null=True)),
+                ('destinatarios', models.JSONField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesado', 'Procesado'), ('fallido', 'Fallido')], default='pendiente', max_length=10)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_procesado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventonotificacion',
+            index=models.Index(fields=['estado', 'disponible_desde'], name='notif_outbox_pendientes_idx'),
+        ),
+    ]
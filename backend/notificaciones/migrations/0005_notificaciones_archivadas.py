@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0004_marca_proceso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('usuario_id', models.BigIntegerField(blank=True, null=True)),
+                ('tipo', models.CharField(choices=[('multa_creada', 'Multa Creada'), ('multa_pagada', 'Multa Pagada'), ('multa_anulada', 'Multa Anulada'), ('gasto_creado', 'Gasto Común Creado'), ('gasto_pagado', 'Gasto Común Pagado'), ('gasto_vencido', 'Gasto Común Vencido'), ('usuario_creado', 'Usuario Creado'), ('sistema', 'Sistema')], max_length=20)),
+                ('titulo', models.CharField(max_length=100)),
+                ('mensaje', models.TextField()),
+                ('fecha_creacion', models.DateTimeField()),
+                ('leida', models.BooleanField(default=True)),
+                ('objeto_id', models.IntegerField(blank=True, null=True)),
+                ('objeto_tipo', models.CharField(blank=True, max_length=50, null=True)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación archivada',
+                'verbose_name_plural': 'Notificaciones archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificacionarchivada',
+            index=models.Index(fields=['usuario_id', '-fecha_creacion'], name='notif_arch_usuario_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notificaciones', '0005_notificaciones_archivadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturaNotificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_lectura', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='audiencia',
+            field=models.CharField(blank=True, choices=[('admins', 'Administradores')], max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='audiencia',
+            field=models.CharField(blank=True, choices=[('admins', 'Administradores')], max_length=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['audiencia', '-fecha_creacion'], name='notif_audiencia_creacion_idx'),
+        ),
+        migrations.AddField(
+            model_name='lecturanotificacion',
+            name='notificacion',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lecturas', to='notificaciones.notificacion'),
+        ),
+        migrations.AddField(
+            model_name='lecturanotificacion',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='lecturanotificacion',
+            constraint=models.UniqueConstraint(fields=('usuario', 'notificacion'), name='notif_lectura_unica'),
+        ),
+    ]
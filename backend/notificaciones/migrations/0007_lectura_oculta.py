@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0006_notificaciones_compartidas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecturanotificacion',
+            name='oculta',
+            field=models.BooleanField(default=False),
+        ),
+    ]
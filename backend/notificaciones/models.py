@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Notificacion(models.Model):
     TIPO_CHOICES = [
@@ -12,6 +13,12 @@ class Notificacion(models.Model):
         ('usuario_creado', 'Usuario Creado'),
         ('sistema', 'Sistema'),
     ]
+    # Notificación compartida por todos los administradores (una fila por
+    # evento, con usuario nulo); cada uno la marca como leída en LecturaNotificacion
+    AUDIENCIA_ADMINS = 'admins'
+    AUDIENCIAS = [
+        (AUDIENCIA_ADMINS, 'Administradores'),
+    ]
     
     usuario = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
@@ -28,9 +35,136 @@ class Notificacion(models.Model):
     # Para vincular la notificación con el objeto relacionado (opcional)
     objeto_id = models.IntegerField(null=True, blank=True)
     objeto_tipo = models.CharField(max_length=50, null=True, blank=True)
+    audiencia = models.CharField(max_length=10, choices=AUDIENCIAS, null=True, blank=True)
     
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            # contador y marcar_como_leidas de un usuario
+            models.Index(fields=['usuario', 'leida'], name='notif_usuario_leida_idx'),
+            # Listado de notificaciones de un usuario
+            models.Index(fields=['usuario', '-fecha_creacion'], name='notif_usuario_creacion_idx'),
+            # Listado del administrador y desempate de la paginación keyset
+            models.Index(fields=['-fecha_creacion', '-id'], name='notif_creacion_id_idx'),
+            # Retención de leídas y no leídas por antigüedad
+            models.Index(fields=['leida', '-fecha_creacion'], name='notif_leida_creacion_idx'),
+            # Difusiones a administradores: listado, contador y retención
+            models.Index(fields=['audiencia', '-fecha_creacion'], name='notif_audiencia_creacion_idx'),
+            # Búsqueda de notificaciones de un objeto (deduplicación de avisos)
+            models.Index(fields=['objeto_tipo', 'objeto_id'], name='notif_objeto_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} - {self.fecha_creacion.strftime('%d/%m/%Y %H:%M')}"
+
+
+class LecturaNotificacion(models.Model):
+    """
+    Acuse de lectura de un administrador sobre una notificación compartida.
+    Con ``oculta`` el administrador además la eliminó: deja de verla, pero
+    sigue existiendo para los demás administradores.
+    """
+    notificacion = models.ForeignKey(Notificacion, on_delete=models.CASCADE, related_name='lecturas')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    fecha_lectura = models.DateTimeField(auto_now_add=True)
+    oculta = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            # También sirve de índice para "¿la leyó este usuario?"
+            models.UniqueConstraint(fields=['usuario', 'notificacion'], name='notif_lectura_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} leyó {self.notificacion_id}"
+
+
+class NotificacionArchivada(models.Model):
+    """
+    Notificaciones antiguas retiradas de la tabla ``Notificacion`` por
+    ``notificaciones.retencion``. Conserva el id original y guarda el usuario
+    como entero (sin clave foránea ni cascadas) para que la tabla activa solo
+    contenga las notificaciones recientes.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    usuario_id = models.BigIntegerField(null=True, blank=True)
+    tipo = models.CharField(max_length=20, choices=Notificacion.TIPO_CHOICES)
+    titulo = models.CharField(max_length=100)
+    mensaje = models.TextField()
+    fecha_creacion = models.DateTimeField()
+    leida = models.BooleanField(default=True)
+    objeto_id = models.IntegerField(null=True, blank=True)
+    objeto_tipo = models.CharField(max_length=50, null=True, blank=True)
+    audiencia = models.CharField(max_length=10, choices=Notificacion.AUDIENCIAS, null=True, blank=True)
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # Historial archivado de un usuario
+            models.Index(fields=['usuario_id', '-fecha_creacion'], name='notif_arch_usuario_idx'),
+        ]
+        verbose_name = 'Notificación archivada'
+        verbose_name_plural = 'Notificaciones archivadas'
+
+    def __str__(self):
+        return f"{self.titulo} - {self.fecha_creacion.strftime('%d/%m/%Y %H:%M')}"
+
+
+class EventoNotificacion(models.Model):
+    """
+    Outbox transaccional de notificaciones.
+    Cada evento de negocio inserta una sola fila aquí, dentro de la misma
+    transacción que lo origina, y el comando ``procesar_notificaciones`` la
+    convierte después en las notificaciones de cada destinatario.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesado', 'Procesado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    # Clave de idempotencia de la ocurrencia (outbox.clave_evento): una misma
+    # ocurrencia encolada dos veces se ignora
+    clave = models.CharField(max_length=100, unique=True)
+    tipo = models.CharField(max_length=20, choices=Notificacion.TIPO_CHOICES)
+    objeto_id = models.IntegerField(null=True, blank=True)
+    objeto_tipo = models.CharField(max_length=50, null=True, blank=True)
+    # Lista de [ids_usuarios o audiencia, titulo, mensaje]
+    destinatarios = models.JSONField()
+    estado = models.CharField(max_length=10, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, default='')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_procesado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['estado', 'disponible_desde'], name='notif_outbox_pendientes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} ({self.estado})"
+
+
+class MarcaProceso(models.Model):
+    """
+    Marca de avance (high-water mark) de un proceso periódico, para que cada
+    ejecución retome donde terminó la anterior en vez de revisar toda la tabla.
+    """
+    nombre = models.CharField(max_length=50, primary_key=True)
+    valor = models.CharField(max_length=100)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.valor}"
+
+    @classmethod
+    def leer(cls, nombre, por_defecto=None):
+        return cls.objects.filter(nombre=nombre).values_list('valor', flat=True).first() or por_defecto
+
+    @classmethod
+    def guardar(cls, nombre, valor):
+        cls.objects.update_or_create(nombre=nombre, defaults={'valor': str(valor)})
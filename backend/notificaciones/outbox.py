@@ -0,0 +1,151 @@
+"""
+Outbox transaccional de notificaciones.
+
+Los signals solo encolan un ``EventoNotificacion`` (un INSERT por evento, sin
+importar cuántos destinatarios tenga) y el worker ``procesar_notificaciones``
+drena la cola por lotes, con reintentos y backoff exponencial.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import EventoNotificacion
+from . import services
+
+MAX_INTENTOS = 5
+BACKOFF_BASE_SEGUNDOS = 30
+BACKOFF_MAXIMO_SEGUNDOS = 3600
+
+
+def clave_evento(tipo, objeto_id, objeto_tipo, ocurrencia=None):
+    """
+    Clave de idempotencia de una ocurrencia del evento.
+
+    Sin ``ocurrencia`` se genera un UUID al publicar: cada publicación es un
+    evento distinto (p. ej. una multa pagada, anulada y pagada otra vez). Quien
+    necesite deduplicar (un proceso que puede repetirse sobre los mismos datos)
+    pasa un identificador estable de la ocurrencia y lo reutiliza al reintentar.
+    """
+    return f'{tipo}:{objeto_tipo}:{objeto_id}:{ocurrencia or uuid.uuid4().hex}'
+
+
+def _construir_evento(tipo, objeto_id, objeto_tipo, destinatarios, clave=None):
+    return EventoNotificacion(
+        clave=clave or clave_evento(tipo, objeto_id, objeto_tipo),
+        tipo=tipo,
+        objeto_id=objeto_id,
+        objeto_tipo=objeto_tipo,
+        destinatarios=[list(destinatario) for destinatario in destinatarios]
+    )
+
+
+def encolar(tipo, objeto_id, objeto_tipo, destinatarios, clave=None):
+    """Encola un evento. Si ya existe uno con la misma clave, se ignora."""
+    encolar_lote([(tipo, objeto_id, objeto_tipo, destinatarios)], claves=[clave])
+
+
+def encolar_lote(eventos, claves=None, batch_size=500):
+    """
+    Encola varios eventos ``(tipo, objeto_id, objeto_tipo, destinatarios)`` con
+    inserciones por lotes. Los eventos sin clave reciben una nueva (ver
+    ``clave_evento``); los que repiten una clave ya encolada se descartan en la
+    base de datos.
+    """
+    claves = claves or [None] * len(eventos)
+    filas = [
+        _construir_evento(*evento, clave=clave)
+        for evento, clave in zip(eventos, claves)
+    ]
+    EventoNotificacion.objects.bulk_create(filas, batch_size=batch_size, ignore_conflicts=True)
+
+
+def _backoff(intentos):
+    return timedelta(seconds=min(BACKOFF_BASE_SEGUNDOS * 2 ** (intentos - 1), BACKOFF_MAXIMO_SEGUNDOS))
+
+
+def _disponibles():
+    """Eventos listos para procesar, bloqueados para este worker si el motor lo permite."""
+    eventos = (
+        EventoNotificacion.objects
+        .filter(estado='pendiente', disponible_desde__lte=timezone.now())
+        .order_by('id')
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        # Permite correr varios workers sin que procesen el mismo evento
+        eventos = eventos.select_for_update(skip_locked=True)
+    return eventos
+
+
+def _reclamar_lote(batch_size):
+    return list(_disponibles()[:batch_size])
+
+
+def procesar_lote(batch_size=100, max_intentos=MAX_INTENTOS):
+    """
+    Procesa un lote de eventos pendientes y retorna ``(procesados, fallidos)``.
+
+    Las notificaciones de todo el lote se escriben con un solo ``bulk_create``
+    en la misma transacción que marca los eventos como procesados. Si el lote
+    falla, se reintenta evento por evento para aislar al que produce el error.
+    """
+    with transaction.atomic():
+        eventos = _reclamar_lote(batch_size)
+        if not eventos:
+            return 0, 0
+
+        procesados, fallidos = [], []
+        try:
+            with transaction.atomic():
+                services.despachar_lote([
+                    (evento.tipo, evento.objeto_id, evento.objeto_tipo, evento.destinatarios)
+                    for evento in eventos
+                ])
+            procesados = eventos
+        except Exception:
+            for evento in eventos:
+                try:
+                    with transaction.atomic():
+                        services.despachar(
+                            evento.tipo, evento.objeto_id, evento.objeto_tipo, evento.destinatarios
+                        )
+                    procesados.append(evento)
+                except Exception as error:
+                    evento.ultimo_error = repr(error)
+                    fallidos.append(evento)
+
+        ahora = timezone.now()
+        if procesados:
+            EventoNotificacion.objects.filter(id__in=[evento.id for evento in procesados]).update(
+                estado='procesado', fecha_procesado=ahora, ultimo_error=''
+            )
+        for evento in fallidos:
+            evento.intentos += 1
+            evento.estado = 'fallido' if evento.intentos >= max_intentos else 'pendiente'
+            evento.disponible_desde = ahora + _backoff(evento.intentos)
+        if fallidos:
+            EventoNotificacion.objects.bulk_update(
+                fallidos, ['intentos', 'estado', 'disponible_desde', 'ultimo_error']
+            )
+    return len(procesados), len(fallidos)
+
+
+def drenar(batch_size=100, max_intentos=MAX_INTENTOS):
+    """Procesa lotes hasta vaciar la cola disponible. Retorna ``(procesados, fallidos)``."""
+    total_procesados = total_fallidos = 0
+    while True:
+        procesados, fallidos = procesar_lote(batch_size, max_intentos)
+        total_procesados += procesados
+        total_fallidos += fallidos
+        if procesados + fallidos < batch_size:
+            return total_procesados, total_fallidos
+
+
+def purgar_procesados(dias):
+    """Elimina los eventos ya procesados hace más de ``dias`` días."""
+    limite = timezone.now() - timedelta(days=dias)
+    eliminados, _ = EventoNotificacion.objects.filter(
+        estado='procesado', fecha_procesado__lt=limite
+    ).delete()
+    return eliminados
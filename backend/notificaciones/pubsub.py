@@ -0,0 +1,68 @@
+"""
+Pub/sub en proceso para el stream de notificaciones (SSE).
+
+Los suscriptores son conexiones abiertas en el event loop del servidor ASGI.
+Publicar solo "despierta" a las conexiones del usuario; cada conexión lee
+luego sus notificaciones nuevas desde la base de datos, así funciona igual
+con backends que no retornan ids en ``bulk_create`` (MySQL).
+
+Solo alcanza a las conexiones de este proceso: las notificaciones que crea el
+worker del outbox llegan al stream por el sondeo de versiones (ver
+``views.stream_notificaciones``).
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class Suscripcion:
+    def __init__(self, usuario_id, loop):
+        self.usuario_id = usuario_id
+        self.loop = loop
+        self.evento = asyncio.Event()
+
+    def despertar(self):
+        self.loop.call_soon_threadsafe(self.evento.set)
+
+
+class Broker:
+    def __init__(self):
+        self._suscripciones = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def suscribir(self, usuario_id):
+        """Debe llamarse desde el event loop que atenderá la conexión."""
+        suscripcion = Suscripcion(usuario_id, asyncio.get_running_loop())
+        with self._lock:
+            self._suscripciones[usuario_id].add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            suscripciones = self._suscripciones.get(suscripcion.usuario_id)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscripciones[suscripcion.usuario_id]
+
+    def publicar(self, usuario_ids):
+        """Despierta las conexiones de los usuarios indicados. Seguro desde cualquier hilo."""
+        with self._lock:
+            suscripciones = [
+                suscripcion
+                for usuario_id in set(usuario_ids)
+                for suscripcion in self._suscripciones.get(usuario_id, ())
+            ]
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.despertar()
+            except RuntimeError:
+                # El event loop de la conexión ya se cerró
+                self.desuscribir(suscripcion)
+
+    def conexiones(self):
+        with self._lock:
+            return sum(len(suscripciones) for suscripciones in self._suscripciones.values())
+
+
+broker = Broker()
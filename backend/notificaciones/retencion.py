@@ -0,0 +1,150 @@
+"""
+Retención de notificaciones: retira de la tabla activa las notificaciones antiguas.
+
+Cada evento escribe una fila por destinatario, así que ``Notificacion`` crece
+sin límite. ``archivar`` mueve a un archivo las leídas y las compartidas con
+los administradores con más de ``NOTIFICACIONES_RETENCION_DIAS`` días (y, si
+se configura, también las no leídas con más de
+``NOTIFICACIONES_RETENCION_NO_LEIDAS_DIAS``), de modo que la tabla activa solo
+contiene una ventana reciente y los listados, el contador y
+``marcar_como_leidas`` recorren índices pequeños.
+
+El archivo puede ser la tabla compacta ``NotificacionArchivada`` (``tabla``) o
+archivos JSONL comprimidos con gzip en ``NOTIFICACIONES_ARCHIVO_DIRECTORIO``
+(``jsonl``). Se procesa por lotes acotados, cada uno en su propia transacción:
+primero se escribe el archivo y después se eliminan las filas, por lo que un
+corte a mitad de camino nunca pierde notificaciones (a lo más una quedaría
+archivada y aún en la tabla activa, y se reescribe en la próxima ejecución).
+"""
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from backend import versiones
+from . import contador
+from .models import LecturaNotificacion, Notificacion, NotificacionArchivada
+
+BATCH_SIZE = 1000
+DESTINOS = ('tabla', 'jsonl')
+CAMPOS = ('id', 'usuario_id', 'tipo', 'titulo', 'mensaje', 'fecha_creacion',
+          'leida', 'objeto_id', 'objeto_tipo', 'audiencia')
+
+
+def _lotes(filtro, corte, batch_size):
+    """
+    Lotes de notificaciones que cumplen ``filtro`` y son anteriores a ``corte``,
+    en orden de antigüedad, usando los índices ``(leida, fecha_creacion)`` y
+    ``(audiencia, fecha_creacion)``. Como cada lote se elimina antes de pedir
+    el siguiente, no hace falta cursor ni OFFSET.
+    """
+    queryset = (
+        Notificacion.objects
+        .filter(fecha_creacion__lt=corte, **filtro)
+        .order_by('fecha_creacion', 'id')
+        .values_list(*CAMPOS)
+    )
+    while True:
+        lote = [dict(zip(CAMPOS, fila)) for fila in queryset[:batch_size]]
+        if not lote:
+            return
+        yield lote
+
+
+def _guardar_en_tabla(lote):
+    # ignore_conflicts: una fila ya archivada en una ejecución interrumpida se omite
+    NotificacionArchivada.objects.bulk_create(
+        [NotificacionArchivada(**fila) for fila in lote], ignore_conflicts=True
+    )
+
+
+def _guardador_jsonl(directorio):
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / f"notificaciones-{timezone.now().strftime('%Y%m%d-%H%M%S')}.jsonl.gz"
+
+    def guardar(lote):
+        # Un miembro gzip por lote (los lectores de gzip los leen como un solo
+        # archivo); se fuerza a disco antes de eliminar las filas
+        with open(ruta, 'ab') as archivo:
+            with gzip.GzipFile(fileobj=archivo, mode='wb') as comprimido:
+                for fila in lote:
+                    linea = json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False)
+                    comprimido.write(linea.encode('utf-8') + b'\n')
+            archivo.flush()
+            os.fsync(archivo.fileno())
+    guardar.ruta = ruta
+    return guardar
+
+
+def _eliminar(ids):
+    """
+    DELETE directo por clave primaria: ``QuerySet.delete()`` cargaría cada fila
+    para enviar ``post_delete``, y aquí contadores y versiones se ajustan en lote.
+    """
+    marcadores = ', '.join(['%s'] * len(ids))
+    lecturas = connection.ops.quote_name(LecturaNotificacion._meta.db_table)
+    tabla = connection.ops.quote_name(Notificacion._meta.db_table)
+    with connection.cursor() as cursor:
+        # Primero los acuses de lectura de las compartidas (clave foránea)
+        cursor.execute(f'DELETE FROM {lecturas} WHERE notificacion_id IN ({marcadores})', ids)
+        cursor.execute(f'DELETE FROM {tabla} WHERE id IN ({marcadores})', ids)
+
+
+def archivar(dias=None, dias_no_leidas=None, destino=None, directorio=None,
+             batch_size=BATCH_SIZE, pausa=0, ahora=None):
+    """
+    Archiva y elimina de la tabla activa las notificaciones antiguas. Los
+    parámetros omitidos se toman de la configuración. ``pausa`` son segundos
+    de espera entre lotes, para no saturar la base de datos ni su replicación.
+    Retorna un resumen.
+    """
+    dias = getattr(settings, 'NOTIFICACIONES_RETENCION_DIAS', 90) if dias is None else dias
+    if dias_no_leidas is None:
+        dias_no_leidas = getattr(settings, 'NOTIFICACIONES_RETENCION_NO_LEIDAS_DIAS', None)
+    destino = destino or getattr(settings, 'NOTIFICACIONES_ARCHIVO', 'tabla')
+    if destino not in DESTINOS:
+        raise ValueError(f"Destino inválido: {destino}. Opciones: {', '.join(DESTINOS)}.")
+    if destino == 'jsonl':
+        guardar = _guardador_jsonl(directorio or settings.NOTIFICACIONES_ARCHIVO_DIRECTORIO)
+    else:
+        guardar = _guardar_en_tabla
+
+    ahora = ahora or timezone.now()
+    # (clave del resumen, filtro, corte)
+    pasadas = [
+        ('leidas', {'leida': True}, ahora - timedelta(days=dias)),
+        ('compartidas', {'audiencia': Notificacion.AUDIENCIA_ADMINS}, ahora - timedelta(days=dias)),
+    ]
+    if dias_no_leidas is not None:
+        pasadas.append(('no_leidas', {'leida': False, 'audiencia__isnull': True},
+                        ahora - timedelta(days=dias_no_leidas)))
+
+    resumen = {'destino': destino, 'leidas': 0, 'compartidas': 0, 'no_leidas': 0, 'lotes': 0}
+    for clave, filtro, corte in pasadas:
+        for lote in _lotes(filtro, corte, batch_size):
+            usuario_ids = {fila['usuario_id'] for fila in lote}
+            with transaction.atomic():
+                guardar(lote)
+                _eliminar([fila['id'] for fila in lote])
+                if clave == 'no_leidas':
+                    contador.registrar_retiradas(Counter(fila['usuario_id'] for fila in lote))
+                elif clave == 'compartidas':
+                    # Contaban como no leídas para los administradores sin acuse
+                    contador.invalidar_todos()
+                versiones.incrementar('notificaciones', usuario_ids)
+            resumen[clave] += len(lote)
+            resumen['lotes'] += 1
+            if pausa:
+                time.sleep(pausa)
+    if destino == 'jsonl' and resumen['lotes']:
+        resumen['archivo'] = str(guardar.ruta)
+    return resumen
@@ -1,32 +1,69 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
+
+from backend.lectura import Lector
 from .models import Notificacion
 
+
+def tiempo_relativo(fecha, ahora):
+    """Retorna el tiempo en formato relativo (ej: 'hace 5 minutos')"""
+    diff = ahora - fecha
+    
+    if diff < timedelta(minutes=1):
+        return "justo ahora"
+    elif diff < timedelta(hours=1):
+        minutes = int(diff.total_seconds() / 60)
+        return f"hace {minutes} {'minuto' if minutes == 1 else 'minutos'}"
+    elif diff < timedelta(days=1):
+        hours = int(diff.total_seconds() / 3600)
+        return f"hace {hours} {'hora' if hours == 1 else 'horas'}"
+    elif diff < timedelta(days=30):
+        days = diff.days
+        return f"hace {days} {'día' if days == 1 else 'días'}"
+    else:
+        return fecha.strftime("%d/%m/%Y")
+
+
+def tiempos_relativos(fechas):
+    """
+    ``tiempo_relativo`` de una lista de fechas en una pasada, contra un único
+    ``ahora``: los límites de cada tramo se calculan una vez y cada fecha solo
+    se compara con ellos (la mayoría cae en "justo ahora" o en fecha fija).
+    """
+    ahora = timezone.now()
+    hace_un_minuto = ahora - timedelta(minutes=1)
+    hace_un_dia = ahora - timedelta(days=1)
+    hace_treinta_dias = ahora - timedelta(days=30)
+    resultado = []
+    for fecha in fechas:
+        if fecha > hace_un_minuto:
+            resultado.append("justo ahora")
+        elif fecha <= hace_treinta_dias:
+            resultado.append(fecha.strftime("%d/%m/%Y"))
+        elif fecha > hace_un_dia:
+            resultado.append(tiempo_relativo(fecha, ahora))
+        else:
+            days = (ahora - fecha).days
+            resultado.append(f"hace {days} {'día' if days == 1 else 'días'}")
+    return resultado
+
+
 class NotificacionSerializer(serializers.ModelSerializer):
     tiempo_relativo = serializers.SerializerMethodField()
     
     class Meta:
         model = Notificacion
         fields = ['id', 'usuario', 'tipo', 'titulo', 'mensaje', 'fecha_creacion', 
-                 'leida', 'objeto_id', 'objeto_tipo', 'tiempo_relativo']
+                 'leida', 'objeto_id', 'objeto_tipo', 'audiencia', 'tiempo_relativo']
     
     def get_tiempo_relativo(self, obj):
-        """Retorna el tiempo en formato relativo (ej: 'hace 5 minutos')"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        ahora = timezone.now()
-        diff = ahora - obj.fecha_creacion
-        
-        if diff < timedelta(minutes=1):
-            return "justo ahora"
-        elif diff < timedelta(hours=1):
-            minutes = int(diff.total_seconds() / 60)
-            return f"hace {minutes} {'minuto' if minutes == 1 else 'minutos'}"
-        elif diff < timedelta(days=1):
-            hours = int(diff.total_seconds() / 3600)
-            return f"hace {hours} {'hora' if hours == 1 else 'horas'}"
-        elif diff < timedelta(days=30):
-            days = diff.days
-            return f"hace {days} {'día' if days == 1 else 'días'}"
-        else:
-            return obj.fecha_creacion.strftime("%d/%m/%Y")
+        return tiempo_relativo(obj.fecha_creacion, timezone.now())
+
+
+# Listados: mismas columnas y formato que NotificacionSerializer, desde values_list()
+LECTOR_NOTIFICACIONES = Lector(
+    NotificacionSerializer,
+    calculados={'tiempo_relativo': ('fecha_creacion', tiempos_relativos)},
+)
@@ -0,0 +1,190 @@
+"""
+Servicio de despacho de notificaciones.
+
+Todas las notificaciones de un evento (residente + administradores) se
+construyen en memoria y se escriben con un único ``bulk_create``. La audiencia
+``AUDIENCIA_ADMINS`` se guarda como una sola notificación compartida por todos
+los administradores, no como una copia por administrador; cada uno registra su
+lectura (o su eliminación) en ``LecturaNotificacion``.
+Con ``NOTIFICACIONES_OUTBOX`` activo, ``publicar`` solo encola el evento y el
+worker ``procesar_notificaciones`` hace el despacho fuera de la solicitud.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from backend import versiones
+from usuarios.models import Usuario
+from .models import LecturaNotificacion, Notificacion
+from . import contador, pubsub
+
+ADMIN_IDS_CACHE_KEY = 'notificaciones:admin_ids'
+# Acota el tiempo que otro proceso puede usar una lista desactualizada
+# cuando el cache no es compartido (p. ej. locmem con varios workers).
+ADMIN_IDS_CACHE_TIMEOUT = 300
+
+# Puede usarse en lugar de la lista de ids para notificar a todos los
+# administradores con una única notificación compartida.
+AUDIENCIA_ADMINS = Notificacion.AUDIENCIA_ADMINS
+
+
+def obtener_ids_admins():
+    """Retorna los ids de los administradores, usando el cache cuando es posible."""
+    ids = cache.get(ADMIN_IDS_CACHE_KEY)
+    if ids is None:
+        ids = list(Usuario.objects.filter(rol='admin').values_list('id', flat=True))
+        cache.set(ADMIN_IDS_CACHE_KEY, ids, ADMIN_IDS_CACHE_TIMEOUT)
+    return ids
+
+
+def invalidar_cache_admins():
+    cache.delete(ADMIN_IDS_CACHE_KEY)
+
+
+def construir_notificaciones(tipo, objeto_id, objeto_tipo, destinatarios):
+    """
+    Construye (sin guardar) las notificaciones de un evento.
+    ``destinatarios`` es una lista de tuplas ``(ids_usuarios, titulo, mensaje)``,
+    donde ``ids_usuarios`` también puede ser ``AUDIENCIA_ADMINS``: en ese caso
+    se construye una sola notificación, sin usuario, para todos los administradores.
+    """
+    notificaciones = []
+    for ids_usuarios, titulo, mensaje in destinatarios:
+        if ids_usuarios == AUDIENCIA_ADMINS:
+            ids_usuarios, audiencia = [None], AUDIENCIA_ADMINS
+        else:
+            audiencia = None
+        notificaciones.extend(
+            Notificacion(
+                usuario_id=usuario_id,
+                audiencia=audiencia,
+                tipo=tipo,
+                titulo=titulo,
+                mensaje=mensaje,
+                objeto_id=objeto_id,
+                objeto_tipo=objeto_tipo
+            )
+            for usuario_id in ids_usuarios
+        )
+    return notificaciones
+
+
+def despachar(tipo, objeto_id, objeto_tipo, destinatarios):
+    """Crea todas las notificaciones de un evento con un solo INSERT."""
+    return despachar_lote([(tipo, objeto_id, objeto_tipo, destinatarios)])
+
+
+def despachar_lote(eventos, batch_size=500):
+    """
+    Crea las notificaciones de varios eventos a la vez.
+    ``eventos`` es una lista de tuplas ``(tipo, objeto_id, objeto_tipo, destinatarios)``.
+    """
+    notificaciones = [
+        notificacion
+        for tipo, objeto_id, objeto_tipo, destinatarios in eventos
+        for notificacion in construir_notificaciones(tipo, objeto_id, objeto_tipo, destinatarios)
+    ]
+    if notificaciones:
+        Notificacion.objects.bulk_create(notificaciones, batch_size=batch_size)
+        contador.registrar_creadas(notificaciones)
+        usuario_ids = {notificacion.usuario_id for notificacion in notificaciones}
+        if any(notificacion.audiencia == AUDIENCIA_ADMINS for notificacion in notificaciones):
+            # Las compartidas aparecen en el stream de cada administrador
+            usuario_ids.discard(None)
+            usuario_ids.update(obtener_ids_admins())
+        versiones.incrementar('notificaciones', usuario_ids)
+        transaction.on_commit(lambda: pubsub.broker.publicar(usuario_ids))
+    return notificaciones
+
+
+def outbox_activo():
+    return getattr(settings, 'NOTIFICACIONES_OUTBOX', True)
+
+
+def publicar(tipo, objeto_id, objeto_tipo, destinatarios, clave=None):
+    """
+    Publica un evento: lo encola en el outbox o, si el outbox está desactivado,
+    crea las notificaciones de inmediato. ``clave`` identifica la ocurrencia
+    para deduplicarla en el outbox (ver ``outbox.clave_evento``).
+    """
+    publicar_lote([(tipo, objeto_id, objeto_tipo, destinatarios)], claves=[clave])
+
+
+def publicar_lote(eventos, batch_size=500, claves=None):
+    if outbox_activo():
+        from . import outbox
+        outbox.encolar_lote(eventos, claves=claves, batch_size=batch_size)
+    else:
+        despachar_lote(eventos, batch_size=batch_size)
+
+
+def visibles_para(usuario, queryset=None):
+    """
+    Notificaciones que ve ``usuario``: las propias y, si es administrador,
+    además las compartidas con todos los administradores que no eliminó.
+    """
+    queryset = Notificacion.objects.all() if queryset is None else queryset
+    if usuario.rol == 'admin':
+        ocultas = LecturaNotificacion.objects.filter(notificacion=OuterRef('pk'), usuario_id=usuario.id, oculta=True)
+        return queryset.filter(Q(usuario_id=usuario.id) | (Q(audiencia=AUDIENCIA_ADMINS) & ~Exists(ocultas)))
+    return queryset.filter(usuario_id=usuario.id)
+
+
+def leidas_por(usuario, ids):
+    """Ids de notificaciones compartidas (entre ``ids``) que ``usuario`` ya marcó como leídas."""
+    if usuario.rol != 'admin' or not ids:
+        return set()
+    return set(
+        LecturaNotificacion.objects
+        .filter(usuario_id=usuario.id, notificacion_id__in=ids)
+        .values_list('notificacion_id', flat=True)
+    )
+
+
+def marcar_compartidas_leidas(usuario, queryset=None):
+    """
+    Registra el acuse de lectura de ``usuario`` sobre las notificaciones
+    compartidas de ``queryset`` (por defecto, todas) que aún no ha leído.
+    Retorna la cantidad de acuses creados.
+    """
+    queryset = Notificacion.objects.all() if queryset is None else queryset
+    pendientes = list(
+        queryset
+        .filter(audiencia=AUDIENCIA_ADMINS)
+        .exclude(Exists(LecturaNotificacion.objects.filter(notificacion=OuterRef('pk'), usuario_id=usuario.id)))
+        .values_list('id', flat=True)
+    )
+    LecturaNotificacion.objects.bulk_create(
+        [LecturaNotificacion(notificacion_id=notificacion_id, usuario_id=usuario.id) for notificacion_id in pendientes],
+        batch_size=500, ignore_conflicts=True
+    )
+    return len(pendientes)
+
+
+def ocultar_compartida(usuario, notificacion):
+    """
+    Elimina la notificación compartida solo para ``usuario``: registra su acuse
+    marcado como oculto. Retorna ``True`` si aún no la había leído.
+    """
+    lectura, creada = LecturaNotificacion.objects.get_or_create(
+        notificacion=notificacion, usuario_id=usuario.id, defaults={'oculta': True}
+    )
+    if not creada and not lectura.oculta:
+        LecturaNotificacion.objects.filter(pk=lectura.pk).update(oculta=True)
+    return creada
+
+
+def notificar_residente_y_admins(tipo, objeto_id, objeto_tipo, residente_id,
+                                 titulo_residente, mensaje_residente,
+                                 titulo_admin=None, mensaje_admin=None):
+    """
+    Atajo para el caso habitual: una notificación para el residente y,
+    opcionalmente, una sola notificación compartida por todos los
+    administradores (``AUDIENCIA_ADMINS``), cuya lectura registra cada uno en
+    ``LecturaNotificacion``.
+    """
+    destinatarios = [([residente_id], titulo_residente, mensaje_residente)]
+    if titulo_admin is not None:
+        destinatarios.append((AUDIENCIA_ADMINS, titulo_admin, mensaje_admin))
+    publicar(tipo, objeto_id, objeto_tipo, destinatarios)
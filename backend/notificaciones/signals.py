@@ -1,120 +1,77 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Notificacion
 from multas.models import Multa
 from gastocomun.models import GastoComun
 from usuarios.models import Usuario
-from model_utils.fields import FieldTracker
+from . import services
 
 # Ejemplo para Multas
 @receiver(post_save, sender=Multa)
-@receiver(post_save, sender=Multa)
 def crear_notificacion_multa(sender, instance, created, **kwargs):
     if created:
-        # Notificación para el residente
-        Notificacion.objects.create(
-            usuario=instance.residente,
-            tipo='multa_creada',
-            titulo='Nueva multa registrada',
-            mensaje=f'Se ha registrado una multa por {instance.motivo} por un valor de ${instance.precio}.',
-            objeto_id=instance.id,
-            objeto_tipo='multa'
+        # Notificación para el residente y para administradores
+        services.notificar_residente_y_admins(
+            'multa_creada', instance.id, 'multa', instance.residente_id,
+            titulo_residente='Nueva multa registrada',
+            mensaje_residente=f'Se ha registrado una multa por {instance.motivo} por un valor de ${instance.precio}.',
+            titulo_admin='Nueva multa generada',
+            mensaje_admin=f'Se ha generado una multa para {instance.residente.username} por {instance.motivo}.'
         )
-        
-        # Notificación para administradores
-        admins = Usuario.objects.filter(rol='admin')
-        for admin in admins:
-            Notificacion.objects.create(
-                usuario=admin,
-                tipo='multa_creada',
-                titulo='Nueva multa generada',
-                mensaje=f'Se ha generado una multa para {instance.residente.username} por {instance.motivo}.',
-                objeto_id=instance.id,
-                objeto_tipo='multa'
-            )
     elif instance.estado == 'pagada' and instance.tracker.has_changed('estado'):
         # Si el estado cambió a pagada
-        # Notificación para el residente
-        Notificacion.objects.create(
-            usuario=instance.residente,
-            tipo='multa_pagada',
-            titulo='Multa pagada correctamente',
-            mensaje=f'Su multa por {instance.motivo} ha sido registrada como pagada.',
-            objeto_id=instance.id,
-            objeto_tipo='multa'
+        services.notificar_residente_y_admins(
+            'multa_pagada', instance.id, 'multa', instance.residente_id,
+            titulo_residente='Multa pagada correctamente',
+            mensaje_residente=f'Su multa por {instance.motivo} ha sido registrada como pagada.',
+            titulo_admin='Multa pagada por residente',
+            mensaje_admin=f'La multa de {instance.residente.username} por {instance.motivo} ha sido pagada.'
         )
-        
-        # Notificación para administradores
-        admins = Usuario.objects.filter(rol='admin')
-        for admin in admins:
-            Notificacion.objects.create(
-                usuario=admin,
-                tipo='multa_pagada',
-                titulo='Multa pagada por residente',
-                mensaje=f'La multa de {instance.residente.username} por {instance.motivo} ha sido pagada.',
-                objeto_id=instance.id,
-                objeto_tipo='multa'
-            )
     elif instance.estado == 'anulada' and instance.tracker.has_changed('estado'):
-        # Si el estado cambió a anulada
-        # Notificación para el residente
-        Notificacion.objects.create(
-            usuario=instance.residente,
-            tipo='multa_anulada',
-            titulo='Multa anulada',
-            mensaje=f'Su multa por {instance.motivo} ha sido anulada.',
-            objeto_id=instance.id,
-            objeto_tipo='multa'
+        # Si el estado cambió a anulada (solo se notifica al residente)
+        services.notificar_residente_y_admins(
+            'multa_anulada', instance.id, 'multa', instance.residente_id,
+            titulo_residente='Multa anulada',
+            mensaje_residente=f'Su multa por {instance.motivo} ha sido anulada.'
         )
 
 
-# Ejemplo para Gastos Comunes@receiver(post_save, sender=GastoComun)
+# Ejemplo para Gastos Comunes
+@receiver(post_save, sender=GastoComun)
 def crear_notificacion_gasto_comun(sender, instance, created, **kwargs):
     if created:
-        # Notificación para el residente
-        Notificacion.objects.create(
-            usuario=instance.residente,
-            tipo='gasto_creado',
-            titulo='Nuevo gasto común registrado',
-            mensaje=f'Se ha registrado un gasto común por ${instance.monto} correspondiente a {instance.concepto}.',
-            objeto_id=instance.id,
-            objeto_tipo='gasto_comun'
+        # Notificación para el residente y para administradores
+        services.notificar_residente_y_admins(
+            'gasto_creado', instance.id, 'gasto_comun', instance.residente_id,
+            titulo_residente='Nuevo gasto común registrado',
+            mensaje_residente=f'Se ha registrado un gasto común por ${instance.monto} correspondiente a {instance.concepto}.',
+            titulo_admin='Nuevo gasto común generado',
+            mensaje_admin=f'Se ha generado un gasto común para {instance.residente.username} por ${instance.monto}.'
         )
-        
-        # Notificación para administradores
-        admins = Usuario.objects.filter(rol='admin')
-        for admin in admins:
-            Notificacion.objects.create(
-                usuario=admin,
-                tipo='gasto_creado',
-                titulo='Nuevo gasto común generado',
-                mensaje=f'Se ha generado un gasto común para {instance.residente.username} por ${instance.monto}.',
-                objeto_id=instance.id,
-                objeto_tipo='gasto_comun'
-            )
     elif instance.estado == 'pagado' and instance.tracker.has_changed('estado'):
         # Si el estado cambió a pagado
-        # Notificación para el residente
-        Notificacion.objects.create(
-            usuario=instance.residente,
-            tipo='gasto_pagado',
-            titulo='Gasto común pagado correctamente',
-            mensaje=f'Su gasto común por {instance.concepto} ha sido registrado como pagado.',
-            objeto_id=instance.id,
-            objeto_tipo='gasto_comun'
+        services.notificar_residente_y_admins(
+            'gasto_pagado', instance.id, 'gasto_comun', instance.residente_id,
+            titulo_residente='Gasto común pagado correctamente',
+            mensaje_residente=f'Su gasto común por {instance.concepto} ha sido registrado como pagado.',
+            titulo_admin='Gasto común pagado por residente',
+            mensaje_admin=f'El gasto común de {instance.residente.username} por {instance.concepto} ha sido pagado.'
         )
-        
-        # Notificación para administradores
-        admins = Usuario.objects.filter(rol='admin')
-        for admin in admins:
-            Notificacion.objects.create(
-                usuario=admin,
-                tipo='gasto_pagado',
-                titulo='Gasto común pagado por residente',
-                mensaje=f'El gasto común de {instance.residente.username} por {instance.concepto} ha sido pagado.',
-                objeto_id=instance.id,
-                objeto_tipo='gasto_comun'
-            )
-            
+
     # También podrías agregar una notificación para gastos vencidos
     # Esto podría hacerse en un task programado, no solo en el signal
+
+
+# Mantener actualizada la lista de administradores en cache
+@receiver(post_save, sender=Usuario)
+def invalidar_admins_al_guardar(sender, instance, created, **kwargs):
+    if created:
+        if instance.rol == 'admin':
+            services.invalidar_cache_admins()
+    elif instance.tracker.has_changed('rol'):
+        services.invalidar_cache_admins()
+
+
+@receiver(post_delete, sender=Usuario)
+def invalidar_admins_al_eliminar(sender, instance, **kwargs):
+    if instance.rol == 'admin':
+        services.invalidar_cache_admins()
@@ -1,3 +1,448 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import re
+import tempfile
+import threading
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection, connections
+from django.db.models.signals import post_save
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend import versiones
+from backend.testing import ConsultasConstantesMixin, usar_cache_compartido
+from multas.models import Multa
+from usuarios.models import Usuario
+from . import contador, outbox, pubsub, retencion, services, views
+from .models import EventoNotificacion, LecturaNotificacion, Notificacion, NotificacionArchivada
+from .serializers import NotificacionSerializer
 
 # Create your tests here.
+
+class NotificacionConsultasTest(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.client = APIClient()
+
+    def agregar_notificaciones(self, cantidad):
+        Notificacion.objects.bulk_create([
+            Notificacion(usuario=self.residente, tipo='sistema', titulo='Aviso', mensaje='Mensaje')
+            for _ in range(cantidad)
+        ])
+
+    def test_listado_sin_n_mas_1(self):
+        for usuario in (self.admin, self.residente):
+            with self.subTest(rol=usuario.rol):
+                self.client.force_authenticate(usuario)
+                self.assertConsultasConstantes(
+                    lambda: self.client.get('/api/notificaciones/'), self.agregar_notificaciones
+                )
+
+    def test_contador_no_consulta_la_base(self):
+        usar_cache_compartido(self, 'NOTIFICACIONES_CONTADOR_CACHE')
+        self.agregar_notificaciones(3)
+        self.client.force_authenticate(self.residente)
+        self.client.get('/api/notificaciones/contador/')
+
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get('/api/notificaciones/contador/')
+        )
+        self.assertEqual(respuesta.json(), {'no_leidas': 3})
+        self.assertEqual(len(consultas), 0)
+
+        # Lo que crea el worker del outbox (otro proceso) llega por el cache compartido
+        with self.captureOnCommitCallbacks(execute=True):
+            services.despachar('sistema', None, None, [([self.residente.id], 'Aviso', 'Mensaje')])
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get('/api/notificaciones/contador/')
+        )
+        self.assertEqual(respuesta.json(), {'no_leidas': 4})
+        self.assertEqual(len(consultas), 0)
+
+    def test_contador_sin_cache_compartido_cuenta_filas(self):
+        # Con locmem no se guarda nada que otro proceso pueda dejar desactualizado
+        self.assertFalse(contador.en_cache())
+        self.client.force_authenticate(self.residente)
+        self.agregar_notificaciones(2)
+        self.assertEqual(self.client.get('/api/notificaciones/contador/').json(), {'no_leidas': 2})
+        # Filas creadas sin pasar por los servicios de este proceso
+        self.agregar_notificaciones(3)
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get('/api/notificaciones/contador/')
+        )
+        self.assertEqual(respuesta.json(), {'no_leidas': 5})
+        self.assertEqual(len(consultas), 1)
+        self.assertIsNone(contador.reconciliar())
+
+
+class LecturaRapidaTest(TestCase):
+    def setUp(self):
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.client = APIClient()
+        self.client.force_authenticate(self.residente)
+        ahora = timezone.now()
+        for antiguedad in (timedelta(0), timedelta(minutes=5), timedelta(hours=3),
+                           timedelta(days=1), timedelta(days=45)):
+            notificacion = Notificacion.objects.create(
+                usuario=self.residente, tipo='sistema', titulo='Aviso', mensaje='Mensaje'
+            )
+            Notificacion.objects.filter(pk=notificacion.pk).update(fecha_creacion=ahora - antiguedad)
+
+    def test_listado_igual_al_serializador(self):
+        esperado = NotificacionSerializer(Notificacion.objects.filter(usuario=self.residente), many=True).data
+        respuesta = self.client.get('/api/notificaciones/')
+        self.assertEqual(respuesta.json(), [dict(fila) for fila in esperado])
+        self.assertEqual(
+            [fila['tiempo_relativo'] for fila in respuesta.json()][:4],
+            ['justo ahora', 'hace 5 minutos', 'hace 3 horas', 'hace 1 día'],
+        )
+
+    def test_listado_paginado(self):
+        primera = self.client.get('/api/notificaciones/?page_size=3').json()
+        segunda = self.client.get(primera['next']).json()
+        ids = [fila['id'] for fila in primera['results'] + segunda['results']]
+        esperado = list(Notificacion.objects.filter(usuario=self.residente).values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+
+class RetencionTest(TestCase):
+    def setUp(self):
+        # Los contadores en cache se indexan por id de usuario, que se repiten entre tests
+        for alias in caches:
+            caches[alias].clear()
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        ahora = timezone.now()
+        # (antigüedad en días, leída)
+        for dias, leida in ((1, True), (100, True), (100, False), (400, False)):
+            notificacion = Notificacion.objects.create(
+                usuario=self.residente, tipo='sistema', titulo=f'Aviso {dias}', mensaje='Mensaje', leida=leida
+            )
+            Notificacion.objects.filter(pk=notificacion.pk).update(fecha_creacion=ahora - timedelta(days=dias))
+
+    def test_archiva_en_tabla_por_lotes(self):
+        self.assertEqual(contador.obtener(self.residente), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            resumen = retencion.archivar(dias=90, dias_no_leidas=365, batch_size=1)
+
+        self.assertEqual((resumen['leidas'], resumen['no_leidas'], resumen['lotes']), (1, 1, 2))
+        self.assertEqual(
+            sorted(Notificacion.objects.values_list('titulo', flat=True)), ['Aviso 1', 'Aviso 100']
+        )
+        self.assertEqual(
+            sorted(NotificacionArchivada.objects.values_list('titulo', 'leida')),
+            [('Aviso 100', True), ('Aviso 400', False)],
+        )
+        self.assertEqual(contador.obtener(self.residente), 1)
+
+    def test_archiva_en_jsonl_comprimido(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            resumen = retencion.archivar(dias=90, dias_no_leidas=365, destino='jsonl', directorio=directorio)
+            with gzip.open(resumen['archivo'], 'rt', encoding='utf-8') as archivo:
+                filas = [json.loads(linea) for linea in archivo]
+
+        self.assertEqual([(fila['titulo'], fila['leida']) for fila in filas],
+                         [('Aviso 100', True), ('Aviso 400', False)])
+        self.assertEqual(filas[0]['usuario_id'], self.residente.id)
+        self.assertFalse(NotificacionArchivada.objects.exists())
+        self.assertEqual(Notificacion.objects.count(), 2)
+
+
+class NotificacionCompartidaTest(TestCase):
+    def setUp(self):
+        # Contadores incrementales, como con Redis o Memcached en producción
+        usar_cache_compartido(self, 'NOTIFICACIONES_CONTADOR_CACHE')
+        # Los contadores en cache se indexan por id de usuario, que se repiten entre tests
+        for alias in caches:
+            caches[alias].clear()
+        self.admins = [
+            Usuario.objects.create_user(f'admin{i}', f'admin{i}@example.com', 'clave', rol='admin')
+            for i in range(3)
+        ]
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            services.despachar('sistema', None, None, [
+                ([self.residente.id], 'Para el residente', 'Mensaje'),
+                (services.AUDIENCIA_ADMINS, 'Para los administradores', 'Mensaje'),
+            ])
+
+    def listado(self, usuario):
+        self.client.force_authenticate(usuario)
+        return {fila['titulo']: fila['leida'] for fila in self.client.get('/api/notificaciones/').json()}
+
+    def test_una_fila_por_evento_con_lectura_por_administrador(self):
+        # Una fila para el residente y una compartida, no una por administrador
+        self.assertEqual(Notificacion.objects.count(), 2)
+        compartida = Notificacion.objects.get(audiencia=services.AUDIENCIA_ADMINS)
+        self.assertEqual([contador.obtener(admin) for admin in self.admins], [1, 1, 1])
+        self.assertEqual(self.listado(self.residente), {'Para el residente': False})
+
+        primero, segundo, tercero = self.admins
+        self.client.force_authenticate(primero)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/notificaciones/{compartida.id}/marcar_como_leida/')
+        self.client.force_authenticate(segundo)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notificaciones/marcar_como_leidas/')
+
+        self.assertEqual(self.listado(primero), {'Para los administradores': True})
+        self.assertEqual(self.listado(tercero), {'Para los administradores': False})
+        self.assertEqual([contador.obtener(admin) for admin in self.admins], [0, 0, 1])
+        self.assertFalse(Notificacion.objects.get(pk=compartida.pk).leida)
+        self.assertEqual(LecturaNotificacion.objects.count(), 2)
+
+        contador.reconciliar()
+        self.assertEqual([contador.obtener(admin) for admin in self.admins], [0, 0, 1])
+        self.assertEqual(contador.obtener(self.residente), 1)
+
+    def test_eliminar_compartida_solo_la_oculta_para_ese_administrador(self):
+        compartida = Notificacion.objects.get(audiencia=services.AUDIENCIA_ADMINS)
+        primero, segundo, tercero = self.admins
+        self.client.force_authenticate(primero)
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.delete(f'/api/notificaciones/{compartida.id}/')
+        self.assertEqual(respuesta.status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/notificaciones/{compartida.id}/').status_code, 404)
+
+        self.assertTrue(Notificacion.objects.filter(pk=compartida.pk).exists())
+        self.assertEqual(self.listado(primero), {})
+        self.assertEqual(self.listado(segundo), {'Para los administradores': False})
+        self.assertEqual(self.listado(tercero), {'Para los administradores': False})
+        self.assertEqual([contador.obtener(admin) for admin in self.admins], [0, 1, 1])
+
+        contador.reconciliar()
+        self.assertEqual([contador.obtener(admin) for admin in self.admins], [0, 1, 1])
+
+
+class SignalsTest(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admins = [
+            Usuario.objects.create_user(f'admin{i}', f'admin{i}@example.com', 'clave', rol='admin')
+            for i in range(3)
+        ]
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+
+    def crear_multa(self):
+        return Multa.objects.create(residente=self.residente, motivo='Ruidos', descripcion='Noche', precio=5000)
+
+    def test_receivers_registrados_en_ready(self):
+        self.assertTrue(post_save.has_listeners(Multa))
+        with self.captureOnCommitCallbacks(execute=True):
+            multa = self.crear_multa()
+        evento = EventoNotificacion.objects.get()
+        self.assertEqual((evento.tipo, evento.objeto_id, evento.objeto_tipo), ('multa_creada', multa.id, 'multa'))
+
+    @override_settings(NOTIFICACIONES_OUTBOX=False)
+    def test_sin_outbox_un_insert_por_evento(self):
+        services.obtener_ids_admins()
+        with self.captureOnCommitCallbacks(execute=True):
+            _, consultas = self.contar_consultas(self.crear_multa)
+        insert = re.compile(rf'INSERT INTO [`"]{Notificacion._meta.db_table}[`"]')
+        inserts = [consulta['sql'] for consulta in consultas if insert.match(consulta['sql'])]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            list(Notificacion.objects.order_by('titulo').values_list('usuario_id', 'audiencia', 'titulo')),
+            [(None, services.AUDIENCIA_ADMINS, 'Nueva multa generada'),
+             (self.residente.id, None, 'Nueva multa registrada')],
+        )
+        self.assertEqual([contador.obtener(admin) for admin in self.admins], [1, 1, 1])
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.destinatarios = [([self.residente.id], 'Multa pagada', 'Mensaje')]
+
+    def test_eventos_repetidos_son_ocurrencias_distintas(self):
+        # Pagada, anulada y pagada otra vez: dos avisos de pago
+        services.publicar('multa_pagada', 7, 'multa', self.destinatarios)
+        services.publicar('multa_pagada', 7, 'multa', self.destinatarios)
+        self.assertEqual(EventoNotificacion.objects.filter(tipo='multa_pagada', objeto_id=7).count(), 2)
+
+        # Con la clave de la ocurrencia, publicarla de nuevo no la duplica
+        clave = outbox.clave_evento('multa_pagada', 8, 'multa', 'pago-1')
+        services.publicar('multa_pagada', 8, 'multa', self.destinatarios, clave=clave)
+        services.publicar('multa_pagada', 8, 'multa', self.destinatarios, clave=clave)
+        self.assertEqual(EventoNotificacion.objects.filter(objeto_id=8).count(), 1)
+
+        self.assertEqual(outbox.drenar(), (3, 0))
+        self.assertEqual(Notificacion.objects.filter(usuario=self.residente).count(), 3)
+
+    def test_reintentos_con_backoff_hasta_fallido(self):
+        services.publicar('multa_pagada', 7, 'multa', self.destinatarios)
+        evento = EventoNotificacion.objects.get()
+        with mock.patch.object(services, 'despachar_lote', side_effect=RuntimeError('caído')), \
+                mock.patch.object(services, 'despachar', side_effect=RuntimeError('caído')):
+            self.assertEqual(outbox.procesar_lote(max_intentos=2), (0, 1))
+            evento.refresh_from_db()
+            self.assertEqual((evento.estado, evento.intentos), ('pendiente', 1))
+            self.assertIn('caído', evento.ultimo_error)
+            self.assertGreater(evento.disponible_desde, timezone.now() + timedelta(seconds=25))
+            # Durante el backoff no se vuelve a reclamar
+            self.assertEqual(outbox.procesar_lote(max_intentos=2), (0, 0))
+
+            EventoNotificacion.objects.update(disponible_desde=timezone.now())
+            self.assertEqual(outbox.procesar_lote(max_intentos=2), (0, 1))
+            evento.refresh_from_db()
+            self.assertEqual((evento.estado, evento.intentos), ('fallido', 2))
+            self.assertGreater(evento.disponible_desde, timezone.now() + timedelta(seconds=55))
+
+        # Un fallido ya no se reclama; los demás del lote se procesan igual
+        services.publicar('multa_pagada', 9, 'multa', self.destinatarios)
+        self.assertEqual(outbox.drenar(), (1, 0))
+        self.assertEqual(Notificacion.objects.get().objeto_id, 9)
+
+    def test_reclama_con_skip_locked_si_el_motor_lo_permite(self):
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            consulta = outbox._disponibles().query
+        self.assertTrue(consulta.select_for_update)
+        self.assertTrue(consulta.select_for_update_skip_locked)
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', False):
+            self.assertFalse(outbox._disponibles().query.select_for_update)
+
+
+@override_settings(NOTIFICACIONES_SSE_HEARTBEAT=0.05, NOTIFICACIONES_SSE_SONDEO=0.05,
+                   NOTIFICACIONES_SSE_DURACION_MAXIMA=0.3)
+class StreamNotificacionesTest(TestCase):
+    URL = '/api/notificaciones/stream/'
+
+    def setUp(self):
+        for alias in caches:
+            caches[alias].clear()
+        self.residente = Usuario.objects.create_user('residente', 'residente@example.com', 'clave')
+        self.cabeceras = {'Authorization': f'Bearer {AccessToken.for_user(self.residente)}'}
+        self.ids = [
+            Notificacion.objects.create(usuario=self.residente, tipo='sistema', titulo=f'Aviso {i}', mensaje='M').id
+            for i in range(3)
+        ]
+
+    async def leer(self, respuesta, hasta=None):
+        """Lee el stream hasta que termina o hasta que ``hasta(texto)`` es verdadero."""
+        texto = ''
+        async for parte in respuesta.streaming_content:
+            texto += parte if isinstance(parte, str) else parte.decode()
+            if hasta and hasta(texto):
+                break
+        return texto
+
+    def ids_enviados(self, texto):
+        return [int(linea[4:]) for linea in texto.splitlines() if linea.startswith('id: ')]
+
+    def test_sin_asgi_responde_501(self):
+        self.client.force_login(self.residente)
+        self.assertEqual(self.client.get(self.URL).status_code, 501)
+
+    async def test_autenticacion(self):
+        cliente = AsyncClient()
+        self.assertEqual((await cliente.get(self.URL)).status_code, 401)
+        self.assertEqual((await cliente.get(self.URL, {'token': 'invalido'})).status_code, 401)
+
+        token = self.cabeceras['Authorization'].split()[1]
+        respuesta = await cliente.get(self.URL, {'token': token})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        texto = await self.leer(respuesta)
+        self.assertTrue(texto.startswith('retry: '))
+        self.assertIn(': heartbeat', texto)
+        # Una conexión nueva no reenvía las notificaciones anteriores
+        self.assertEqual(self.ids_enviados(texto), [])
+
+    async def test_reanuda_desde_last_event_id(self):
+        cliente = AsyncClient()
+        respuesta = await cliente.get(self.URL, headers={**self.cabeceras, 'Last-Event-ID': str(self.ids[0])})
+        self.assertEqual(self.ids_enviados(await self.leer(respuesta)), self.ids[1:])
+
+        respuesta = await cliente.get(self.URL, {'last_event_id': self.ids[1]}, headers=self.cabeceras)
+        self.assertEqual(self.ids_enviados(await self.leer(respuesta)), self.ids[2:])
+
+    async def test_notificaciones_de_otro_proceso_por_version(self):
+        await sync_to_async(usar_cache_compartido)(self, 'VERSIONES_CACHE')
+        self.assertTrue(await sync_to_async(versiones.compartidas)())
+
+        def crear_en_el_worker():
+            # Como el worker del outbox: sin despertar a las conexiones de este proceso
+            with mock.patch.object(pubsub.broker, 'publicar'), self.captureOnCommitCallbacks(execute=True):
+                services.despachar('sistema', None, None, [([self.residente.id], 'Nueva', 'M')])
+
+        with override_settings(NOTIFICACIONES_SSE_HEARTBEAT=10, NOTIFICACIONES_SSE_DURACION_MAXIMA=5):
+            respuesta = await AsyncClient().get(self.URL, headers=self.cabeceras)
+            texto = await self.leer(respuesta, hasta=lambda texto: 'retry: ' in texto)
+            await sync_to_async(crear_en_el_worker)()
+            texto += await self.leer(respuesta, hasta=lambda texto: 'id: ' in texto)
+            await respuesta.streaming_content.aclose()
+        nueva = await Notificacion.objects.filter(titulo='Nueva').values_list('id', flat=True).aget()
+        self.assertEqual(self.ids_enviados(texto), [nueva])
+
+
+@override_settings(NOTIFICACIONES_SSE_HEARTBEAT=0.05, NOTIFICACIONES_SSE_SONDEO=0.05,
+                   NOTIFICACIONES_SSE_DURACION_MAXIMA=0.5)
+class StreamConexionesTest(TransactionTestCase):
+    """Fuera de una transacción, como en producción, y cada solicitud en su propio hilo como bajo ASGI."""
+
+    def test_streams_abiertos_devuelven_la_conexion_en_cada_sondeo(self):
+        # Un event loop propio: dentro de async_to_sync (un test async) todo
+        # sync_to_async correría en el hilo del test y no en uno por solicitud
+        asyncio.run(self.streams_y_solicitudes())
+
+    async def streams_y_solicitudes(self):
+        residente = await sync_to_async(Usuario.objects.create_user)('residente', 'residente@example.com', 'clave')
+        cabeceras = {'Authorization': f'Bearer {AccessToken.for_user(residente)}'}
+        sondeos, cierres = Counter(), Counter()
+        consultar = views._notificaciones_nuevas
+        cerrar = type(connections['default']).close
+
+        def contar_sondeo(*args, **kwargs):
+            sondeos[threading.get_ident()] += 1
+            return consultar(*args, **kwargs)
+
+        def contar_cierre(conexion):
+            cierres[threading.get_ident()] += 1
+            return cerrar(conexion)
+
+        async def stream():
+            async with ThreadSensitiveContext():
+                respuesta = await AsyncClient().get(StreamNotificacionesTest.URL, headers=cabeceras)
+                texto = ''
+                async for parte in respuesta.streaming_content:
+                    texto += parte if isinstance(parte, str) else parte.decode()
+                return texto
+
+        async def contador_no_leidas():
+            await asyncio.sleep(0.1)
+            async with ThreadSensitiveContext():
+                respuesta = await AsyncClient().get('/api/notificaciones/contador/', headers=cabeceras)
+                return respuesta.status_code
+
+        async def crear():
+            await asyncio.sleep(0.15)
+            async with ThreadSensitiveContext():
+                notificacion = await Notificacion.objects.acreate(
+                    usuario=residente, tipo='sistema', titulo='Nueva', mensaje='M'
+                )
+            return notificacion.id
+
+        with mock.patch.object(views, '_notificaciones_nuevas', contar_sondeo), \
+                mock.patch.object(type(connections['default']), 'close', contar_cierre):
+            resultados = await asyncio.gather(
+                *(stream() for _ in range(3)), *(contador_no_leidas() for _ in range(5)), crear()
+            )
+
+        textos, codigos, nueva = resultados[:3], resultados[3:8], resultados[8]
+        self.assertEqual(codigos, [200] * 5)
+        for texto in textos:
+            self.assertIn(f'id: {nueva}\n', texto)
+        # Cada hilo de stream devolvió su conexión tras cada consulta
+        self.assertGreaterEqual(len(sondeos), 3)
+        for hilo, cantidad in sondeos.items():
+            self.assertGreaterEqual(cierres[hilo], cantidad)
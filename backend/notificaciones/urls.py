@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NotificacionViewSet
+from .views import NotificacionViewSet, stream_notificaciones
 
 router = DefaultRouter()
 router.register(r'notificaciones', NotificacionViewSet, basename='notificaciones')
 
 urlpatterns = [
+    # Antes del router para que 'stream' no se interprete como un id
+    path('notificaciones/stream/', stream_notificaciones, name='notificaciones-stream'),
     path('', include(router.urls)),
 ]
@@ -1,9 +1,23 @@
+import asyncio
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from usuarios.autenticacion import JWTSnapshotAuthentication
+from backend import versiones
 from .models import Notificacion
-from .serializers import NotificacionSerializer
+from .serializers import NotificacionSerializer, LECTOR_NOTIFICACIONES
+from . import contador, pubsub, services
 
 
 from rest_framework.exceptions import PermissionDenied
@@ -17,45 +31,226 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        usuario = self.request.user
-        # Administradores ven todas las notificaciones
-        if usuario.rol == 'admin':
-            return Notificacion.objects.all()
-        # Residentes solo ven sus notificaciones
-        return Notificacion.objects.filter(usuario=usuario)
+        # Las propias y, para los administradores, las compartidas con todos ellos
+        return services.visibles_para(self.request.user)
+    
+    @versiones.con_etag('notificaciones', por_minuto=True)
+    def list(self, request, *args, **kwargs):
+        # tiempo_relativo cambia con la hora: el ETag se renueva cada minuto
+        respuesta = LECTOR_NOTIFICACIONES.listar(self, self.filter_queryset(self.get_queryset()))
+        filas = respuesta.data['results'] if isinstance(respuesta.data, dict) else respuesta.data
+        _aplicar_lecturas(filas, request.user)
+        return respuesta
     
     @action(detail=False, methods=['post'])
     def marcar_como_leidas(self, request):
         usuario = request.user
+        marcadas = Notificacion.objects.filter(usuario=usuario, leida=False).update(leida=True)
         if usuario.rol == 'admin':
-            Notificacion.objects.all().update(leida=True)
-        else:
-            Notificacion.objects.filter(usuario=usuario).update(leida=True)
+            # Las compartidas no se modifican: se registra el acuse de este administrador
+            marcadas += services.marcar_compartidas_leidas(usuario)
+        contador.reiniciar_usuario(usuario.id)
+        if marcadas:
+            versiones.incrementar('notificaciones', [usuario.id])
         return Response({"mensaje": "Notificaciones marcadas como leídas"}, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['post'])
     def marcar_como_leida(self, request, pk=None):
         try:
             notificacion = self.get_queryset().get(pk=pk)
-            notificacion.leida = True
-            notificacion.save()
-            return Response({"mensaje": "Notificación marcada como leída"}, status=status.HTTP_200_OK)
         except Notificacion.DoesNotExist:
             return Response({"error": "Notificación no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+        if notificacion.audiencia is not None:
+            if services.marcar_compartidas_leidas(request.user, Notificacion.objects.filter(pk=notificacion.pk)):
+                contador.registrar_leidas(request.user.id)
+                versiones.incrementar('notificaciones', [request.user.id])
+        elif not notificacion.leida:
+            notificacion.leida = True
+            notificacion.save(update_fields=['leida'])
+            contador.registrar_leidas(notificacion.usuario_id)
+        return Response({"mensaje": "Notificación marcada como leída"}, status=status.HTTP_200_OK)
+
+    def retrieve(self, request, *args, **kwargs):
+        respuesta = super().retrieve(request, *args, **kwargs)
+        _aplicar_lecturas([respuesta.data], request.user)
+        return respuesta
 
     # Añadir al NotificacionViewSet existente
     def perform_destroy(self, instance):
-        """Solo el dueño de la notificación o un administrador puede eliminarla"""
-        if self.request.user.rol != 'admin' and instance.usuario != self.request.user:
+        """
+        Solo el dueño de la notificación o un administrador puede eliminarla.
+        Las compartidas se ocultan solo para el administrador que las elimina.
+        """
+        usuario = self.request.user
+        if usuario.rol != 'admin' and instance.usuario_id != usuario.id:
             raise PermissionDenied("No tienes permiso para eliminar esta notificación")
+        if instance.audiencia is not None:
+            if services.ocultar_compartida(usuario, instance):
+                # Contaba como no leída solo para este administrador
+                contador.registrar_leidas(usuario.id)
+            versiones.incrementar('notificaciones', [usuario.id])
+            return
         instance.delete()
+        if not instance.leida:
+            contador.registrar_leidas(instance.usuario_id)
     # Añadir al NotificacionViewSet existente
     @action(detail=False, methods=['get'])
     def contador(self, request):
-        usuario = request.user
-        if usuario.rol == 'admin':
-            no_leidas = Notificacion.objects.filter(leida=False).count()
-        else:
-            no_leidas = Notificacion.objects.filter(usuario=usuario, leida=False).count()
-        
+        # Se responde desde el contador en cache, sin contar filas
+        no_leidas = contador.obtener(request.user)
         return Response({"no_leidas": no_leidas}, status=status.HTTP_200_OK)
+
+
+def _liberando_conexion(funcion):
+    """
+    Devuelve la conexión del hilo (al pool, con ``backend.db``) al terminar
+    ``funcion``. El stream dura hasta ``NOTIFICACIONES_SSE_DURACION_MAXIMA``
+    segundos: si retuviera la conexión de su primer sondeo, unas pocas
+    pestañas abiertas agotarían el pool para el resto de las solicitudes.
+    """
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            for conexion in connections.all(initialized_only=True):
+                # Dentro de una transacción (p. ej. un TestCase) no se puede cerrar
+                if not conexion.in_atomic_block:
+                    conexion.close()
+    return envoltura
+
+
+def _autenticar_stream(request):
+    """
+    Autentica el stream con el mismo JWT de la API. ``EventSource`` no permite
+    enviar cabeceras, por lo que también se acepta ``?token=``.
+    """
+    autenticacion = JWTSnapshotAuthentication()
+    cabecera = autenticacion.get_header(request)
+    token = autenticacion.get_raw_token(cabecera) if cabecera else request.GET.get('token')
+    if not token:
+        return None
+    try:
+        return autenticacion.get_user(autenticacion.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _aplicar_lecturas(filas, usuario):
+    """Marca como leídas, para ``usuario``, las notificaciones compartidas que ya leyó."""
+    compartidas = [fila['id'] for fila in filas if fila.get('audiencia') is not None]
+    leidas = services.leidas_por(usuario, compartidas)
+    for fila in filas:
+        if fila.get('audiencia') is not None:
+            fila['leida'] = fila['id'] in leidas
+
+
+def _ultimo_id(usuario):
+    ultima = services.visibles_para(usuario).order_by('-id').values_list('id', flat=True).first()
+    return ultima or 0
+
+
+def _notificaciones_nuevas(usuario, desde_id, limite=100):
+    notificaciones = services.visibles_para(usuario).filter(id__gt=desde_id).order_by('id')
+    filas = LECTOR_NOTIFICACIONES.serializar(notificaciones.values_list(*LECTOR_NOTIFICACIONES.columnas)[:limite])
+    _aplicar_lecturas(filas, usuario)
+    return filas
+
+
+def _evento_sse(notificacion):
+    datos = JSONRenderer().render(notificacion).decode('utf-8')
+    return f"id: {notificacion['id']}\nevent: notificacion\ndata: {datos}\n\n"
+
+
+def _revisar(usuario, desde_id, version_anterior, forzar):
+    """
+    Retorna ``(nuevas, version)``. Con versiones compartidas solo consulta la
+    base de datos si cambió la versión de notificaciones del usuario (o si
+    ``forzar``); la versión se lee antes de la consulta para no perder nada
+    creado entre ambas.
+    """
+    version = None
+    if versiones.compartidas():
+        version = versiones.obtener('notificaciones', versiones.alcance(usuario))
+        if not forzar and version == version_anterior:
+            return [], version
+    return _notificaciones_nuevas(usuario, desde_id), version
+
+
+async def stream_notificaciones(request):
+    """
+    Stream Server-Sent Events con las notificaciones nuevas del usuario.
+    Requiere servir la aplicación por ASGI (``backend.asgi:application``).
+
+    - Reanuda desde la cabecera ``Last-Event-ID`` (o ``?last_event_id=``).
+    - Las notificaciones creadas en este proceso despiertan la conexión de
+      inmediato (``pubsub``). Las que crean otros procesos (el worker del
+      outbox) se detectan por sondeo: cada ``NOTIFICACIONES_SSE_SONDEO``
+      segundos se lee la versión de notificaciones del usuario en
+      ``VERSIONES_CACHE`` y solo si cambió se consulta la base de datos. Si ese
+      cache no es compartido, la base de datos se consulta en cada heartbeat y
+      la latencia de esas notificaciones es de hasta un heartbeat.
+    - Envía un heartbeat cada ``NOTIFICACIONES_SSE_HEARTBEAT`` segundos.
+    - Cierra la conexión tras ``NOTIFICACIONES_SSE_DURACION_MAXIMA`` segundos;
+      el navegador reconecta solo y continúa desde el último id recibido.
+    - No retiene una conexión a la base de datos entre sondeos: cada consulta
+      la toma y la devuelve (``_liberando_conexion``).
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "El stream de notificaciones requiere un servidor ASGI"},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+
+    usuario = await sync_to_async(_liberando_conexion(_autenticar_stream))(request)
+    if usuario is None:
+        return JsonResponse({"error": "No autenticado"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    ultimo_evento = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        desde_id = int(ultimo_evento) if ultimo_evento else None
+    except ValueError:
+        desde_id = None
+
+    heartbeat = getattr(settings, 'NOTIFICACIONES_SSE_HEARTBEAT', 15)
+    duracion_maxima = getattr(settings, 'NOTIFICACIONES_SSE_DURACION_MAXIMA', 1800)
+    sondeo = min(getattr(settings, 'NOTIFICACIONES_SSE_SONDEO', 2), heartbeat)
+
+    revisar = sync_to_async(_liberando_conexion(_revisar))
+
+    async def eventos():
+        ultimo_id = desde_id
+        if ultimo_id is None:
+            # Conexión nueva: solo se envían las notificaciones posteriores
+            ultimo_id = await sync_to_async(_liberando_conexion(_ultimo_id))(usuario)
+        compartidas = await sync_to_async(versiones.compartidas)()
+        espera = sondeo if compartidas else heartbeat
+        suscripcion = pubsub.broker.suscribir(usuario.id)
+        ahora = time.monotonic()
+        fin = ahora + duracion_maxima
+        proximo_heartbeat = ahora + heartbeat
+        version, forzar = None, True
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while time.monotonic() < fin:
+                nuevas, version = await revisar(usuario, ultimo_id, version, forzar)
+                for notificacion in nuevas:
+                    yield _evento_sse(notificacion)
+                    ultimo_id = notificacion['id']
+                try:
+                    await asyncio.wait_for(suscripcion.evento.wait(), timeout=espera)
+                    # Despertada por una notificación de este proceso
+                    forzar = True
+                except asyncio.TimeoutError:
+                    forzar = not compartidas
+                suscripcion.evento.clear()
+                if time.monotonic() >= proximo_heartbeat:
+                    yield ": heartbeat\n\n"
+                    proximo_heartbeat = time.monotonic() + heartbeat
+        finally:
+            pubsub.broker.desuscribir(suscripcion)
+
+    respuesta = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
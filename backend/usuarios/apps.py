@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usuarios'
+
+    def ready(self):
+        # Registrar los receivers que invalidan el snapshot de autenticación
+        from . import signals  # noqa: F401
+        # El listado de usuarios cacheado depende de esta versión
+        from backend import versiones
+        from .models import Usuario
+        versiones.conectar(Usuario, 'usuarios', 'id')
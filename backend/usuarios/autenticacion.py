@@ -0,0 +1,106 @@
+"""
+Autenticación JWT que resuelve al usuario desde una copia en cache.
+
+``JWTAuthentication`` lee la fila completa de ``Usuario`` en cada solicitud.
+Aquí se guarda en cache un snapshot con los campos que usan las vistas (id,
+username, rol, is_active) y se reconstruye un ``Usuario`` con el resto de
+campos diferidos: si una vista necesita otro campo (p. ej. el perfil), Django
+lo carga al accederlo. El snapshot se invalida al guardar o eliminar el usuario
+(lo que incluye cambiar su contraseña) desde ``usuarios.signals``.
+
+La invalidación solo llega a los demás procesos si ``USUARIOS_SNAPSHOT_CACHE``
+es un cache compartido; con uno por proceso (locmem) un usuario desactivado o
+con otro rol seguiría autenticándose con los datos anteriores, así que el
+snapshot se lee de la base de datos en cada solicitud (solo esas columnas).
+``USUARIOS_SNAPSHOT_TIMEOUT`` acota cuánto puede durar un snapshot.
+
+El ``Usuario`` reconstruido no se puede guardar completo: ``save()`` sin
+``update_fields`` o con alguno de los campos del snapshot escribiría valores
+que pueden estar desactualizados (ver ``Usuario.save``).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from backend.caches import es_compartido
+from .models import CAMPOS_SNAPSHOT, Usuario
+
+PREFIJO = 'usuarios:snapshot'
+
+
+def _alias():
+    return getattr(settings, 'USUARIOS_SNAPSHOT_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def _clave(usuario_id):
+    return f'{PREFIJO}:{usuario_id}'
+
+
+def invalidar(usuario_id):
+    _cache().delete(_clave(usuario_id))
+
+
+def _leer_snapshot(usuario_id):
+    campos = CAMPOS_SNAPSHOT + (('password',) if api_settings.CHECK_REVOKE_TOKEN else ())
+    fila = Usuario.objects.filter(id=usuario_id).values(*campos).first()
+    if fila is None:
+        return None
+    password = fila.pop('password', None)
+    if password is not None:
+        # Solo se guarda el md5 que compara la revocación de simplejwt, no el hash
+        fila['password_md5'] = get_md5_hash_password(password)
+    return fila
+
+
+def obtener_snapshot(usuario_id):
+    if not es_compartido(_alias()):
+        return _leer_snapshot(usuario_id)
+    snapshot = _cache().get(_clave(usuario_id))
+    if snapshot is None:
+        snapshot = _leer_snapshot(usuario_id)
+        if snapshot is not None:
+            _cache().set(_clave(usuario_id), snapshot, getattr(settings, 'USUARIOS_SNAPSHOT_TIMEOUT', 300))
+    return snapshot
+
+
+def usuario_desde_snapshot(snapshot):
+    """``Usuario`` con los campos del snapshot cargados y el resto diferidos."""
+    # from_db espera los valores en el orden de los campos del modelo
+    campos = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in CAMPOS_SNAPSHOT]
+    usuario = Usuario.from_db(router.db_for_read(Usuario), campos, [snapshot[campo] for campo in campos])
+    usuario.desde_snapshot = True
+    return usuario
+
+
+class JWTSnapshotAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` con las mismas validaciones, sin consultar la base de datos si hay snapshot."""
+
+    def get_user(self, validated_token):
+        try:
+            usuario_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        snapshot = obtener_snapshot(usuario_id)
+        if snapshot is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not snapshot['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != snapshot.get('password_md5'):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return usuario_desde_snapshot(snapshot)
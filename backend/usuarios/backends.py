@@ -0,0 +1,38 @@
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+from .models import Usuario
+
+
+class HashPoolBackend(ModelBackend):
+    """
+    ``ModelBackend`` que verifica la contraseña en el pool de ``usuarios.hashing``
+    y, si el hash usa un algoritmo o iteraciones distintos a los configurados,
+    lo reemplaza guardando solo la columna ``password``.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(Usuario.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            usuario = Usuario._default_manager.get_by_natural_key(username)
+        except Usuario.DoesNotExist:
+            # Igual que ModelBackend: se hashea igual para no revelar por el
+            # tiempo de respuesta si el usuario existe
+            hashing.hashear(password)
+            return None
+
+        es_correcta, requiere_rehash = hashing.verificar(password, usuario.password)
+        if not es_correcta or not self.user_can_authenticate(usuario):
+            return None
+        if requiere_rehash:
+            actualizar_hash(usuario, hashing.hashear(password))
+        return usuario
+
+
+def actualizar_hash(usuario, encoded):
+    usuario.password = encoded
+    usuario._password = None
+    usuario.save(update_fields=['password'])
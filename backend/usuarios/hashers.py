@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class PBKDF2AjustadoPasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 con iteraciones configurables (``PASSWORD_HASH_ITERACIONES``).
+
+    Usa el mismo identificador ``pbkdf2_sha256`` que el hasher de Django, así
+    que los hashes existentes siguen siendo válidos; al cambiar las iteraciones
+    cada contraseña se rehashea de forma transparente en su próximo inicio de
+    sesión. ``python manage.py benchmark_login`` sugiere un valor para el
+    servidor según el tiempo objetivo por hash.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERACIONES', PBKDF2PasswordHasher.iterations)
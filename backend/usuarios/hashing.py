@@ -0,0 +1,127 @@
+"""
+Pool acotado de hilos para hashear y verificar contraseñas fuera del hilo de la solicitud.
+
+PBKDF2 (``hashlib.pbkdf2_hmac``) libera el GIL, por lo que los hilos del pool
+usan varios núcleos en paralelo. El pool limita cuántos hashes corren a la vez
+(``HASHING_POOL_WORKERS``) y cuántos pueden esperar en cola
+(``HASHING_POOL_MAX_PENDIENTES``); si la cola está llena por más de
+``HASHING_POOL_ESPERA`` segundos se responde 503 en lugar de saturar los workers.
+
+Los cupos son un ``threading.BoundedSemaphore`` compartido por todo el proceso.
+La versión async espera el mismo semáforo en un hilo auxiliar, sin bloquear el
+event loop: bajo WSGI cada ``async_to_sync`` crea un loop nuevo, por lo que un
+semáforo por loop no haría esperar a las solicitudes entre sí.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_pool = None
+_cupos = None
+# Hilos donde las llamadas async esperan un cupo
+_esperas = None
+_lock = threading.Lock()
+
+
+class PoolSaturado(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Demasiados inicios de sesión simultáneos, intenta nuevamente en unos segundos.'
+    default_code = 'pool_saturado'
+
+
+def workers():
+    return getattr(settings, 'HASHING_POOL_WORKERS', None) or os.cpu_count() or 1
+
+
+def _obtener_pool():
+    global _pool, _cupos, _esperas
+    with _lock:
+        if _pool is None:
+            capacidad = workers() + getattr(settings, 'HASHING_POOL_MAX_PENDIENTES', 64)
+            _pool = ThreadPoolExecutor(max_workers=workers(), thread_name_prefix='hash-password')
+            _cupos = threading.BoundedSemaphore(capacidad)
+            _esperas = ThreadPoolExecutor(max_workers=capacidad, thread_name_prefix='hash-espera')
+        return _pool, _cupos
+
+
+def reiniciar_pool():
+    """Cierra el pool actual; el siguiente uso crea uno nuevo con la configuración vigente."""
+    global _pool, _cupos, _esperas
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _esperas.shutdown(wait=True)
+        _pool = _cupos = _esperas = None
+
+
+def _enviar(pool, cupos, funcion, *args):
+    futuro = pool.submit(funcion, *args)
+    futuro.add_done_callback(lambda _: cupos.release())
+    return futuro
+
+
+def _espera():
+    return getattr(settings, 'HASHING_POOL_ESPERA', 10)
+
+
+def ejecutar(funcion, *args):
+    """Ejecuta ``funcion`` en el pool y espera su resultado."""
+    pool, cupos = _obtener_pool()
+    if not cupos.acquire(timeout=_espera()):
+        raise PoolSaturado()
+    return _enviar(pool, cupos, funcion, *args).result()
+
+
+def _liberar_si_obtuvo(cupos):
+    def liberar(futuro):
+        if not futuro.cancelled() and futuro.result():
+            cupos.release()
+    return liberar
+
+
+async def aejecutar(funcion, *args):
+    """Versión async de ``ejecutar``: espera sin bloquear el event loop."""
+    pool, cupos = _obtener_pool()
+    if not cupos.acquire(blocking=False):
+        # El plazo corre desde ahora, aunque el hilo de espera tarde en empezar
+        limite = time.monotonic() + _espera()
+        espera = _esperas.submit(lambda: cupos.acquire(timeout=max(limite - time.monotonic(), 0)))
+        try:
+            obtenido = await asyncio.wrap_future(espera)
+        except asyncio.CancelledError:
+            # El cliente se desconectó: el cupo que obtenga el hilo no se usará
+            espera.add_done_callback(_liberar_si_obtuvo(cupos))
+            raise
+        if not obtenido:
+            raise PoolSaturado()
+    return await asyncio.wrap_future(_enviar(pool, cupos, funcion, *args))
+
+
+def _verificar(password, encoded):
+    """Retorna ``(es_correcta, requiere_rehash)``."""
+    requiere_rehash = []
+    es_correcta = check_password(password, encoded, setter=lambda _: requiere_rehash.append(True))
+    return es_correcta, bool(requiere_rehash)
+
+
+def verificar(password, encoded):
+    return ejecutar(_verificar, password, encoded)
+
+
+async def averificar(password, encoded):
+    return await aejecutar(_verificar, password, encoded)
+
+
+def hashear(password):
+    return ejecutar(make_password, password)
+
+
+async def ahashear(password):
+    return await aejecutar(make_password, password)
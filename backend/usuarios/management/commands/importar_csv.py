@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from backend import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa desde un CSV residentes, gastos comunes o multas históricas. "
+        "Las filas con errores se reportan y no detienen la importación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=list(importacion.IMPORTADORES))
+        parser.add_argument('archivo', help='Ruta del CSV (UTF-8, con encabezado).')
+        parser.add_argument('--batch-size', type=int, default=importacion.BATCH_SIZE,
+                            help='Filas validadas e insertadas por lote.')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos para hashear contraseñas (por defecto, uno por CPU).')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], newline='', encoding='utf-8-sig') as archivo:
+                resumen = importacion.importar(
+                    archivo, options['tipo'],
+                    batch_size=options['batch_size'], procesos=options['procesos']
+                )
+        except UnicodeDecodeError:
+            raise CommandError("El archivo debe estar codificado en UTF-8")
+        except OSError as error:
+            raise CommandError(f"No se pudo leer el archivo: {error}")
+        except ValidationError as error:
+            raise CommandError(json.dumps(error.detail, ensure_ascii=False))
+
+        for error in resumen['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {json.dumps(error['errores'], ensure_ascii=False)}")
+        self.stdout.write(
+            f"{resumen['tipo']}: {resumen['procesadas']} filas procesadas, "
+            f"{resumen['creados']} creadas, {resumen['total_errores']} con errores"
+        )
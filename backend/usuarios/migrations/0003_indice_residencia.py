@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_indice_rol'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['numero_residencia'], name='usuario_residencia_idx'),
+        ),
+    ]
@@ -1,5 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from model_utils import FieldTracker
+
+# Campos que guarda el snapshot de autenticación (usuarios.autenticacion)
+CAMPOS_SNAPSHOT = ('id', 'username', 'rol', 'is_active')
 
 class Usuario(AbstractUser):
     """
@@ -12,10 +16,37 @@ class Usuario(AbstractUser):
     rol = models.CharField(max_length=10, choices=ROLES, default='residente')
     telefono = models.CharField(max_length=15, blank=True, null=True)
     numero_residencia = models.CharField(max_length=10, blank=True, null=True)
+    tracker = FieldTracker(fields=['rol'])
     
     class Meta:
         verbose_name = 'Usuario'
+        indexes = [
+            # Listado de residentes y lista de administradores a notificar
+            models.Index(fields=['rol'], name='usuario_rol_idx'),
+            # Filtro de gastos y multas por número de residencia
+            models.Index(fields=['numero_residencia'], name='usuario_residencia_idx'),
+        ]
         verbose_name_plural = 'Usuarios'
     
+    def refresh_from_db(self, using=None, fields=None):
+        # Al acceder a un campo diferido (usuarios leídos con only() o desde el
+        # snapshot de autenticación) se cargan todos los diferidos en una consulta
+        diferidos = self.get_deferred_fields()
+        if fields is not None and diferidos and set(fields) <= diferidos:
+            fields = list(diferidos)
+        super().refresh_from_db(using=using, fields=fields)
+    
+    def save(self, *args, **kwargs):
+        # El usuario autenticado desde el snapshot puede tener username, rol o
+        # is_active desactualizados: guardarlo completo los sobrescribiría
+        if getattr(self, 'desde_snapshot', False):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None or set(update_fields) & set(CAMPOS_SNAPSHOT):
+                raise ValueError(
+                    "El usuario autenticado desde el snapshot solo se puede guardar con "
+                    "update_fields que no incluyan " + ', '.join(CAMPOS_SNAPSHOT)
+                )
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.username})"
@@ -2,6 +2,10 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from .models import Usuario
 
+# Columnas que UsuarioSerializer lee al serializar (sin el hash de la contraseña)
+CAMPOS_LECTURA_USUARIO = ('id', 'username', 'email', 'first_name', 'last_name',
+                          'rol', 'telefono', 'numero_residencia')
+
 class UsuarioSerializer(serializers.ModelSerializer):
     """
     Serializador para el modelo de usuario.
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Usuario
+from . import autenticacion
+
+
+# Cualquier cambio del usuario (rol, activo, contraseña...) invalida su snapshot de autenticación
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_snapshot_usuario(sender, instance, **kwargs):
+    autenticacion.invalidar(instance.id)
+    # Y de nuevo al confirmar, por si otra solicitud lo volvió a leer antes del commit
+    transaction.on_commit(lambda: autenticacion.invalidar(instance.id))
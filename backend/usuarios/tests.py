@@ -1,3 +1,241 @@
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+import asyncio
+import io
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend import importacion
+from backend.testing import ConsultasConstantesMixin, usar_cache_compartido
+from gastocomun.models import GastoComun
+from . import autenticacion, hashing
+from .models import Usuario
 
 # Create your tests here.
+
+class UsuarioConsultasTest(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def agregar_residentes(self, cantidad):
+        inicio = Usuario.objects.count()
+        Usuario.objects.bulk_create([
+            Usuario(username=f'residente-{inicio + i}', rol='residente') for i in range(cantidad)
+        ])
+
+    def test_listados_sin_n_mas_1(self):
+        for ruta in ('/api/usuarios/lista/', '/api/usuarios/residentes/'):
+            with self.subTest(ruta=ruta):
+                self.assertConsultasConstantes(lambda: self.client.get(ruta), self.agregar_residentes)
+
+    def test_estadisticas_en_una_consulta(self):
+        self.agregar_residentes(2)
+        respuesta, consultas = self.contar_consultas(
+            lambda: self.client.get('/api/usuarios/estadisticas/')
+        )
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(respuesta.json(), {'total_usuarios': 3, 'total_admins': 1, 'total_residentes': 2})
+
+
+@override_settings(IMPORTACION_PROCESOS_HASH=1)
+class ImportacionCsvTest(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def importar(self, tipo, contenido):
+        archivo = SimpleUploadedFile('datos.csv', contenido.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/api/usuarios/importar/', {'tipo': tipo, 'archivo': archivo}, format='multipart')
+
+    def test_importa_residentes_y_gastos_reportando_errores_por_fila(self):
+        respuesta = self.importar('residentes', (
+            'username,email,first_name,last_name,password,numero_residencia\n'
+            'ana,ana@example.com,Ana,Rojas,Clave.Segura.2024,101\n'
+            'admin,otro@example.com,Otro,Admin,,102\n'
+            'luis,correo-invalido,Luis,Soto,,103\n'
+        ))
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['creados'], 1)
+        self.assertEqual([error['fila'] for error in respuesta.data['errores']], [3, 4])
+        self.assertTrue(Usuario.objects.get(username='ana').check_password('Clave.Segura.2024'))
+
+        respuesta = self.importar('gastos', (
+            'residente,concepto,monto,fecha_emision,fecha_vencimiento,estado\n'
+            'ana,Gasto enero 2020,45000,2020-01-01,2020-01-10,pagado\n'
+            'nadie,Gasto enero 2020,45000,2020-01-01,2020-01-10,pagado\n'
+        ))
+        self.assertEqual(respuesta.data['creados'], 1)
+        self.assertIn('residente', respuesta.data['errores'][0]['errores'])
+
+    def test_csv_mal_formado_reporta_lo_importado_antes_del_error(self):
+        Usuario.objects.create_user('ana', 'ana@example.com', 'clave')
+        filas = ''.join(f'ana,Gasto {mes},45000,2020-0{mes}-01,2020-0{mes}-10\n' for mes in (1, 2, 3))
+        # Un campo más largo que csv.field_size_limit() hace fallar al lector en la fila 5
+        respuesta = self.importar('gastos', (
+            'residente,concepto,monto,fecha_emision,fecha_vencimiento\n' + filas
+            + 'ana,"' + 'x' * 200000 + '",1,2020-04-01,2020-04-10\n'
+            'ana,Gasto 5,45000,2020-05-01,2020-05-10\n'
+        ))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual((respuesta.data['creados'], respuesta.data['error']['fila']), (3, 5))
+        self.assertIn('CSV mal formado', respuesta.data['error']['detalle'])
+        self.assertEqual(GastoComun.objects.count(), 3)
+
+        archivo = SimpleUploadedFile('datos.csv', b'residente,\xff\n', content_type='text/csv')
+        respuesta = self.client.post('/api/usuarios/importar/', {'tipo': 'gastos', 'archivo': archivo})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('UTF-8', str(respuesta.data['archivo']))
+
+    def test_usernames_repetidos_y_conflictos_al_guardar(self):
+        original = importacion.IMPORTADORES['residentes']
+
+        def validar_y_competir(lote, estado):
+            validas, errores = original[0](lote, estado)
+            # Otra solicitud crea "luis" entre la validación y el INSERT del lote
+            Usuario.objects.get_or_create(username='luis')
+            return validas, errores
+
+        contenido = io.StringIO(
+            'username,email,first_name,last_name\n'
+            'ana,ana@example.com,Ana,Rojas\n'
+            'ana,ana2@example.com,Ana,Rojas\n'
+            'luis,luis@example.com,Luis,Soto\n'
+            'ana,ana3@example.com,Ana,Rojas\n'
+            'eva,eva@example.com,Eva,Paz\n'
+        )
+        with mock.patch.dict(importacion.IMPORTADORES, {'residentes': (validar_y_competir, original[1])}):
+            resumen = importacion.importar(contenido, 'residentes', batch_size=3, procesos=1)
+
+        # Las repetidas del archivo se detectan al validar, también en lotes distintos;
+        # el conflicto con "luis" descarta solo esa fila del lote
+        self.assertEqual(resumen['creados'], 2)
+        self.assertEqual([error['fila'] for error in resumen['errores']], [3, 4, 5])
+        self.assertIn('non_field_errors', resumen['errores'][1]['errores'])
+        self.assertEqual(
+            sorted(Usuario.objects.exclude(pk=self.admin.pk).values_list('username', flat=True)),
+            ['ana', 'eva', 'luis']
+        )
+        self.assertEqual(Usuario.objects.get(username='luis').email, '')
+
+    def test_columnas_faltantes_y_solo_admin(self):
+        respuesta = self.importar('multas', 'residente,motivo\nana,Ruido\n')
+        self.assertEqual(respuesta.status_code, 400)
+
+        self.client.force_authenticate(Usuario.objects.create_user('residente', 'r@example.com', 'clave'))
+        self.assertEqual(self.importar('multas', 'residente,motivo,precio\n').status_code, 403)
+
+
+@override_settings(PASSWORD_HASH_ITERACIONES=1000)
+class LoginTest(TestCase):
+    def test_login_rehashea_con_las_iteraciones_configuradas(self):
+        usuario = Usuario.objects.create_user('ana', 'ana@example.com', 'Clave.Segura.1')
+        with override_settings(PASSWORD_HASH_ITERACIONES=2000):
+            usuario.set_password('Clave.Segura.1')
+            usuario.save()
+
+        respuesta = self.client.post('/api/token/', {'username': 'ana', 'password': 'Clave.Segura.1'},
+                                     content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(set(respuesta.json()), {'refresh', 'access'})
+        usuario.refresh_from_db()
+        self.assertTrue(usuario.password.startswith('pbkdf2_sha256$1000$'))
+
+        respuesta = self.client.post('/api/token/', {'username': 'ana', 'password': 'incorrecta'},
+                                     content_type='application/json')
+        self.assertEqual(respuesta.status_code, 401)
+        respuesta = self.client.post('/api/token/', {'username': 'ana'}, content_type='application/json')
+        self.assertIn('password', respuesta.json())
+
+
+@override_settings(HASHING_POOL_WORKERS=1, HASHING_POOL_MAX_PENDIENTES=1, HASHING_POOL_ESPERA=0.2)
+class PoolHashingTest(SimpleTestCase):
+    def setUp(self):
+        hashing.reiniciar_pool()
+        self.addCleanup(hashing.reiniciar_pool)
+
+    async def test_espera_un_cupo_y_responde_503_si_no_se_libera(self):
+        liberar = threading.Event()
+        ocupadas = [asyncio.ensure_future(hashing.aejecutar(liberar.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        # Un worker y un pendiente ocupados: la tercera espera y se rinde tras HASHING_POOL_ESPERA
+        with self.assertRaises(hashing.PoolSaturado):
+            await hashing.aejecutar(sum, [1, 2])
+
+        esperando = asyncio.ensure_future(hashing.aejecutar(sum, [1, 2]))
+        await asyncio.sleep(0.05)
+        self.assertFalse(esperando.done())
+        liberar.set()
+        self.assertEqual(await esperando, 3)
+        self.assertEqual(await asyncio.gather(*ocupadas), [True, True])
+
+    def test_con_un_loop_por_llamada_espera_antes_de_responder_503(self):
+        # Bajo WSGI cada async_to_sync corre en un event loop nuevo
+        liberar = threading.Event()
+        ocupadas = [threading.Thread(target=async_to_sync(hashing.aejecutar), args=(liberar.wait, 5))
+                    for _ in range(2)]
+        for hilo in ocupadas:
+            hilo.start()
+        time.sleep(0.05)
+
+        inicio = time.monotonic()
+        with self.assertRaises(hashing.PoolSaturado):
+            async_to_sync(hashing.aejecutar)(sum, [1, 2])
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.2)
+
+        threading.Timer(0.1, liberar.set).start()
+        inicio = time.monotonic()
+        self.assertEqual(async_to_sync(hashing.aejecutar)(sum, [1, 2]), 3)
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.1)
+        for hilo in ocupadas:
+            hilo.join()
+
+
+class SnapshotAutenticacionTest(ConsultasConstantesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.usuario = Usuario.objects.create_user('ana', 'ana@example.com', 'clave', first_name='Ana')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.usuario).access_token}')
+
+    def test_solicitudes_sin_consultar_al_usuario_y_snapshot_invalidado(self):
+        usar_cache_compartido(self, 'USUARIOS_SNAPSHOT_CACHE')
+        self.client.get('/api/notificaciones/contador/')
+        respuesta, consultas = self.contar_consultas(lambda: self.client.get('/api/gastocomun/pendientes/'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([c['sql'] for c in consultas if 'usuarios_usuario' in c['sql']], [])
+
+        # Los campos que no están en el snapshot se cargan al accederlos
+        self.assertEqual(self.client.get('/api/usuarios/perfil/').json()['first_name'], 'Ana')
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.get('/api/gastocomun/pendientes/').status_code, 401)
+
+    def test_cache_por_proceso_lee_el_usuario_en_cada_solicitud(self):
+        # Con locmem la invalidación no llegaría a los otros procesos
+        self.client.get('/api/gastocomun/pendientes/')
+        Usuario.objects.filter(id=self.usuario.id).update(rol='admin')
+        respuesta, consultas = self.contar_consultas(lambda: self.client.get('/api/usuarios/estadisticas/'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len([c for c in consultas if 'usuarios_usuario' in c['sql']]), 2)
+
+    def test_el_usuario_del_snapshot_no_se_guarda_completo(self):
+        usuario = autenticacion.usuario_desde_snapshot(autenticacion.obtener_snapshot(self.usuario.id))
+        Usuario.objects.filter(id=self.usuario.id).update(rol='admin')
+        for campos in (None, ['rol'], ['first_name', 'is_active']):
+            with self.subTest(update_fields=campos), self.assertRaises(ValueError):
+                usuario.save(update_fields=campos)
+        usuario.first_name = 'Anita'
+        usuario.save(update_fields=['first_name'])
+        self.assertEqual(
+            Usuario.objects.values_list('first_name', 'rol').get(id=self.usuario.id), ('Anita', 'admin')
+        )
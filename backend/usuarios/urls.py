@@ -6,7 +6,8 @@ from .views import (
     PerfilUsuarioView,
     cambiar_password,
     estadisticas_usuarios,
-    listar_residentes
+    listar_residentes,
+    importar_csv
 )
 
 urlpatterns = [
@@ -17,4 +18,5 @@ urlpatterns = [
     path('cambiar-password/', cambiar_password, name='cambiar-password'),
     path('estadisticas/', estadisticas_usuarios, name='estadisticas-usuarios'),
     path('residentes/', listar_residentes, name='listar-residentes'),   
+    path('importar/', importar_csv, name='importar-csv'),
 ]
@@ -1,13 +1,78 @@
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import update_last_login
+from django.http import JsonResponse
 from django.shortcuts import render
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.exceptions import MethodNotAllowed, PermissionDenied, ValidationError
 from rest_framework.views import APIView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from .models import Usuario
-from .serializers import UsuarioSerializer, UsuarioUpdateSerializer
+from .serializers import UsuarioSerializer, UsuarioUpdateSerializer, CAMPOS_LECTURA_USUARIO
+from . import hashing
+from .backends import actualizar_hash
 
-from django.contrib.auth import authenticate
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from backend import estadisticas, importacion
+from backend.cache_respuestas import cache_respuesta
+from backend.pagination import paginar_lista
+
+
+async def obtener_token(request):
+    """
+    Inicio de sesión (reemplaza a ``TokenObtainPairView`` con las mismas
+    respuestas). Es una vista async: la verificación de la contraseña corre en el
+    pool de ``usuarios.hashing`` y, mientras tanto, el worker sigue atendiendo
+    otras solicitudes. Si el hash está desactualizado se rehashea al vuelo.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': str(MethodNotAllowed(request.method).detail)},
+                            status=status.HTTP_405_METHOD_NOT_ALLOWED, headers={'Allow': 'POST, OPTIONS'})
+    
+    serializer = TokenObtainPairSerializer()
+    try:
+        datos = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+        credenciales = serializer.to_internal_value(datos)
+    except json.JSONDecodeError:
+        return JsonResponse({'detail': 'JSON inválido'}, status=status.HTTP_400_BAD_REQUEST)
+    except ValidationError as error:
+        return JsonResponse(error.detail, status=status.HTTP_400_BAD_REQUEST)
+    
+    username = credenciales[Usuario.USERNAME_FIELD]
+    password = credenciales['password']
+    try:
+        usuario = await Usuario.objects.filter(**{Usuario.USERNAME_FIELD: username}).afirst()
+        if usuario is None:
+            # Se hashea igual para no revelar por el tiempo de respuesta si el usuario existe
+            await hashing.ahashear(password)
+            es_correcta = requiere_rehash = False
+        else:
+            es_correcta, requiere_rehash = await hashing.averificar(password, usuario.password)
+        if es_correcta and requiere_rehash:
+            usuario.password = await hashing.ahashear(password)
+            await usuario.asave(update_fields=['password'])
+    except hashing.PoolSaturado as error:
+        return JsonResponse({'detail': str(error.detail)}, status=error.status_code, headers={'Retry-After': '1'})
+    
+    if not es_correcta or not jwt_settings.USER_AUTHENTICATION_RULE(usuario):
+        return JsonResponse(
+            {'detail': str(serializer.error_messages['no_active_account'])},
+            status=status.HTTP_401_UNAUTHORIZED,
+            headers={'WWW-Authenticate': f'{jwt_settings.AUTH_HEADER_TYPES[0]} realm="api"'}
+        )
+    
+    refresh = await sync_to_async(serializer.get_token)(usuario)
+    if jwt_settings.UPDATE_LAST_LOGIN:
+        await sync_to_async(update_last_login)(None, usuario)
+    return JsonResponse({'refresh': str(refresh), 'access': str(refresh.access_token)})
+
+obtener_token.csrf_exempt = True
 
 class RegistroUsuarioView(generics.CreateAPIView):
     """
@@ -21,7 +86,7 @@ class RegistroUsuarioView(generics.CreateAPIView):
     def perform_create(self, serializer):
         # Verificar si el usuario autenticado es un administrador
         if self.request.user.rol != 'admin':
-            raise permissions.PermissionDenied("Solo los administradores pueden registrar usuarios")
+            raise PermissionDenied("Solo los administradores pueden registrar usuarios")
         serializer.save()
 
 class UsuarioListView(generics.ListAPIView):
@@ -36,8 +101,12 @@ class UsuarioListView(generics.ListAPIView):
     def get_queryset(self):
         # Verificar si el usuario autenticado es un administrador
         if self.request.user.rol != 'admin':
-            raise permissions.PermissionDenied("Solo los administradores pueden ver la lista de usuarios")
-        return Usuario.objects.all()
+            raise PermissionDenied("Solo los administradores pueden ver la lista de usuarios")
+        return Usuario.objects.only(*CAMPOS_LECTURA_USUARIO)
+    
+    @cache_respuesta('usuarios')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 class UsuarioDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -58,13 +127,13 @@ class UsuarioDetailView(generics.RetrieveUpdateDestroyAPIView):
         obj = super().get_object()
         # Verificar si el usuario autenticado es el propietario del perfil o un administrador
         if self.request.user.id != obj.id and self.request.user.rol != 'admin':
-            raise permissions.PermissionDenied("No tienes permiso para acceder a este perfil")
+            raise PermissionDenied("No tienes permiso para acceder a este perfil")
         return obj
     
     def destroy(self, request, *args, **kwargs):
         # Verificar si el usuario autenticado es un administrador
         if self.request.user.rol != 'admin':
-            raise permissions.PermissionDenied("Solo los administradores pueden eliminar usuarios")
+            raise PermissionDenied("Solo los administradores pueden eliminar usuarios")
         return super().destroy(request, *args, **kwargs)
 
 class PerfilUsuarioView(APIView):
@@ -94,16 +163,17 @@ def cambiar_password(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Verificar que la contraseña actual sea correcta
-    if not authenticate(username=user.username, password=old_password):
+    # Verificar que la contraseña actual sea correcta (contra el hash ya cargado,
+    # sin volver a buscar al usuario ni rehashear la contraseña anterior)
+    es_correcta, _ = hashing.verificar(old_password, user.password)
+    if not es_correcta:
         return Response(
             {"error": "La contraseña actual es incorrecta"},
             status=status.HTTP_400_BAD_REQUEST
         )
     
     # Establecer la nueva contraseña
-    user.set_password(new_password)
-    user.save()
+    actualizar_hash(user, hashing.hashear(new_password))
     
     return Response({"message": "Contraseña actualizada correctamente"})
 
@@ -121,15 +191,13 @@ def estadisticas_usuarios(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Obtener conteos de usuarios
-    total_usuarios = Usuario.objects.count()
-    total_admins = Usuario.objects.filter(rol='admin').count()
-    total_residentes = Usuario.objects.filter(rol='residente').count()
+    # Obtener conteos de usuarios por rol en una sola consulta
+    datos = estadisticas.resumen(Usuario.objects.all(), ['admin', 'residente'], campo_estado='rol')
     
     return Response({
-        'total_usuarios': total_usuarios,
-        'total_admins': total_admins,
-        'total_residentes': total_residentes
+        'total_usuarios': datos['total'],
+        'total_admins': datos['total_admin'],
+        'total_residentes': datos['total_residente']
     })
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -144,6 +212,41 @@ def listar_residentes(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    residentes = Usuario.objects.filter(rol='residente')
+    residentes = Usuario.objects.filter(rol='residente').only(*CAMPOS_LECTURA_USUARIO)
+    respuesta_paginada = paginar_lista(request, residentes, UsuarioSerializer)
+    if respuesta_paginada is not None:
+        return respuesta_paginada
     serializer = UsuarioSerializer(residentes, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return Response(serializer.data)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser])
+def importar_csv(request):
+    """
+    Vista para importar un CSV de residentes, gastos comunes o multas históricas.
+    Recibe ``archivo`` y ``tipo`` (residentes, gastos, multas) y retorna un resumen
+    con los errores por fila. Solo los administradores pueden importar.
+    """
+    if request.user.rol != 'admin':
+        return Response(
+            {"error": "Solo los administradores pueden importar datos"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        return Response(
+            {"error": "Debes adjuntar el archivo CSV en el campo 'archivo'"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+    resumen = importacion.importar(texto, request.data.get('tipo', ''))
+    
+    # Un error de lectura a mitad del archivo no deshace los lotes ya guardados:
+    # el resumen dice cuántas filas se crearon y en qué fila se detuvo
+    if 'error' in resumen:
+        codigo = status.HTTP_400_BAD_REQUEST
+    else:
+        codigo = status.HTTP_201_CREATED if resumen['creados'] else status.HTTP_200_OK
+    return Response(resumen, status=codigo)
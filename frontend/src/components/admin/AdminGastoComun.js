@@ -26,6 +26,9 @@ const { Option } = Select;
 const AdminGastoComun = () => {
   const [gastos, setGastos] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [cargandoTabla, setCargandoTabla] = useState(false);
+  // Filtros, búsqueda y orden que se resuelven en el servidor
+  const [filtros, setFiltros] = useState({});
   const [modalVisible, setModalVisible] = useState(false);
   const [form] = Form.useForm();
   const [residentes, setResidentes] = useState([]);
@@ -42,17 +45,23 @@ const AdminGastoComun = () => {
 
 
   useEffect(() => {
-    fetchGastos();
     fetchResidentes();
     fetchEstadisticas();
   }, []);
 
 
+  useEffect(() => {
+    fetchGastos();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [filtros]);
+
+
   const fetchGastos = async () => {
     try {
-      setLoading(true);
+      setCargandoTabla(true);
       setErrorMessage(null);
       const response = await axios.get(`http://localhost:8000/api/gastocomun/`, {
+        params: filtros,
         headers: {
           Authorization: `Bearer ${localStorage.getItem('accessToken')}`,
         },
@@ -64,6 +73,7 @@ const AdminGastoComun = () => {
       message.error('No se pudieron cargar los gastos comunes');
     } finally {
       setLoading(false);
+      setCargandoTabla(false);
     }
   };
 
@@ -228,6 +238,24 @@ const AdminGastoComun = () => {
   };
 
 
+  // Estado y orden de la tabla se envían como parámetros (estado, orden)
+  const handleTableChange = (_, filters, sorter, extra) => {
+    // La paginación sigue siendo local: cambiar de página no vuelve a consultar
+    if (extra && extra.action === 'paginate') return;
+    const ordenable = ['monto', 'fecha_emision', 'fecha_vencimiento'].includes(sorter.field) && sorter.order;
+    setFiltros(prev => ({
+      busqueda: prev.busqueda,
+      estado: filters.estado && filters.estado.length ? filters.estado.join(',') : undefined,
+      orden: ordenable ? `${sorter.order === 'descend' ? '-' : ''}${sorter.field}` : undefined,
+    }));
+  };
+
+
+  const handleBusqueda = (valor) => {
+    setFiltros(prev => ({ ...prev, busqueda: valor.trim() || undefined }));
+  };
+
+
   const formatMonto = (monto) => {
     if (!monto && monto !== 0) return '$0';
     return `$${parseFloat(monto).toLocaleString('es-CL')}`;
@@ -336,11 +364,19 @@ const AdminGastoComun = () => {
             </Space>
           </Divider>
          
+          <Input.Search
+            placeholder="Buscar por concepto"
+            allowClear
+            onSearch={handleBusqueda}
+            style={{ maxWidth: 360, marginBottom: 16 }}
+          />
+
           <Table
             dataSource={gastos}
-            loading={loading}
+            loading={cargandoTabla}
             rowKey="id"
             className="gastos-table"
+            onChange={handleTableChange}
             pagination={{
               pageSize: 10,
               showSizeChanger: true,
@@ -381,7 +417,7 @@ const AdminGastoComun = () => {
               title="Monto"
               dataIndex="monto"
               render={(text) => formatMonto(text)}
-              sorter={(a, b) => parseFloat(a.monto) - parseFloat(b.monto)}
+              sorter={true}
             />
                         <Column
               title="Estado"
@@ -395,13 +431,12 @@ const AdminGastoComun = () => {
                 { text: 'Pendiente', value: 'pendiente' },
                 { text: 'Pagado', value: 'pagado' },
               ]}
-              onFilter={(value, record) => record.estado === value}
               />
               <Column
                 title="Fecha Emisión"
                 dataIndex="fecha_emision"
                 render={(text) => formatDate(text)}
-                sorter={(a, b) => new Date(a.fecha_emision) - new Date(b.fecha_emision)}
+                sorter={true}
               />
               <Column
                 title="Fecha Vencimiento"
@@ -420,7 +455,7 @@ const AdminGastoComun = () => {
                     </Space>
                   );
                 }}
-                sorter={(a, b) => new Date(a.fecha_vencimiento) - new Date(b.fecha_vencimiento)}
+                sorter={true}
               />
               <Column
                 title="Fecha Pago"
@@ -26,6 +26,9 @@ const { Option } = Select;
 const AdminMultas = () => {
   const [multas, setMultas] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [cargandoTabla, setCargandoTabla] = useState(false);
+  // Filtros, búsqueda y orden que se resuelven en el servidor
+  const [filtros, setFiltros] = useState({});
   const [modalVisible, setModalVisible] = useState(false);
   const [form] = Form.useForm();
   const [residentes, setResidentes] = useState([]);
@@ -42,17 +45,23 @@ const AdminMultas = () => {
 
 
   useEffect(() => {
-    fetchMultas();
     fetchResidentes();
     fetchEstadisticas();
   }, []);
 
 
+  useEffect(() => {
+    fetchMultas();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [filtros]);
+
+
   const fetchMultas = async () => {
     try {
-      setLoading(true);
+      setCargandoTabla(true);
       setErrorMessage(null);
       const response = await axios.get(`http://localhost:8000/api/multas/`, {
+        params: filtros,
         headers: {
           Authorization: `Bearer ${localStorage.getItem('accessToken')}`,
         },
@@ -64,6 +73,7 @@ const AdminMultas = () => {
       message.error('No se pudieron cargar las multas');
     } finally {
       setLoading(false);
+      setCargandoTabla(false);
     }
   };
   const fetchEstadisticas = async () => {
@@ -186,6 +196,24 @@ const AdminMultas = () => {
   };
 
 
+  // Estado y orden de la tabla se envían como parámetros (estado, orden)
+  const handleTableChange = (_, filters, sorter, extra) => {
+    // La paginación sigue siendo local: cambiar de página no vuelve a consultar
+    if (extra && extra.action === 'paginate') return;
+    const ordenable = ['precio', 'fecha_creacion'].includes(sorter.field) && sorter.order;
+    setFiltros(prev => ({
+      busqueda: prev.busqueda,
+      estado: filters.estado && filters.estado.length ? filters.estado.join(',') : undefined,
+      orden: ordenable ? `${sorter.order === 'descend' ? '-' : ''}${sorter.field}` : undefined,
+    }));
+  };
+
+
+  const handleBusqueda = (valor) => {
+    setFiltros(prev => ({ ...prev, busqueda: valor.trim() || undefined }));
+  };
+
+
   const formatMonto = (monto) => {
     if (!monto && monto !== 0) return '$0';
     return `$${parseFloat(monto).toLocaleString('es-CL')}`;
@@ -276,11 +304,19 @@ const AdminMultas = () => {
             </Space>
           </Divider>
          
+          <Input.Search
+            placeholder="Buscar por motivo"
+            allowClear
+            onSearch={handleBusqueda}
+            style={{ maxWidth: 360, marginBottom: 16 }}
+          />
+
           <Table
             dataSource={multas}
-            loading={loading}
+            loading={cargandoTabla}
             rowKey="id"
             className="multas-table"
+            onChange={handleTableChange}
             pagination={{
               pageSize: 10,
               showSizeChanger: true,
@@ -315,7 +351,7 @@ const AdminMultas = () => {
               title="Monto"
               dataIndex="precio"
               render={(text) => formatMonto(text)}
-              sorter={(a, b) => parseFloat(a.precio || 0) - parseFloat(b.precio || 0)}
+              sorter={true}
             />
             <Column
               title="Estado"
@@ -335,13 +371,12 @@ const AdminMultas = () => {
                 { text: 'Pagada', value: 'pagada' },
                 { text: 'Anulada', value: 'anulada' },
               ]}
-              onFilter={(value, record) => record.estado === value}
             />
             <Column
               title="Fecha Creación"
               dataIndex="fecha_creacion"
               render={(text) => formatDate(text)}
-              sorter={(a, b) => new Date(a.fecha_creacion) - new Date(b.fecha_creacion)}
+              sorter={true}
             />
             <Column
               title="Fecha Pago"